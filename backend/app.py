@@ -1,6 +1,7 @@
 from flask import Flask
 from flask_cors import CORS
 from config import Config
+import db
 from routes.store_routes import store_bp
 from routes.auth_routes import auth_bp
 from routes.report_routes import report_bp
@@ -8,6 +9,10 @@ from routes.signup_routes import signup_bp
 from routes.rating_routes import rating_bp
 from routes.product_routes import product_bp
 from routes.subscription_routes import subscription_bp
+from routes.health_routes import health_bp
+from routes.market_routes import market_bp
+from routes.suggest_routes import suggest_bp
+from utils import admission, auth
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret_key'
@@ -16,6 +21,13 @@ CORS(app, supports_credentials=True)
 app.config['SESSION_COOKIE_SAMESITE'] = 'None'
 app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
 
+# Shed over-limit and excess requests before they reach the database
+admission.init_app(app)
+# Share one connection and transaction across everything a request does
+db.init_app(app)
+# Identify callers from their Bearer token without a database lookup
+auth.init_app(app)
+
 # Import and register blueprints
 app.register_blueprint(store_bp)
 app.register_blueprint(product_bp)
@@ -24,6 +36,9 @@ app.register_blueprint(report_bp)
 app.register_blueprint(signup_bp)
 app.register_blueprint(rating_bp)
 app.register_blueprint(subscription_bp)
+app.register_blueprint(health_bp)
+app.register_blueprint(market_bp)
+app.register_blueprint(suggest_bp)
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,30 @@
+import logging
+import pymysql
+from controllers.deal_controller import DealController
+from db import _connect
+from indexes import table_versions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def rebuild(connection) -> int:
+    """Recompute product_deals from product, store and price_history. Returns products ranked."""
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    try:
+        count = DealController().rebuild(cursor)
+        table_versions.mark_changed(cursor, 'product_deals')
+        connection.commit()
+        return count
+    except Exception as e:
+        logger.error(f"Rebuilding best deals failed: {e}")
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    connection = _connect()
+    try:
+        print(f"Ranked {rebuild(connection)} product(s)")
+    finally:
+        connection.close()
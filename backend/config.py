@@ -5,7 +5,127 @@ load_dotenv()
 
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
+
+    # 'mysql', or 'sqlite' for the embedded stand-in used by tests and benchmarks
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', ':memory:')
+    SQLITE_AUTO_MIGRATE = os.getenv('SQLITE_AUTO_MIGRATE', 'true').lower() == 'true'
+
     MYSQL_HOST = os.getenv('MYSQL_HOST')
+    MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
     MYSQL_USER = os.getenv('MYSQL_USER')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD')
-    MYSQL_DB = os.getenv('MYSQL_DB')
\ No newline at end of file
+    MYSQL_DB = os.getenv('MYSQL_DB')
+
+    # Connection pool
+    MYSQL_POOL_MIN_SIZE = int(os.getenv('MYSQL_POOL_MIN_SIZE', 1))
+    MYSQL_POOL_MAX_SIZE = int(os.getenv('MYSQL_POOL_MAX_SIZE', 10))
+    MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', 5))           # seconds to wait for a free connection
+    MYSQL_POOL_MAX_LIFETIME = float(os.getenv('MYSQL_POOL_MAX_LIFETIME', 1800))  # recycle connections older than this
+    MYSQL_POOL_PING_INTERVAL = float(os.getenv('MYSQL_POOL_PING_INTERVAL', 1))   # ping connections idle longer than this
+
+    # Read replicas, e.g. "replica1:3306,replica2:3307"; GET requests are routed to them
+    MYSQL_REPLICAS = os.getenv('MYSQL_REPLICAS', '')
+    MYSQL_REPLICA_STRATEGY = os.getenv('MYSQL_REPLICA_STRATEGY', 'round_robin')  # or 'least_loaded'
+    MYSQL_REPLICA_MAX_LAG = float(os.getenv('MYSQL_REPLICA_MAX_LAG', 5))          # seconds behind the primary
+    MYSQL_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('MYSQL_REPLICA_LAG_CHECK_INTERVAL', 5))
+    MYSQL_REPLICA_RETRY_AFTER = float(os.getenv('MYSQL_REPLICA_RETRY_AFTER', 30))  # seconds to skip a failed replica
+    READ_YOUR_WRITES_WINDOW = float(os.getenv('READ_YOUR_WRITES_WINDOW', 10))    # seconds a writer stays on the primary
+
+    # Query instrumentation
+    SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', 200))           # log statements slower than this
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 5))  # flag a statement shape repeated this often
+    SQL_SERVER_TIMING = os.getenv('SQL_SERVER_TIMING', 'true').lower() == 'true'
+
+    # In-process store indexes are reloaded from the database after this many seconds
+    STORE_INDEX_REFRESH_SECONDS = float(os.getenv('STORE_INDEX_REFRESH_SECONDS', 60))
+    GEO_INDEX_CELL_DEGREES = float(os.getenv('GEO_INDEX_CELL_DEGREES', 0.01))  # ~1 km grid cells
+    NEARBY_MAX_RESULTS = int(os.getenv('NEARBY_MAX_RESULTS', 100))
+    NEARBY_MAX_RADIUS_KM = float(os.getenv('NEARBY_MAX_RADIUS_KM', 500))
+    STORE_TIMEZONE = os.getenv('STORE_TIMEZONE', '')  # IANA zone for open-now checks; server local time if unset
+
+    # Keyset pagination on list endpoints
+    PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT', 50))
+    PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', 200))
+
+    # Bulk store import: stores per transaction, also the cap on ?chunk_size= and --chunk-size
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 1000))
+
+    # Conditional GETs: seconds a process trusts its cached table versions
+    TABLE_VERSION_CACHE_SECONDS = float(os.getenv('TABLE_VERSION_CACHE_SECONDS', 2))
+
+    # In-process columnar product catalog for search and price statistics (needs numpy)
+    PRODUCT_CATALOG_ENABLED = os.getenv('PRODUCT_CATALOG_ENABLED', 'true').lower() == 'true'
+
+    # Retention for price_history, enforced by trim_price_history.py rather than on submit
+    PRICE_HISTORY_KEEP = int(os.getenv('PRICE_HISTORY_KEEP', 5))              # newest entries kept per product
+    PRICE_HISTORY_TRIM_BATCH = int(os.getenv('PRICE_HISTORY_TRIM_BATCH', 500))  # productIDs per trimming transaction
+
+    # Best-deal ranking: share of the price taken from recent reports, and how far
+    # a 1- or 5-star store rating moves a product's score
+    DEAL_REPORT_WEIGHT = float(os.getenv('DEAL_REPORT_WEIGHT', 0.5))
+    DEAL_RATING_WEIGHT = float(os.getenv('DEAL_RATING_WEIGHT', 0.05))
+
+    # Store text search (trigram index, needs numpy): minimum similarity for a match,
+    # matches considered before rating/distance filters, and index reload interval
+    STORE_SEARCH_THRESHOLD = float(os.getenv('STORE_SEARCH_THRESHOLD', 0.4))
+    STORE_SEARCH_MAX_CANDIDATES = int(os.getenv('STORE_SEARCH_MAX_CANDIDATES', 500))
+    STORE_SEARCH_REFRESH_SECONDS = float(os.getenv('STORE_SEARCH_REFRESH_SECONDS', 300))
+
+    # Typeahead (GET /api/suggest): results per request and index reload interval
+    SUGGEST_DEFAULT_LIMIT = int(os.getenv('SUGGEST_DEFAULT_LIMIT', 8))
+    SUGGEST_MAX_LIMIT = int(os.getenv('SUGGEST_MAX_LIMIT', 20))
+    SUGGEST_REFRESH_SECONDS = float(os.getenv('SUGGEST_REFRESH_SECONDS', 300))
+
+    # Top-stores leaderboard: ratings are averaged as if every store also had
+    # PRIOR_COUNT ratings of PRIOR_RATING, and local boards use this grid
+    LEADERBOARD_PRIOR_RATING = float(os.getenv('LEADERBOARD_PRIOR_RATING', 3.5))
+    LEADERBOARD_PRIOR_COUNT = float(os.getenv('LEADERBOARD_PRIOR_COUNT', 10))
+    LEADERBOARD_CELL_DEGREES = float(os.getenv('LEADERBOARD_CELL_DEGREES', 0.5))
+
+    # Authentication: signed access tokens (AUTH_TOKEN_SECRET falls back to
+    # SECRET_KEY and must be shared by every worker). With AUTH_REQUIRED off,
+    # protected routes still check tokens that are sent but admit anonymous calls.
+    AUTH_TOKEN_SECRET = os.getenv('AUTH_TOKEN_SECRET')
+    AUTH_TOKEN_TTL_SECONDS = int(os.getenv('AUTH_TOKEN_TTL_SECONDS', 3600))
+    AUTH_REQUIRED = os.getenv('AUTH_REQUIRED', 'false').lower() == 'true'
+    AUTH_ROLE_CACHE_SIZE = int(os.getenv('AUTH_ROLE_CACHE_SIZE', 10000))
+
+    # Password hashing: scrypt cost (memory is 128 * 8 * N bytes per hash),
+    # hashing threads and how many more hashes may wait before logins get a 503
+    PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+
+    # Work done after a write has committed (deal and market index updates
+    # after a price submission): worker threads, and how many tasks may wait
+    # before new ones are dropped for the batch rebuilds to repair
+    BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 2))
+    BACKGROUND_QUEUE = int(os.getenv('BACKGROUND_QUEUE', 1000))
+
+    # Admission control: concurrent requests per lane (keep the sum within
+    # MYSQL_POOL_MAX_SIZE), how many may queue for up to ADMISSION_QUEUE_TIMEOUT
+    # seconds, and the Retry-After sent with a 503 once a lane is full
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_READ_CONCURRENCY = int(os.getenv('ADMISSION_READ_CONCURRENCY', 6))
+    ADMISSION_WRITE_CONCURRENCY = int(os.getenv('ADMISSION_WRITE_CONCURRENCY', 4))
+    ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', 16))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 1.0))
+    ADMISSION_RETRY_AFTER = float(os.getenv('ADMISSION_RETRY_AFTER', 1))
+    ADMISSION_EXEMPT = {'health_bp.get_db_health', 'health_bp.get_admission_health', 'static'}
+
+    # Rate limits as (requests per second, burst): every client, plus
+    # per-route limits by endpoint. Clients are keyed by address. Behind
+    # reverse proxies, set RATE_LIMIT_TRUSTED_PROXIES to how many of them
+    # append to X-Forwarded-For: the client is the entry that many hops from
+    # the right, since anything further left is whatever the client sent.
+    RATE_LIMIT_DEFAULT = (float(os.getenv('RATE_LIMIT_RATE', 20)), float(os.getenv('RATE_LIMIT_BURST', 40)))
+    RATE_LIMIT_ROUTES = {
+        'auth_bp.login': (0.2, 5),
+        'signup_bp.signup': (0.1, 3),
+        'product_bp.submit_purchase': (1, 10),
+        'rating_bp.submit_rating': (1, 10),
+        'store_bp.import_stores': (0.05, 2),
+    }
+    RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', 0))
+    RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', 100000))
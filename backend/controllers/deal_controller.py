@@ -0,0 +1,67 @@
+from typing import List, Optional
+import pymysql
+import pymysql.cursors
+from config import Config
+from db import get_db_connection
+from indexes import table_versions
+from repositories import deal_repository, product_repository
+from utils.deal_score import deal_score, length_bucket
+
+class DealController:
+    """Keeps the product_deals ranking current and reads the top of it.
+
+    The refresh methods take the caller's cursor so a product, price or
+    rating write and the rows it re-scores commit together.
+    """
+
+    def _score_rows(self, cursor, inputs: List[dict]) -> tuple:
+        reports = product_repository.get_recent_purchases_for_products(
+            cursor, [row['productID'] for row in inputs])
+        deals, unscored = [], []
+        for row in inputs:
+            scored = deal_score(row['set_price'], row['chain_weight'], row['chain_purity'],
+                                [report['latest_price'] for report in reports.get(row['productID'], [])],
+                                row['rating'], Config.DEAL_REPORT_WEIGHT, Config.DEAL_RATING_WEIGHT)
+            if scored is None:
+                unscored.append(row['productID'])
+            else:
+                deals.append((row['productID'], row['storeID'], row['chain_type'],
+                              length_bucket(row['chain_length']), *scored))
+        return deals, unscored
+
+    def refresh_products(self, cursor, product_ids: List[int]) -> None:
+        """Re-score products after they or their reported prices changed; deleted ones drop out."""
+        inputs = deal_repository.get_deal_inputs(cursor, product_ids=product_ids)
+        deals, unscored = self._score_rows(cursor, inputs)
+        found = {row['productID'] for row in inputs}
+        deal_repository.upsert_product_deals(cursor, deals)
+        deal_repository.delete_product_deals(cursor, unscored + [i for i in product_ids if i not in found])
+        table_versions.mark_changed(cursor, 'product_deals')
+
+    def refresh_store(self, cursor, store_id: int) -> None:
+        """Re-score a store's products after its rating changed."""
+        deals, unscored = self._score_rows(cursor, deal_repository.get_deal_inputs(cursor, store_id=store_id))
+        deal_repository.upsert_product_deals(cursor, deals)
+        deal_repository.delete_product_deals(cursor, unscored)
+        table_versions.mark_changed(cursor, 'product_deals')
+
+    def rebuild(self, cursor) -> int:
+        """Recompute the whole ranking. Returns the number of products ranked."""
+        deals, _ = self._score_rows(cursor, deal_repository.get_deal_inputs(cursor))
+        deal_repository.delete_all_product_deals(cursor)
+        deal_repository.upsert_product_deals(cursor, deals)
+        return len(deals)
+
+    def get_best_deals(self, limit: int, chain_type: Optional[str] = None,
+                       length: Optional[float] = None) -> List[dict]:
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            bucket = length_bucket(length) if length is not None else None
+            return deal_repository.get_top_deals(cursor, limit, chain_type, bucket)
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
@@ -0,0 +1,68 @@
+from typing import Iterable, List
+import pymysql
+import pymysql.cursors
+from config import Config
+from db import get_db_connection
+from indexes import table_versions
+from repositories import leaderboard_repository
+from repositories.leaderboard_repository import LEADERBOARD_ALL, LEADERBOARD_CELL, LEADERBOARD_TYPE
+from utils.leaderboard_score import bayesian_rating, cell_key
+
+class LeaderboardController:
+    """Keeps the store_leaderboard rows current and reads the top of a board.
+
+    refresh_stores takes the caller's cursor so a rating, product or store
+    write and the leaderboard rows it moves commit together.
+    """
+
+    def _entries(self, cursor, store_ids=None) -> List[tuple]:
+        stores = leaderboard_repository.get_leaderboard_stores(cursor, store_ids)
+        chain_types = {}
+        for row in leaderboard_repository.get_store_chain_types(
+                cursor, [store['storeID'] for store in stores] if store_ids is not None else None):
+            chain_types.setdefault(row['storeID'], []).append(row['chain_type'])
+
+        entries = []
+        for store in stores:
+            store_id = store['storeID']
+            score = bayesian_rating(store['rating_sum'], store['rating_count'],
+                                    Config.LEADERBOARD_PRIOR_RATING, Config.LEADERBOARD_PRIOR_COUNT)
+            entries.append((LEADERBOARD_ALL, '', store_id, score))
+            entries.extend((LEADERBOARD_TYPE, chain_type, store_id, score)
+                           for chain_type in chain_types.get(store_id, []) if chain_type)
+            if store['latitude'] is not None and store['longitude'] is not None:
+                entries.append((LEADERBOARD_CELL, cell_key(store['latitude'], store['longitude'],
+                                                           Config.LEADERBOARD_CELL_DEGREES), store_id, score))
+        return entries
+
+    def refresh_stores(self, cursor, store_ids: Iterable[int]) -> None:
+        """Rewrite the stores' rows after their ratings, products or location changed."""
+        store_ids = sorted(set(store_ids))
+        if not store_ids:
+            return
+        entries = self._entries(cursor, store_ids)
+        leaderboard_repository.delete_leaderboard_stores(cursor, store_ids)
+        leaderboard_repository.insert_leaderboard_entries(cursor, entries)
+        table_versions.mark_changed(cursor, 'store_leaderboard')
+
+    def rebuild(self, cursor) -> int:
+        """Recompute every board. Returns the number of rows written."""
+        entries = self._entries(cursor)
+        leaderboard_repository.delete_all_leaderboard(cursor)
+        leaderboard_repository.insert_leaderboard_entries(cursor, entries)
+        return len(entries)
+
+    def get_top_stores(self, board: str, board_key: str, limit: int) -> List[dict]:
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            stores = leaderboard_repository.get_top_stores(cursor, board, board_key, limit)
+            for store in stores:
+                store['score'] = round(float(store['score']), 4)
+            return stores
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
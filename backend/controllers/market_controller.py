@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+from typing import Dict, List
+import pymysql
+import pymysql.cursors
+from db import get_db_connection
+from repositories import market_repository
+from utils import price_sketch
+
+MARKET_BUCKETS = ('day', 'week', 'month')
+MARKET_PERCENTILES = (25, 50, 75, 90)
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def _as_date(value) -> date:
+    # DATE columns come back as date from MySQL and as text from SQLite
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+class MarketController:
+    def get_index(self, segment: Dict[str, str], start: date, end: date, bucket: str = 'day') -> List[dict]:
+        """Price-per-gram summary for each day, week or month between start and end.
+
+        Buckets are merged from the daily rollups: counts, totals and extremes
+        add up exactly, percentiles come from the merged sketches.
+        """
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            days = market_repository.get_market_days(cursor, segment, start.isoformat(), end.isoformat())
+            sketch_rows = market_repository.get_market_sketches(cursor, segment, start.isoformat(), end.isoformat())
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
+        buckets = {}
+        for row in days:
+            key = bucket_start(_as_date(row['day']), bucket)
+            entry = buckets.setdefault(key, {'count': 0, 'total': 0.0, 'min': None, 'max': None, 'sketch': {}})
+            entry['count'] += int(row['observations'])
+            entry['total'] += float(row['total_ppg'])
+            low, high = float(row['min_ppg']), float(row['max_ppg'])
+            entry['min'] = low if entry['min'] is None else min(entry['min'], low)
+            entry['max'] = high if entry['max'] is None else max(entry['max'], high)
+        for row in sketch_rows:
+            entry = buckets.get(bucket_start(_as_date(row['day']), bucket))
+            if entry is not None:
+                # Sketches merge by adding the counts of equal buckets
+                sketch_bucket = int(row['bucket'])
+                entry['sketch'][sketch_bucket] = entry['sketch'].get(sketch_bucket, 0) + int(row['observations'])
+
+        series = []
+        for key in sorted(buckets):
+            entry = buckets[key]
+            point = {
+                'bucket': key.isoformat(),
+                'count': entry['count'],
+                'mean': round(entry['total'] / entry['count'], 2),
+                'min': round(entry['min'], 2),
+                'max': round(entry['max'], 2),
+            }
+            for q in MARKET_PERCENTILES:
+                # Keep sketch estimates inside the exact extremes
+                estimate = price_sketch.quantile(entry['sketch'], q / 100)
+                point[f"p{q}"] = None if estimate is None else round(min(max(estimate, entry['min']), entry['max']), 2)
+            series.append(point)
+        return series
@@ -1,21 +1,92 @@
-from typing import List, Optional
+import logging
+from typing import Dict, List, Optional, Tuple
 import pymysql
 import pymysql.cursors
-from mysql.connector import Error
+import db
+from controllers.deal_controller import DealController
 from db import get_db_connection
+from indexes import product_catalog, store_locations, table_versions
+from repositories import market_repository, product_repository
+from utils import background
+from utils.pagination import paginate
+
+logger = logging.getLogger(__name__)
+
+deal_controller = DealController()
 
 class ProductController:
     def get_all_products(self) -> List[dict]:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            return product_repository.get_all_products(cursor)
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
+    def get_products_page(self, limit: int, sort: str = 'id', after: Optional[tuple] = None,
+                          store_id: Optional[int] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of products and the cursor for the next page (None on the last)."""
+        connection = get_db_connection(read_only=True)
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         try:
-            cursor.execute("""
-                SELECT productID, storeID, chain_type, chain_purity, 
-                       chain_thickness, chain_length, chain_color,
-                       chain_weight, set_price
-                FROM product
-            """)
-            return cursor.fetchall()
+            rows = product_repository.get_products_page(cursor, limit, sort, after, store_id)
+            return paginate(rows, limit, sort, lambda row: product_repository.product_page_key(row, sort))
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
+    def search_products(self, filters: dict, limit: int, sort: str = 'id', after: Optional[tuple] = None,
+                        near: Optional[tuple] = None) -> dict:
+        """One page of matching products with the total and facet counts.
+
+        near is (lat, lng, radius_km) and restricts results to stores inside it.
+        """
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            if near is not None:
+                lat, lng, radius_km = near
+                nearby_ids = [store_id for _, store_id in store_locations.nearby(cursor, lat, lng, radius_km=radius_km)]
+                requested = filters.get('store_ids')
+                filters = {**filters, 'store_ids': [store_id for store_id in nearby_ids
+                                                    if requested is None or store_id in requested]}
+
+            catalog = product_catalog.ensure_loaded(cursor)
+            if catalog is None:
+                rows = product_repository.search_products_page(cursor, filters, limit, sort, after)
+                total = product_repository.count_products(cursor, filters)
+                facets = product_repository.get_product_facets(cursor, filters)
+            else:
+                # The catalog picks the page; only those rows are read from the database
+                column, descending = product_repository.PRODUCT_PAGE_SORTS[sort]
+                product_ids = catalog.search(filters, limit, column, descending, after)
+                rows = product_repository.get_products_by_ids(cursor, product_ids)
+                total = catalog.count(filters)
+                facets = catalog.facets(filters)
+
+            items, next_cursor = paginate(rows, limit, sort, lambda row: product_repository.product_page_key(row, sort))
+            return {'items': items, 'next_cursor': next_cursor, 'total': total, 'facets': facets}
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
+    def get_price_stats(self, filters: dict, group_by: str) -> Optional[dict]:
+        """Price count/min/max/mean/percentiles per value of group_by, or None without the catalog."""
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            catalog = product_catalog.ensure_loaded(cursor)
+            return None if catalog is None else catalog.price_stats(filters, group_by)
         except Exception as e:
             print(f"Database error: {e}")
             raise e
@@ -24,13 +95,11 @@ class ProductController:
             connection.close()
 
     def get_product_by_id(self, product_id: int) -> Optional[dict]:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         cursor = connection.cursor(pymysql.cursors.DictCursor)  # Changed from dictionary=True
         
         try:
-            cursor.execute("SELECT * FROM product WHERE productID = %s", (product_id,))
-            product = cursor.fetchone()
-            return product
+            return product_repository.get_product(cursor, product_id)
         except Exception as e:
             print(f"Error fetching product: {e}")
             return None
@@ -39,17 +108,10 @@ class ProductController:
             connection.close()
 
     def get_products_by_store(self, store_id: int) -> List[dict]:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         try:
-            cursor.execute("""
-                SELECT productID, storeID, chain_type, chain_purity, 
-                       chain_thickness, chain_length, chain_color,
-                       chain_weight, set_price
-                FROM product
-                WHERE storeID = %s
-            """, (store_id,))
-            return cursor.fetchall()
+            return product_repository.get_products_by_store(cursor, store_id)
         except Exception as e:
             print(f"Database error: {e}")
             raise e
@@ -58,30 +120,10 @@ class ProductController:
             connection.close()
     
     def get_purchases(self, product_id: int):
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         try:
-            cursor.execute("""
-                SELECT 
-                    CONCAT(
-                        u.first_name, 
-                        ' ', 
-                        LEFT(u.last_name, 1), 
-                        '.'
-                    ) AS full_name, 
-                    ph.latest_price, 
-                    ph.purchase_date
-                FROM 
-                    price_history ph
-                JOIN 
-                    users u ON ph.userID = u.userID
-                WHERE 
-                    ph.productID = %s
-                ORDER BY 
-                    ph.purchase_date DESC
-                LIMIT 5;
-            """, (product_id,))
-            return cursor.fetchall()
+            return product_repository.get_recent_purchases(cursor, product_id)
         except Exception as e:
             print(f"Database error: {e}")
             raise e
@@ -89,35 +131,17 @@ class ProductController:
             cursor.close()
             connection.close()
 
-    def cleanup_price_history(self, product_id: int, connection, cursor):
-        """Helper method to maintain only 5 most recent entries per product"""
+    def get_purchases_for_products(self, product_ids: List[int]) -> Dict[int, List[dict]]:
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
         try:
-            # Get historyIDs of entries to keep
-            cursor.execute("""
-                SELECT historyID 
-                FROM price_history 
-                WHERE productID = %s 
-                ORDER BY purchase_date DESC 
-                LIMIT 5
-            """, (product_id,))
-            keep_ids = [row['historyID'] for row in cursor.fetchall()]
-            
-            if keep_ids:
-                # Delete older entries
-                cursor.execute("""
-                    DELETE FROM price_history 
-                    WHERE productID = %s 
-                    AND historyID NOT IN ({})
-                """.format(','.join(['%s'] * len(keep_ids))), 
-                (product_id, *keep_ids))
-                
-                # Reset auto increment if needed
-                cursor.execute("ALTER TABLE price_history AUTO_INCREMENT = 1")
-                
-                connection.commit()
+            return product_repository.get_recent_purchases_for_products(cursor, product_ids)
         except Exception as e:
-            print(f"Error cleaning up price history: {e}")
-            connection.rollback()
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
 
     def submit_purchase(self, user_id: int, product_id: int, store_id: int, price: float, purchase_date: str):
         connection = get_db_connection()
@@ -126,48 +150,15 @@ class ProductController:
             # Convert ISO datetime string to MySQL datetime format
             formatted_date = purchase_date.replace('T', ' ').replace('Z', '')
             
-            # Check if user already submitted a price for this product today
-            cursor.execute("""
-                SELECT historyID 
-                FROM price_history 
-                WHERE userID = %s 
-                AND productID = %s 
-                AND DATE(purchase_date) = DATE(%s)
-            """, (user_id, product_id, formatted_date))
-            
-            existing_entry = cursor.fetchone()
-            
-            if existing_entry:
-                # Update existing entry
-                cursor.execute("""
-                    UPDATE price_history 
-                    SET latest_price = %s, purchase_date = %s
-                    WHERE historyID = %s
-                """, (price, formatted_date, existing_entry['historyID']))
-            else:
-                # Insert new entry
-                cursor.execute("""
-                    INSERT INTO price_history 
-                    (userID, productID, storeID, latest_price, purchase_date)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (user_id, product_id, store_id, price, formatted_date))
-
-                # Delete oldest entry if more than 5 entries exist for this product
-                cursor.execute("""
-                    DELETE FROM price_history 
-                    WHERE productID = %s 
-                    AND historyID NOT IN (
-                        SELECT historyID FROM (
-                            SELECT historyID 
-                            FROM price_history 
-                            WHERE productID = %s 
-                            ORDER BY purchase_date DESC 
-                            LIMIT 5
-                        ) as latest_five
-                    )
-                """, (product_id, product_id))
-            
+            # A resubmission on the same day replaces the user's earlier price;
+            # trim_price_history.py enforces retention outside the request
+            product_repository.upsert_price_entry(cursor, user_id, product_id, store_id, price, formatted_date)
             connection.commit()
+            # The derived tables are shared by every submission for the product,
+            # so a worker updates them once the price is committed, off the
+            # request and outside its transaction
+            db.after_commit(lambda: background.submit(self.record_purchase, user_id, product_id,
+                                                      formatted_date[:10]))
             return True
 
         except Exception as e:
@@ -176,4 +167,42 @@ class ProductController:
             return False
         finally:
             cursor.close()
-            connection.close()
\ No newline at end of file
+            connection.close()
+
+    def record_purchase(self, user_id: int, product_id: int, day: str) -> None:
+        """Re-score the product's deal and bring the user's price for the day into the market index.
+
+        The price_history row records the price per gram it is counted with
+        (indexed_ppg), so a same-day resubmission takes exactly that
+        observation back out. The row is locked while it is reconciled, so
+        concurrent resubmissions are applied one at a time, and running this
+        twice changes nothing. Runs on a background worker in a short
+        transaction of its own. best_deals.py and market_index.py rebuild
+        both tables from price_history if it fails or is dropped.
+        """
+        connection = db.get_standalone_connection()
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            deal_controller.refresh_products(cursor, [product_id])
+
+            entry = market_repository.lock_price_observation(cursor, user_id, product_id, day)
+            product = entry and product_repository.get_product(cursor, product_id)
+            if product:
+                ppg = market_repository.price_per_gram(entry['latest_price'], product['chain_weight'])
+                counted = entry['indexed_ppg']
+                if ppg != counted:
+                    segment = market_repository.observation_segment(product)
+                    if counted is not None:
+                        market_repository.retract_observation(cursor, day, segment, counted)
+                    if ppg is not None:
+                        market_repository.record_observations(cursor, [(day, segment, ppg)])
+                    market_repository.set_indexed_ppg(cursor, entry['historyID'], ppg)
+                    table_versions.mark_changed(cursor, 'market_price')
+            connection.commit()
+        except Exception as e:
+            logger.error(f"Updating deals and the market index for product {product_id} failed: {e}")
+            connection.rollback()
+        finally:
+            cursor.close()
+            connection.close()
+            table_versions.invalidate()
@@ -1,29 +1,37 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
 import pymysql
+import db
+from config import Config
+from controllers.deal_controller import DealController
+from controllers.leaderboard_controller import LeaderboardController
 from db import get_db_connection
+from indexes import store_hours, store_locations, store_search, suggestions, table_versions
+from repositories import product_repository, store_repository, rating_repository
+from utils.store_import import chunks, validate_store
+from utils.pagination import paginate
 import logging
 
 logger = logging.getLogger(__name__)
+deal_controller = DealController()
+leaderboard_controller = LeaderboardController()
+
+# Sections GET /api/stores/<id>/full can return besides the store itself
+STORE_FULL_SECTIONS = ('hours', 'products', 'ratings', 'user_rating')
 
 class StoreController:
     def __init__(self):
         # Temporary in-memory storage until database is set up
         self.stores = []
 
-    def get_all_stores(self) -> List[dict]:
-        connection = get_db_connection()
+    def get_all_stores(self, open_at: Optional[datetime] = None) -> List[dict]:
+        connection = get_db_connection(read_only=True)
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         try:
-            cursor.execute("""
-                SELECT s.storeID, s.ownerID, s.store_name, s.rating, 
-                       s.address, s.latitude, s.longitude, s.phone, s.email,
-                       COUNT(u.rating) as rating_count
-                FROM store s
-                JOIN store_owners o ON s.ownerID = o.ownerID
-                LEFT JOIN user_update u ON s.storeID = u.storeID
-                GROUP BY s.storeID
-            """)
-            stores = cursor.fetchall()
+            stores = store_repository.get_all_stores(cursor)
+            if open_at is not None:
+                open_ids = store_hours.open_at(cursor, open_at)
+                stores = [store for store in stores if store['storeID'] in open_ids]
             return stores
         except Exception as e:
             print(f"Database error: {e}")
@@ -32,34 +40,37 @@ class StoreController:
             cursor.close()
             connection.close()
 
+    def get_stores_page(self, limit: int, sort: str = 'id', after: Optional[tuple] = None,
+                        open_at: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of stores and the cursor for the next page (None on the last)."""
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        key = lambda row: store_repository.store_page_key(row, sort)
+        try:
+            # The open stores go into the page query, so pages stay full in one round trip
+            open_ids = None if open_at is None else store_hours.open_at(cursor, open_at)
+            rows = store_repository.get_stores_page(cursor, limit, sort, after, store_ids=open_ids)
+            return paginate(rows, limit, sort, key)
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
     def get_store_by_id(self, storeID: int) -> Optional[dict]:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if connection is None:
             raise Exception("Database connection failed")
             
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         try:
             # Get store details
-            cursor.execute("""
-                SELECT s.storeID, s.ownerID, s.store_name, s.rating,
-                       s.address, s.latitude, s.longitude, s.phone, s.email
-                FROM store s
-                WHERE s.storeID = %s
-            """, (storeID,))
-            store = cursor.fetchone()
+            store = store_repository.get_store(cursor, storeID)
             
             if store:
                 # Get store hours
-                cursor.execute("""
-                    SELECT storeHourID, storeID, daysOpen,
-                           TIME_FORMAT(openTime, '%h:%i %p') as openTime,
-                           TIME_FORMAT(closeTime, '%h:%i %p') as closeTime
-                    FROM store_hours
-                    WHERE storeID = %s
-                    ORDER BY FIELD(daysOpen, 'Monday', 'Tuesday', 'Wednesday',
-                                 'Thursday', 'Friday', 'Saturday', 'Sunday')
-                """, (storeID,))
-                store['hours'] = cursor.fetchall()
+                store['hours'] = store_repository.get_formatted_store_hours(cursor, storeID)
             
             return store
             
@@ -70,34 +81,126 @@ class StoreController:
             cursor.close()
             connection.close()
 
+    def get_nearby_stores(self, lat: float, lng: float, radius_km: Optional[float] = None,
+                          k: Optional[int] = None, open_at: Optional[datetime] = None) -> List[dict]:
+        """Stores closest to (lat, lng), nearest first, each with a distance_km."""
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            accept = None
+            if open_at is not None:
+                accept = store_hours.open_at(cursor, open_at).__contains__
+            matches = store_locations.nearby(cursor, lat, lng, radius_km=radius_km, k=k, accept=accept)
+            distances = {store_id: distance for distance, store_id in matches}
+            stores = store_repository.get_stores_by_ids(cursor, [store_id for _, store_id in matches])
+            for store in stores:
+                store['distance_km'] = round(distances[store['storeID']], 3)
+            return stores
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
+    def search_stores(self, text: str, limit: int, min_rating: Optional[float] = None,
+                      near: Optional[tuple] = None, sort: str = 'relevance') -> List[dict]:
+        """Stores whose name or address resembles text, each with a similarity.
+
+        near is (lat, lng, radius_km): matches are limited to the radius and
+        get a distance_km. sort is relevance, rating or distance; the best
+        STORE_SEARCH_MAX_CANDIDATES matches are re-ranked for the last two.
+        """
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            # Filters reject candidates inside the index scan, so they never
+            # use up STORE_SEARCH_MAX_CANDIDATES
+            distance = None
+            filters = []
+            if near is not None:
+                lat, lng, radius_km = near
+                locations = store_locations.ensure_loaded(cursor)
+                distance = lambda store_id: locations.distance_km(store_id, lat, lng)
+                filters.append(lambda store_id: (distance(store_id) is not None
+                                                 and distance(store_id) <= radius_km))
+            if min_rating is not None:
+                filters.append(store_repository.get_store_ids_with_min_rating(cursor, min_rating).__contains__)
+            accept = (lambda store_id: all(f(store_id) for f in filters)) if filters else None
+            matches = store_search.search(cursor, text, Config.STORE_SEARCH_THRESHOLD,
+                                          limit=Config.STORE_SEARCH_MAX_CANDIDATES, accept=accept)
+            if matches is None:
+                # No index in this process: plain substring matches, unranked
+                store_ids = store_repository.search_stores_like(cursor, text, Config.STORE_SEARCH_MAX_CANDIDATES)
+                matches = [(None, store_id) for store_id in store_ids if accept is None or accept(store_id)]
+
+            similarity = {store_id: score for score, store_id in matches}
+            stores = store_repository.get_stores_by_ids(cursor, [store_id for _, store_id in matches])
+            for store in stores:
+                store['similarity'] = similarity[store['storeID']]
+                if distance is not None:
+                    store['distance_km'] = round(distance(store['storeID']), 3)
+
+            if sort == 'rating':
+                stores.sort(key=lambda store: -float(store['rating'] or 0))
+            elif sort == 'distance':
+                stores.sort(key=lambda store: store['distance_km'])
+            return stores[:limit]
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
+    def get_store_full(self, storeID: int, include: set, userID: Optional[int] = None) -> Optional[dict]:
+        """Store page data in one pass over one connection.
+
+        include selects any of STORE_FULL_SECTIONS. The store row and its
+        rating histogram come from a single query; each other section adds at
+        most one more.
+        """
+        connection = get_db_connection(read_only=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            store = store_repository.get_store_detail(cursor, storeID)
+            if store is None:
+                return None
+
+            distribution = {star: int(store.pop(f'count_{star}')) for star in range(1, 6)}
+            result = {'store': store}
+            if 'hours' in include:
+                store['hours'] = store_repository.get_formatted_store_hours(cursor, storeID)
+            if 'products' in include:
+                result['products'] = product_repository.get_products_by_store(cursor, storeID)
+            if 'ratings' in include:
+                result['ratings'] = {'rating_count': store['rating_count'], 'distribution': distribution}
+            if 'user_rating' in include and userID is not None:
+                row = rating_repository.get_user_rating(cursor, storeID, userID)
+                result['user_rating'] = float(row['rating']) if row else 0
+            return result
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            cursor.close()
+            connection.close()
+
     def create_store(self, store_data: dict) -> dict:
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         
         try:
-            cursor.execute("""
-                INSERT INTO store (ownerID, store_name, rating, address, 
-                                 latitude, longitude, phone, email)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                store_data['ownerID'],
-                store_data['store_name'],
-                store_data['rating'],
-                store_data['address'],
-                store_data['latitude'],
-                store_data['longitude'],
-                store_data['phone'],
-                store_data['email']
-            ))
-            
+            store_id = store_repository.insert_store(cursor, store_data, rating=store_data['rating'])
+            table_versions.mark_changed(cursor, 'store')
             connection.commit()
-            store_id = cursor.lastrowid
+            db.after_commit(lambda: store_locations.update_store(
+                store_id, store_data['latitude'], store_data['longitude']))
+            db.after_commit(lambda: store_search.update_store(
+                store_id, store_data['store_name'], store_data['address']))
+            db.after_commit(lambda: suggestions.update_store(store_id, store_data['store_name']))
             
-            cursor.execute("""
-                SELECT * FROM store WHERE storeID = %s
-            """, (store_id,))
-            
-            return cursor.fetchone()
+            return store_repository.get_store_row(cursor, store_id)
             
         except Exception as e:
             print(f"Database error: {e}")
@@ -106,33 +209,98 @@ class StoreController:
             cursor.close()
             connection.close()
 
+    def import_stores(self, records: Iterable[Tuple[int, object]], chunk_size: int,
+                      owns: Callable[[int], bool] = lambda owner_id: True) -> dict:
+        """Bulk-insert parsed (record number, store or error) pairs.
+
+        Each chunk of valid stores and their hours is inserted and committed
+        on its own, so locks are held for one chunk at a time. A chunk that
+        fails is retried one record at a time. Records whose ownerID fails
+        owns are reported as errors. Returns counts and a result per record.
+        """
+        results = []
+        created = 0
+        connection = db.get_standalone_connection()
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        try:
+            for chunk in chunks(records, chunk_size):
+                valid = []
+                for number, record in chunk:
+                    try:
+                        if isinstance(record, str):
+                            raise ValueError(record)
+                        store = validate_store(record)
+                        if not owns(store['ownerID']):
+                            raise ValueError(f"Not allowed to add stores for owner {store['ownerID']}")
+                        valid.append((number, store))
+                    except ValueError as e:
+                        results.append({'record': number, 'status': 'error', 'error': str(e)})
+                if not valid:
+                    continue
+                try:
+                    inserted = list(zip(valid, self._insert_import_chunk(connection, cursor, valid)))
+                except Exception as e:
+                    # Retry record by record so the report blames only the records at fault
+                    logger.error(f"Store import chunk failed, retrying it one record at a time: {e}")
+                    inserted = []
+                    for pair in valid:
+                        try:
+                            inserted.append((pair, self._insert_import_chunk(connection, cursor, [pair])[0]))
+                        except Exception as record_error:
+                            results.append({'record': pair[0], 'status': 'error',
+                                            'error': f"Database error: {record_error}"})
+                created += len(inserted)
+                results.extend({'record': number, 'status': 'created', 'storeID': store_id}
+                               for (number, _), store_id in inserted)
+            return {'created': created, 'failed': len(results) - created,
+                    'results': sorted(results, key=lambda result: result['record'])}
+        finally:
+            cursor.close()
+            connection.close()
+            # Imported stores reach the in-process indexes on their next load
+            table_versions.invalidate()
+            store_locations.invalidate()
+            store_hours.invalidate()
+            store_search.invalidate()
+            suggestions.invalidate()
+
+    def _insert_import_chunk(self, connection, cursor, valid: List[tuple]) -> List[int]:
+        """Insert (record number, store) pairs and their hours in one transaction. Returns the storeIDs."""
+        try:
+            store_ids = store_repository.insert_stores(cursor, [store for _, store in valid])
+            store_repository.insert_hours_for_stores(cursor, [
+                (store_id, hour['daysOpen'], hour['openTime'], hour['closeTime'])
+                for store_id, (_, store) in zip(store_ids, valid)
+                for hour in store['hours']
+            ])
+            table_versions.bump(cursor, 'store', 'store_hours')
+            connection.commit()
+            return store_ids
+        except Exception:
+            connection.rollback()
+            raise
+
     def update_store_rating(self, storeID: int) -> None:
-        """Calculate and update store rating based on user reviews"""
+        """Refresh the store's average rating from its stored rating aggregates"""
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         
         try:
-            # Calculate new average rating
-            cursor.execute("""
-                SELECT COUNT(*) as rating_count, 
-                       COALESCE(ROUND(AVG(rating), 2), 0.00) as avg_rating
-                FROM user_update
-                WHERE storeID = %s AND rating IS NOT NULL
-            """, (storeID,))
-            
-            result = cursor.fetchone()
+            # Read the maintained sum/count instead of re-running AVG()
+            result = rating_repository.get_rating_summary(cursor, storeID)
             rating_count = result['rating_count']
             avg_rating = float(result['avg_rating'])
             
             logger.info(f"Calculated new rating for store {storeID}: {avg_rating} from {rating_count} ratings")
 
             # Update store rating
-            cursor.execute("""
-                UPDATE store
-                SET rating = %s
-                WHERE storeID = %s
-            """, (avg_rating, storeID))
+            store_repository.update_store_rating(cursor, storeID, avg_rating)
+            # The rating feeds the best-deal score of every product in the store
+            deal_controller.refresh_store(cursor, storeID)
+            leaderboard_controller.refresh_stores(cursor, [storeID])
             
+            table_versions.mark_changed(cursor, 'store')
+            db.after_commit(lambda: suggestions.set_store_popularity(storeID, int(rating_count)))
             connection.commit()
             logger.info(f"Updated store {storeID} rating to {avg_rating}")
 
@@ -145,26 +313,13 @@ class StoreController:
             connection.close()
 
     def get_store_hours(self, storeID: int) -> List[dict]:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if connection is None:
             raise Exception("Database connection failed")
             
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         try:
-            cursor.execute("""
-                SELECT 
-                    storeHourID,
-                    storeID,
-                    daysOpen,
-                    openTime,
-                    closeTime
-                FROM store_hours 
-                WHERE storeID = %s 
-                ORDER BY FIELD(daysOpen, 'Monday', 'Tuesday', 'Wednesday',
-                             'Thursday', 'Friday', 'Saturday', 'Sunday')
-            """, (storeID,))
-            
-            hours = cursor.fetchall()
+            hours = store_repository.get_store_hours(cursor, storeID)
             
             # Convert time objects to strings without formatting
             formatted_hours = []
@@ -187,4 +342,4 @@ class StoreController:
             raise e
         finally:
             cursor.close()
-            connection.close()
\ No newline at end of file
+            connection.close()
@@ -0,0 +1,33 @@
+from typing import List, Optional
+import pymysql
+import pymysql.cursors
+from db import get_db_connection
+from indexes import suggestions
+from repositories.product_repository import SUGGEST_ATTRIBUTES
+
+SUGGEST_TYPES = ('store',) + SUGGEST_ATTRIBUTES
+
+class SuggestController:
+    def suggest(self, prefix: str, limit: int, types: Optional[frozenset] = None) -> List[dict]:
+        """Most popular store names and attribute values with a word starting with prefix."""
+        index = suggestions.current()
+        if index is None:
+            # Only a cold or expired index costs a connection
+            connection = get_db_connection(read_only=True)
+            cursor = connection.cursor(pymysql.cursors.DictCursor)
+            try:
+                index = suggestions.ensure_loaded(cursor)
+            except Exception as e:
+                print(f"Database error: {e}")
+                raise e
+            finally:
+                cursor.close()
+                connection.close()
+
+        results = []
+        for kind, key, label, weight in index.suggest(prefix, limit, types):
+            result = {'type': kind, 'value': label, 'weight': weight}
+            if kind == 'store':
+                result['storeID'] = key
+            results.append(result)
+        return results
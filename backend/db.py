@@ -1,11 +1,342 @@
+import logging
+import threading
+import time
 import pymysql
+from flask import current_app, g, has_request_context, jsonify, request, session
+from pymysql.constants import SERVER_STATUS
 from config import Config
+from utils.db_pool import ConnectionPool
+from utils.replica_router import Replica, ReplicaRouter, parse_replicas
+from utils.query_stats import InstrumentedCursor, QueryRecorder
+from utils import sqlite_backend
 
-def get_db_connection():
+logger = logging.getLogger(__name__)
+
+_pool = None
+_replica_router = None
+_pool_lock = threading.Lock()
+
+READ_METHODS = ('GET', 'HEAD')
+
+def _uses_sqlite() -> bool:
+    return Config.DB_BACKEND == 'sqlite'
+
+def _connect(host=None, port=None):
+    if _uses_sqlite():
+        return sqlite_backend.connect(Config.SQLITE_PATH)
     return pymysql.connect(
-        host=Config.MYSQL_HOST,
+        host=host or Config.MYSQL_HOST,
+        port=port or Config.MYSQL_PORT,
         user=Config.MYSQL_USER,
         password=Config.MYSQL_PASSWORD,
         database=Config.MYSQL_DB,
         cursorclass=pymysql.cursors.DictCursor
-    )    
\ No newline at end of file
+    )
+
+def _reset(connection):
+    # Only pay for a ROLLBACK round trip when a transaction is actually open
+    if _uses_sqlite():
+        if connection.in_transaction:
+            connection.rollback()
+    elif connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+        connection.rollback()
+
+def _replica_lag(connection):
+    """Seconds behind the source, 0 for a server that is not replicating, None if replication is broken."""
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except pymysql.err.MySQLError:
+            # MySQL < 8.0.22 / MariaDB
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+    finally:
+        cursor.close()
+    if not status:
+        return 0
+    lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    return None if lag is None else float(lag)
+
+def _make_pool(factory) -> ConnectionPool:
+    return ConnectionPool(
+        factory,
+        min_size=Config.MYSQL_POOL_MIN_SIZE,
+        max_size=Config.MYSQL_POOL_MAX_SIZE,
+        timeout=Config.MYSQL_POOL_TIMEOUT,
+        max_lifetime=Config.MYSQL_POOL_MAX_LIFETIME,
+        ping_interval=Config.MYSQL_POOL_PING_INTERVAL,
+        reset=_reset
+    )
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if _uses_sqlite() and Config.SQLITE_AUTO_MIGRATE:
+                    _migrate_sqlite()
+                _pool = _make_pool(_connect)
+    return _pool
+
+def _migrate_sqlite():
+    """Create the schema in the embedded database from the same migration files."""
+    from migrate import migrate
+    connection = _connect()
+    try:
+        migrate(connection)
+    finally:
+        connection.close()
+
+def get_replica_router() -> ReplicaRouter:
+    global _replica_router
+    if _replica_router is None:
+        with _pool_lock:
+            if _replica_router is None:
+                replicas = [] if _uses_sqlite() else [
+                    Replica(f"{host}:{port}", _make_pool(lambda host=host, port=port: _connect(host, port)))
+                    for host, port in parse_replicas(Config.MYSQL_REPLICAS, Config.MYSQL_PORT)
+                ]
+                _replica_router = ReplicaRouter(
+                    replicas,
+                    lag_of=_replica_lag,
+                    strategy=Config.MYSQL_REPLICA_STRATEGY,
+                    max_lag=Config.MYSQL_REPLICA_MAX_LAG,
+                    lag_check_interval=Config.MYSQL_REPLICA_LAG_CHECK_INTERVAL,
+                    retry_after=Config.MYSQL_REPLICA_RETRY_AFTER
+                )
+    return _replica_router
+
+def _borrow(read_only: bool):
+    if read_only:
+        connection = get_replica_router().get()
+        if connection is not None:
+            return connection
+    return get_pool().get()
+
+def close_pools():
+    """Close every pooled connection; the pools are rebuilt from Config on next use."""
+    global _pool, _replica_router
+    with _pool_lock:
+        pool, router = _pool, _replica_router
+        _pool, _replica_router = None, None
+    if pool is not None:
+        pool.close()
+    if router is not None:
+        for replica in router.replicas:
+            replica.pool.close()
+
+def get_pool_stats() -> dict:
+    return {
+        'primary': get_pool().stats(),
+        'replicas': get_replica_router().stats(),
+    }
+
+class RequestConnection:
+    """Connection shared by every controller call made while handling one request.
+
+    begin(), commit() and close() are deferred to the end of the request so a
+    multi-step handler runs on one connection inside one transaction and
+    commits at most once. rollback() is applied immediately.
+    """
+
+    def __init__(self, connection, read_only: bool = False, recorder: QueryRecorder = None):
+        self._connection = connection
+        self.read_only = read_only
+        self.recorder = recorder
+        self.commit_requested = False
+        self.finished = False
+        self._before_commit = []
+        self._after_commit = []
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._connection.cursor(*args, **kwargs)
+        if self.recorder is None:
+            return cursor
+        return InstrumentedCursor(cursor, self.recorder)
+
+    def begin(self):
+        # The request already is the transaction; BEGIN would implicitly commit it
+        pass
+
+    def commit(self):
+        self.commit_requested = True
+
+    def rollback(self):
+        self.commit_requested = False
+        self._before_commit = []
+        self._after_commit = []
+        self._connection.rollback()
+
+    def before_commit(self, callback) -> bool:
+        """Run callback(cursor) as the last statements of the unit of work, once however often registered.
+
+        Returns False once the unit of work has finished.
+        """
+        if self.finished:
+            return False
+        if callback not in self._before_commit:
+            self._before_commit.append(callback)
+        return True
+
+    def _run_before_commit(self):
+        callbacks, self._before_commit = self._before_commit, []
+        cursor = self.cursor()
+        try:
+            for callback in callbacks:
+                callback(cursor)
+        finally:
+            cursor.close()
+
+    def after_commit(self, callback):
+        """Run callback once the unit of work has been committed, or right away once it has finished."""
+        if self.finished:
+            callback()
+        else:
+            self._after_commit.append(callback)
+
+    def _run_after_commit(self):
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in after-commit callback: {e}")
+
+    def close(self):
+        pass
+
+    def finish(self, commit: bool):
+        """Commit or roll back the unit of work. Returns True if a commit was issued."""
+        self.finished = True
+        if commit and self.commit_requested:
+            self.commit_requested = False
+            # A failure here propagates and the request is rolled back
+            self._run_before_commit()
+            started = time.perf_counter()
+            self._connection.commit()
+            if self.recorder is not None:
+                self.recorder.record('COMMIT', time.perf_counter() - started, 0)
+            self._run_after_commit()
+            return True
+        if self.commit_requested:
+            self.rollback()
+        return False
+
+    def release(self):
+        self._connection.close()
+
+def _request_is_read_only() -> bool:
+    if request.method not in READ_METHODS:
+        return False
+    # Read-your-writes: keep a client on the primary for a while after it writes
+    last_write = session.get('last_write_at')
+    return last_write is None or time.time() - last_write > Config.READ_YOUR_WRITES_WINDOW
+
+def get_db_connection(read_only: bool = False):
+    """Return the connection for the current request, or a pooled one outside a request.
+
+    Inside a request every call returns the same connection; calling close()
+    on it is a no-op and the transaction is committed once the handler
+    returns. GET requests are served from a read replica when one is
+    configured and healthy. Outside a request close() returns the
+    connection to the pool and read_only=True routes to a replica.
+    """
+    if has_request_context():
+        connection = g.get('db_connection')
+        if connection is None:
+            use_replica = _request_is_read_only()
+            connection = RequestConnection(_borrow(use_replica), read_only=use_replica,
+                                           recorder=g.get('query_recorder'))
+            g.db_connection = connection
+        return connection
+    return _borrow(read_only)
+
+def get_standalone_connection():
+    """A pooled primary connection outside the request's unit of work.
+
+    For jobs such as bulk imports that must commit in bounded batches of
+    their own; close() returns it to the pool.
+    """
+    return _borrow(False)
+
+def before_commit(callback) -> bool:
+    """Defer callback(cursor) to just before the current request commits.
+
+    Returns False outside a request or once it has committed (in after-commit
+    work on a connection of its own), where there is no unit of work to
+    defer to and the caller has to run the statements itself.
+    """
+    connection = g.get('db_connection') if has_request_context() else None
+    if connection is None:
+        return False
+    return connection.before_commit(callback)
+
+def after_commit(callback):
+    """Run callback after the current request commits, or right away outside a request.
+
+    Used to keep in-process indexes in step with writes without exposing
+    rows that may still be rolled back.
+    """
+    connection = g.get('db_connection') if has_request_context() else None
+    if connection is None:
+        callback()
+    else:
+        connection.after_commit(callback)
+
+def _start_query_recorder():
+    g.query_recorder = QueryRecorder(
+        label=f"{request.method} {request.path}",
+        slow_query_ms=Config.SQL_SLOW_QUERY_MS,
+        n_plus_one_threshold=Config.SQL_N_PLUS_ONE_THRESHOLD
+    )
+
+def _add_server_timing(response):
+    recorder = g.get('query_recorder')
+    if recorder is not None and recorder.queries and Config.SQL_SERVER_TIMING:
+        response.headers.add('Server-Timing', recorder.server_timing())
+    return response
+
+def _finish_request(response):
+    connection = g.get('db_connection')
+    if connection is None:
+        return response
+    try:
+        committed = connection.finish(commit=response.status_code < 500)
+    except Exception as e:
+        logger.error(f"Error committing request transaction: {e}")
+        try:
+            connection.rollback()
+        except Exception:
+            pass
+        # after_request hooks must return a response object, not a (body, status) tuple
+        response = jsonify({'error': str(e)})
+        response.status_code = 500
+        return response
+    if committed and current_app.secret_key:
+        session['last_write_at'] = time.time()
+    return response
+
+def _release_request_connection(exc=None):
+    connection = g.pop('db_connection', None)
+    if connection is None:
+        return
+    try:
+        if connection.commit_requested:
+            # The handler raised before after_request could commit
+            connection.rollback()
+    except Exception as e:
+        logger.error(f"Error rolling back request transaction: {e}")
+    finally:
+        connection.release()
+
+def init_app(app):
+    """Bind the request-scoped unit of work and query stats to the app's request lifecycle."""
+    app.before_request(_start_query_recorder)
+    # after_request hooks run in reverse order: commit first, then report timings
+    app.after_request(_add_server_timing)
+    app.after_request(_finish_request)
+    app.teardown_request(_release_request_connection)
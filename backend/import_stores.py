@@ -0,0 +1,40 @@
+import argparse
+import json
+import sys
+import logging
+from config import Config
+from controllers.store_controller import StoreController
+from utils.store_import import parse_csv, parse_ndjson
+
+logging.basicConfig(level=logging.INFO)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import stores and their hours from NDJSON or CSV")
+    parser.add_argument('path', help="input file, or - for stdin")
+    parser.add_argument('--format', choices=('ndjson', 'csv'),
+                        help="defaults to csv for .csv files, otherwise ndjson")
+    parser.add_argument('--chunk-size', type=int, default=Config.IMPORT_CHUNK_SIZE)
+    parser.add_argument('--report', help="write the per-record results here as NDJSON")
+    args = parser.parse_args()
+
+    fmt = args.format or ('csv' if args.path.endswith('.csv') else 'ndjson')
+    source = sys.stdin if args.path == '-' else open(args.path, newline='', encoding='utf-8')
+    try:
+        records = parse_csv(source) if fmt == 'csv' else parse_ndjson(source)
+        # Same cap as the HTTP import: a chunk is one transaction holding its locks
+        chunk_size = max(1, min(args.chunk_size, Config.IMPORT_CHUNK_SIZE))
+        report = StoreController().import_stores(records, chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            for result in report['results']:
+                f.write(json.dumps(result) + '\n')
+    else:
+        for result in report['results']:
+            if result['status'] == 'error':
+                print(f"record {result['record']}: {result['error']}")
+    print(f"Created {report['created']} store(s), {report['failed']} failed")
+    sys.exit(1 if report['failed'] else 0)
@@ -0,0 +1,56 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+from config import Config
+from repositories import product_repository
+
+try:
+    from utils.columnar_catalog import ColumnarCatalog
+except ImportError:  # numpy not installed: search and stats fall back to SQL
+    ColumnarCatalog = None
+
+# Process-wide columnar snapshot of the product table, loaded and refreshed
+# like store_locations and patched after each committed product write
+_catalog = ColumnarCatalog() if ColumnarCatalog is not None else None
+_loaded_at = None
+_lock = threading.Lock()
+
+def available() -> bool:
+    return _catalog is not None and Config.PRODUCT_CATALOG_ENABLED
+
+def _is_fresh() -> bool:
+    return _loaded_at is not None and time.monotonic() - _loaded_at < Config.STORE_INDEX_REFRESH_SECONDS
+
+def ensure_loaded(cursor) -> Optional['ColumnarCatalog']:
+    """The loaded catalog, or None when it is unavailable in this process."""
+    global _loaded_at
+    if not available():
+        return None
+    if _is_fresh():
+        return _catalog
+    with _lock:
+        if not _is_fresh():
+            started = time.monotonic()
+            _catalog.rebuild(product_repository.get_all_products(cursor))
+            _loaded_at = time.monotonic()
+            logging.info("Loaded %d products into the catalog in %.0f ms",
+                         len(_catalog), (_loaded_at - started) * 1000)
+    return _catalog
+
+def update_product(row: dict) -> None:
+    """Apply a committed product insert or update; a no-op until the catalog has been loaded."""
+    if _loaded_at is not None and available():
+        _catalog.upsert(row)
+
+def update_products(rows: List[dict]) -> None:
+    for row in rows:
+        update_product(row)
+
+def remove_product(product_id: int) -> None:
+    if _loaded_at is not None and available():
+        _catalog.remove(product_id)
+
+def invalidate() -> None:
+    global _loaded_at
+    _loaded_at = None
@@ -0,0 +1,53 @@
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Set
+from zoneinfo import ZoneInfo
+from config import Config
+from repositories import store_repository
+from utils.hours_index import WeeklyHoursIndex
+
+# Process-wide open-hours index, loaded and refreshed like store_locations
+_index = WeeklyHoursIndex()
+_loaded_at = None
+_lock = threading.Lock()
+
+def _is_fresh() -> bool:
+    return _loaded_at is not None and time.monotonic() - _loaded_at < Config.STORE_INDEX_REFRESH_SECONDS
+
+def ensure_loaded(cursor) -> WeeklyHoursIndex:
+    global _loaded_at
+    if _is_fresh():
+        return _index
+    with _lock:
+        if not _is_fresh():
+            hours_by_store = {}
+            for row in store_repository.get_all_store_hours(cursor):
+                hours_by_store.setdefault(row['storeID'], []).append(row)
+            _index.rebuild(hours_by_store)
+            _loaded_at = time.monotonic()
+    return _index
+
+def local_time(moment: Optional[datetime] = None) -> datetime:
+    """`moment` (default now) as naive wall-clock time in STORE_TIMEZONE.
+
+    Naive datetimes are taken to already be store-local.
+    """
+    zone = ZoneInfo(Config.STORE_TIMEZONE) if Config.STORE_TIMEZONE else None
+    if moment is None:
+        return datetime.now(zone).replace(tzinfo=None)
+    if moment.tzinfo is not None:
+        return moment.astimezone(zone).replace(tzinfo=None)
+    return moment
+
+def open_at(cursor, moment: datetime) -> Set[int]:
+    return ensure_loaded(cursor).open_at(local_time(moment))
+
+def update_store(store_id: int, hours: List[dict]) -> None:
+    """Apply a committed hours write; a no-op until the index has been loaded."""
+    if _loaded_at is not None:
+        _index.set_hours(store_id, hours)
+
+def invalidate() -> None:
+    global _loaded_at
+    _loaded_at = None
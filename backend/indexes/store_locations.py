@@ -0,0 +1,45 @@
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+from config import Config
+from repositories import store_repository
+from utils.geo_index import GeoIndex
+
+# Process-wide spatial index over store coordinates. It is loaded from the
+# database on first use, patched after each committed store write in this
+# process, and reloaded every STORE_INDEX_REFRESH_SECONDS to pick up writes
+# made by other workers.
+_index = GeoIndex(cell_degrees=Config.GEO_INDEX_CELL_DEGREES)
+_loaded_at = None
+_lock = threading.Lock()
+
+def _is_fresh() -> bool:
+    return _loaded_at is not None and time.monotonic() - _loaded_at < Config.STORE_INDEX_REFRESH_SECONDS
+
+def ensure_loaded(cursor) -> GeoIndex:
+    global _loaded_at
+    if _is_fresh():
+        return _index
+    with _lock:
+        if not _is_fresh():
+            rows = store_repository.get_store_locations(cursor)
+            _index.rebuild((row['storeID'], row['latitude'], row['longitude']) for row in rows)
+            _loaded_at = time.monotonic()
+    return _index
+
+def nearby(cursor, lat: float, lng: float, radius_km: Optional[float] = None,
+           k: Optional[int] = None, accept: Optional[Callable[[int], bool]] = None) -> List[Tuple[float, int]]:
+    return ensure_loaded(cursor).nearby(lat, lng, radius_km=radius_km, k=k, accept=accept)
+
+def update_store(store_id: int, lat, lng) -> None:
+    """Apply a committed store write; a no-op until the index has been loaded."""
+    if _loaded_at is None:
+        return
+    if lat is None or lng is None:
+        _index.remove(store_id)
+    else:
+        _index.upsert(store_id, lat, lng)
+
+def invalidate() -> None:
+    global _loaded_at
+    _loaded_at = None
@@ -0,0 +1,56 @@
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+from config import Config
+from repositories import store_repository
+
+try:
+    from utils.trigram_index import TrigramIndex
+except ImportError:  # numpy not installed: search falls back to SQL LIKE
+    TrigramIndex = None
+
+# Process-wide trigram index over store names and addresses, loaded like
+# store_locations and patched after each committed store write in this
+# process. A name match counts slightly more than the same address match.
+_index = TrigramIndex(weights=(1.0, 0.9)) if TrigramIndex is not None else None
+_loaded_at = None
+_lock = threading.Lock()
+
+def available() -> bool:
+    return _index is not None
+
+def _is_fresh() -> bool:
+    return _loaded_at is not None and time.monotonic() - _loaded_at < Config.STORE_SEARCH_REFRESH_SECONDS
+
+def ensure_loaded(cursor) -> Optional['TrigramIndex']:
+    """The loaded index, or None when it is unavailable in this process."""
+    global _loaded_at
+    if not available():
+        return None
+    if _is_fresh():
+        return _index
+    with _lock:
+        if not _is_fresh():
+            started = time.monotonic()
+            rows = store_repository.get_store_search_text(cursor)
+            _index.rebuild((row['storeID'], row['store_name'], row['address']) for row in rows)
+            _loaded_at = time.monotonic()
+            logging.info("Loaded %d stores into the search index in %.0f ms",
+                         len(_index), (_loaded_at - started) * 1000)
+    return _index
+
+def search(cursor, text: str, threshold: float, limit: Optional[int] = None,
+           accept: Optional[Callable[[int], bool]] = None) -> Optional[List[Tuple[float, int]]]:
+    """(similarity, storeID) pairs, most similar first, or None without the index."""
+    index = ensure_loaded(cursor)
+    return None if index is None else index.search(text, threshold, limit=limit, accept=accept)
+
+def update_store(store_id: int, name: str, address: str) -> None:
+    """Apply a committed store write; a no-op until the index has been loaded."""
+    if _loaded_at is not None and available():
+        _index.upsert(store_id, name, address)
+
+def invalidate() -> None:
+    global _loaded_at
+    _loaded_at = None
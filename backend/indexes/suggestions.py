@@ -0,0 +1,59 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+from config import Config
+from repositories import product_repository, store_repository
+from utils.prefix_index import PrefixIndex
+
+# Process-wide typeahead index: store names weighted by rating count and
+# product attribute values weighted by product count. Loaded like the other
+# indexes and patched after each committed write in this process.
+_index = PrefixIndex(cache_depth=Config.SUGGEST_MAX_LIMIT)
+_loaded_at = None
+_lock = threading.Lock()
+
+def _is_fresh() -> bool:
+    return _loaded_at is not None and time.monotonic() - _loaded_at < Config.SUGGEST_REFRESH_SECONDS
+
+def current() -> Optional[PrefixIndex]:
+    """The index if it is loaded and fresh, so lookups can skip the database entirely."""
+    return _index if _is_fresh() else None
+
+def ensure_loaded(cursor) -> PrefixIndex:
+    global _loaded_at
+    if _is_fresh():
+        return _index
+    with _lock:
+        if not _is_fresh():
+            started = time.monotonic()
+            stores = store_repository.get_store_suggestions(cursor)
+            values = product_repository.get_product_value_counts(cursor)
+            _index.rebuild([('store', row['storeID'], row['store_name'], int(row['rating_count'])) for row in stores] +
+                           [(row['attribute'], row['value'], row['value'], int(row['product_count']))
+                            for row in values if row['value']])
+            _loaded_at = time.monotonic()
+            logging.info("Loaded %d suggestions in %.0f ms", len(_index), (_loaded_at - started) * 1000)
+    return _index
+
+def update_store(store_id: int, name: str) -> None:
+    """Apply a committed store insert or rename; a no-op until the index has been loaded."""
+    if _loaded_at is not None:
+        _index.upsert('store', store_id, name)
+
+def set_store_popularity(store_id: int, rating_count: int) -> None:
+    if _loaded_at is not None:
+        _index.set_weight('store', store_id, rating_count)
+
+def count_products(rows: List[dict], delta: int) -> None:
+    """Add (delta=1) or take away (delta=-1) committed products from the attribute value counts."""
+    if _loaded_at is None:
+        return
+    for row in rows:
+        for attribute in product_repository.SUGGEST_ATTRIBUTES:
+            if row.get(attribute):
+                _index.add_weight(attribute, row[attribute], delta, label=row[attribute])
+
+def invalidate() -> None:
+    global _loaded_at
+    _loaded_at = None
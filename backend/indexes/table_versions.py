@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Dict
+import pymysql.cursors
+from flask import g
+import db
+from config import Config
+from repositories import version_repository
+
+# Cached copies of the table_versions rows, kept separately for requests
+# served by the primary and by replicas so an ETag is never ahead of the
+# data it describes. Entries expire after TABLE_VERSION_CACHE_SECONDS, or as
+# soon as this process commits a write.
+_cache = {}
+_lock = threading.Lock()
+
+def invalidate() -> None:
+    with _lock:
+        _cache.clear()
+
+def get_versions() -> Dict[str, dict]:
+    """Versions of every tracked table; reads the database at most once per TTL."""
+    read_only = db._request_is_read_only()
+    with _lock:
+        entry = _cache.get(read_only)
+    if entry is not None and time.monotonic() - entry[0] < Config.TABLE_VERSION_CACHE_SECONDS:
+        return entry[1]
+
+    connection = db.get_db_connection(read_only=True)
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    try:
+        versions = version_repository.get_table_versions(cursor)
+    finally:
+        cursor.close()
+        connection.close()
+    with _lock:
+        _cache[read_only] = (time.monotonic(), versions)
+    return versions
+
+def bump(cursor, *tables: str) -> None:
+    """Bump table versions on cursor's transaction; call invalidate() once it commits.
+
+    Always in sorted order, so two transactions bumping overlapping tables
+    lock the version rows in the same order and cannot deadlock on them.
+    """
+    now = int(time.time())
+    for table in sorted(set(tables)):
+        version_repository.bump_table_version(cursor, table, now)
+
+def _bump_changed(cursor) -> None:
+    bump(cursor, *g.pop('changed_tables', ()))
+
+def mark_changed(cursor, *tables: str) -> None:
+    """Bump the versions of tables written in the current transaction.
+
+    Every write to a table updates the same version row, so in a request the
+    bumps are collected and issued together as the last statements before
+    the commit, keeping those row locks as short as possible. Outside a
+    request they run at once, so call this just before committing.
+    """
+    if db.before_commit(_bump_changed):
+        g.setdefault('changed_tables', set()).update(tables)
+    else:
+        bump(cursor, *tables)
+    db.after_commit(invalidate)
@@ -0,0 +1,29 @@
+from typing import Optional
+from config import Config
+from utils.lru import LRUCache
+
+# Process-wide userID -> {'role', 'ownerID'} cache, filled by logins and
+# subscription changes in this process. Authenticated requests read a user's
+# role here, falling back to the claims in their token, so checking a role
+# never queries the database.
+_cache = LRUCache(Config.AUTH_ROLE_CACHE_SIZE)
+
+def role_of(owner_id: Optional[int]) -> str:
+    return 'business' if owner_id is not None else 'shopper'
+
+def identity(user_id: int, owner_id: Optional[int]) -> dict:
+    return {'userID': user_id, 'role': role_of(owner_id), 'ownerID': owner_id}
+
+def get(user_id: int) -> Optional[dict]:
+    return _cache.get(user_id)
+
+def remember(user_id: int, owner_id: Optional[int]) -> dict:
+    entry = identity(user_id, owner_id)
+    _cache.put(user_id, entry)
+    return entry
+
+def invalidate(user_id: Optional[int] = None) -> None:
+    if user_id is None:
+        _cache.clear()
+    else:
+        _cache.invalidate(user_id)
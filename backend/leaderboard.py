@@ -0,0 +1,30 @@
+import logging
+import pymysql
+from controllers.leaderboard_controller import LeaderboardController
+from db import _connect
+from indexes import table_versions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def rebuild(connection) -> int:
+    """Recompute store_leaderboard from store, store_rating_stats and product. Returns rows written."""
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    try:
+        count = LeaderboardController().rebuild(cursor)
+        table_versions.mark_changed(cursor, 'store_leaderboard')
+        connection.commit()
+        return count
+    except Exception as e:
+        logger.error(f"Rebuilding the store leaderboard failed: {e}")
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    connection = _connect()
+    try:
+        print(f"Wrote {rebuild(connection)} leaderboard row(s)")
+    finally:
+        connection.close()
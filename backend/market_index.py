@@ -0,0 +1,34 @@
+import logging
+import pymysql
+from db import _connect
+from indexes import table_versions
+from repositories import market_repository
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def rebuild(connection) -> int:
+    """Recompute the market price rollups from price_history. Returns observations counted.
+
+    Lossy once trim_price_history.py has run: only the entries it kept are
+    counted again, so past days lose the observations it deleted.
+    """
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    try:
+        count = market_repository.rebuild_market_rollups(cursor)
+        table_versions.mark_changed(cursor, 'market_price')
+        connection.commit()
+        return count
+    except Exception as e:
+        logger.error(f"Rebuilding market rollups failed: {e}")
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    connection = _connect()
+    try:
+        print(f"Rebuilt market rollups from {rebuild(connection)} observation(s)")
+    finally:
+        connection.close()
@@ -0,0 +1,102 @@
+import importlib
+import os
+import re
+import sys
+import logging
+import pymysql
+from db import _connect
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d+)_[\w-]+\.sql$')
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(100) PRIMARY KEY,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Migrations that create a derived table, and the script whose
+# rebuild(connection) fills it from the tables it is derived from. They run
+# after every pending migration, since the rebuilds query the current schema.
+BACKFILLS = {
+    '006_market_price_rollups.sql': 'market_index',
+    '008_product_deals.sql': 'best_deals',
+    '009_store_leaderboard.sql': 'leaderboard',
+}
+
+def list_migrations(directory: str = MIGRATIONS_DIR) -> list:
+    """Migration file names in the order they must be applied."""
+    names = [name for name in os.listdir(directory) if MIGRATION_FILE.match(name)]
+    return sorted(names, key=lambda name: int(MIGRATION_FILE.match(name).group(1)))
+
+def split_statements(sql: str) -> list:
+    """Split a migration file on semicolons, dropping comment-only chunks."""
+    statements = []
+    for chunk in sql.split(';'):
+        lines = [line for line in chunk.splitlines() if not line.strip().startswith('--')]
+        statement = '\n'.join(lines).strip()
+        if statement:
+            statements.append(statement)
+    return statements
+
+def applied_migrations(cursor) -> set:
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+def backfill(connection, applied: list) -> None:
+    """Fill the derived tables created by the just-applied migrations."""
+    for name in applied:
+        script = BACKFILLS.get(name)
+        if script is None:
+            continue
+        logger.info(f"Backfilling {name} with {script}.py")
+        try:
+            importlib.import_module(script).rebuild(connection)
+        except Exception:
+            logger.error(f"Backfill after {name} failed, rerun `python {script}.py`")
+            raise
+
+def migrate(connection, directory: str = MIGRATIONS_DIR) -> list:
+    """Apply every migration that has not been recorded yet. Returns the ones applied."""
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    applied = []
+    try:
+        done = applied_migrations(cursor)
+        for name in list_migrations(directory):
+            if name in done:
+                continue
+            logger.info(f"Applying migration {name}")
+            with open(os.path.join(directory, name)) as f:
+                for statement in split_statements(f.read()):
+                    cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (name,))
+            connection.commit()
+            applied.append(name)
+        backfill(connection, applied)
+        return applied
+    except Exception as e:
+        # DDL auto-commits in MySQL, so a failed migration may be partially applied
+        logger.error(f"Migration failed: {e}")
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    connection = _connect()
+    try:
+        if '--status' in sys.argv:
+            cursor = connection.cursor(pymysql.cursors.DictCursor)
+            done = applied_migrations(cursor)
+            for name in list_migrations():
+                print(f"{'applied' if name in done else 'pending'}  {name}")
+        else:
+            applied = migrate(connection)
+            print(f"Applied {len(applied)} migration(s)")
+    finally:
+        connection.close()
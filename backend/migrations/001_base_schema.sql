@@ -0,0 +1,73 @@
+-- Tables the API reads and writes. IF NOT EXISTS lets this run against
+-- databases that were created by hand before migrations existed.
+
+CREATE TABLE IF NOT EXISTS users (
+    userID INT AUTO_INCREMENT PRIMARY KEY,
+    first_name VARCHAR(50) NOT NULL,
+    last_name VARCHAR(50) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    user_password VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS store_owners (
+    ownerID INT AUTO_INCREMENT PRIMARY KEY,
+    userID INT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    subscriptionID INT AUTO_INCREMENT PRIMARY KEY,
+    ownerID INT NOT NULL,
+    start_date DATETIME NOT NULL,
+    end_date DATETIME NOT NULL,
+    join_fee DECIMAL(10,2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS store (
+    storeID INT AUTO_INCREMENT PRIMARY KEY,
+    ownerID INT NOT NULL,
+    store_name VARCHAR(50) NOT NULL,
+    rating DECIMAL(3,2) DEFAULT 0.00,
+    address TEXT NOT NULL,
+    latitude DECIMAL(10,7) NOT NULL,
+    longitude DECIMAL(10,7) NOT NULL,
+    phone VARCHAR(20),
+    email VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS store_hours (
+    storeHourID INT AUTO_INCREMENT PRIMARY KEY,
+    storeID INT NOT NULL,
+    daysOpen ENUM('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday') NOT NULL,
+    openTime TIME NULL,
+    closeTime TIME NULL
+);
+
+CREATE TABLE IF NOT EXISTS product (
+    productID INT AUTO_INCREMENT PRIMARY KEY,
+    storeID INT NOT NULL,
+    chain_type VARCHAR(50) NOT NULL,
+    chain_purity VARCHAR(10) NOT NULL,
+    chain_thickness DECIMAL(5,2) NOT NULL,
+    chain_length DECIMAL(5,2) NOT NULL,
+    chain_color VARCHAR(20) NOT NULL,
+    chain_weight DECIMAL(8,2) NOT NULL,
+    set_price DECIMAL(10,2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS price_history (
+    historyID INT AUTO_INCREMENT PRIMARY KEY,
+    userID INT NOT NULL,
+    productID INT NOT NULL,
+    storeID INT NOT NULL,
+    latest_price DECIMAL(10,2) NOT NULL,
+    purchase_date DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS user_update (
+    updateID INT AUTO_INCREMENT PRIMARY KEY,
+    userID INT NOT NULL,
+    productID INT NOT NULL,
+    storeID INT NOT NULL,
+    rating INT NULL,
+    submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
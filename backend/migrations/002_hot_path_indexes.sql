@@ -0,0 +1,32 @@
+-- Composite indexes for the predicates the API filters and sorts on.
+
+-- Store rating average/count and the 1-5 distribution (covering)
+CREATE INDEX ix_user_update_store_rating ON user_update (storeID, rating);
+
+-- Existing-rating lookup in submit_rating
+CREATE INDEX ix_user_update_user_store_product ON user_update (userID, storeID, productID);
+
+-- A user's latest rating for a store, newest first without a filesort
+CREATE INDEX ix_user_update_store_user_submitted ON user_update (storeID, userID, submitted_at);
+
+-- Last five purchases per product and retention trimming
+CREATE INDEX ix_price_history_product_date ON price_history (productID, purchase_date);
+
+-- Same-day resubmission check in submit_purchase
+CREATE INDEX ix_price_history_user_product_date ON price_history (userID, productID, purchase_date);
+
+-- Products for a store
+CREATE INDEX ix_product_store ON product (storeID);
+
+-- Hours for a store
+CREATE INDEX ix_store_hours_store ON store_hours (storeID, daysOpen);
+
+-- Login lookup and the owner join that follows it
+CREATE INDEX ix_users_email ON users (email);
+CREATE INDEX ix_store_owners_user ON store_owners (userID);
+
+-- Latest subscription per owner
+CREATE INDEX ix_subscriptions_owner_start ON subscriptions (ownerID, start_date);
+
+-- Store listing joins owners by ownerID
+CREATE INDEX ix_store_owner ON store (ownerID);
@@ -0,0 +1,26 @@
+-- Per-store rating aggregates maintained by submit_rating, so listing stores
+-- and reading a store's rating or histogram no longer scan user_update.
+-- Rebuild or check them with `python rating_stats.py [--verify]`.
+
+CREATE TABLE IF NOT EXISTS store_rating_stats (
+    storeID INT PRIMARY KEY,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
+    count_1 INT NOT NULL DEFAULT 0,
+    count_2 INT NOT NULL DEFAULT 0,
+    count_3 INT NOT NULL DEFAULT 0,
+    count_4 INT NOT NULL DEFAULT 0,
+    count_5 INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO store_rating_stats
+    (storeID, rating_sum, rating_count, count_1, count_2, count_3, count_4, count_5)
+SELECT storeID, SUM(rating), COUNT(*),
+       SUM(CASE WHEN rating = 1 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN rating = 2 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN rating = 3 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN rating = 4 THEN 1 ELSE 0 END),
+       SUM(CASE WHEN rating = 5 THEN 1 ELSE 0 END)
+FROM user_update
+WHERE rating IS NOT NULL
+GROUP BY storeID;
@@ -0,0 +1,8 @@
+-- Keyset pagination: every listing sort key is paired with the id that breaks ties.
+
+-- /api/stores?sort=rating
+CREATE INDEX ix_store_rating ON store (rating, storeID);
+
+-- /api/products?sort=price, across the catalog and within a store
+CREATE INDEX ix_product_price ON product (set_price, productID);
+CREATE INDEX ix_product_store_price ON product (storeID, set_price, productID);
@@ -0,0 +1,11 @@
+-- Per-table change counters behind the catalog ETags. Every write to one of
+-- these tables bumps its row in the same transaction.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    modified_at BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO table_versions (table_name, version, modified_at)
+VALUES ('store', 0, 0), ('store_hours', 0, 0), ('product', 0, 0), ('user_update', 0, 0);
@@ -0,0 +1,29 @@
+-- Daily price-per-gram rollups behind GET /api/market/index, maintained
+-- after each price submission. market_price_sketch holds a log-bucketed
+-- histogram per day and segment (see utils/price_sketch.py) so percentiles
+-- over any date range are a sum of bucket counts. migrate.py fills them
+-- from price_history once this migration is applied.
+
+CREATE TABLE IF NOT EXISTS market_price_daily (
+    day DATE NOT NULL,
+    chain_type VARCHAR(50) NOT NULL,
+    chain_purity VARCHAR(10) NOT NULL,
+    chain_color VARCHAR(20) NOT NULL,
+    observations INT NOT NULL DEFAULT 0,
+    total_ppg DOUBLE NOT NULL DEFAULT 0,
+    min_ppg DOUBLE NOT NULL,
+    max_ppg DOUBLE NOT NULL,
+    PRIMARY KEY (day, chain_type, chain_purity, chain_color)
+);
+
+CREATE TABLE IF NOT EXISTS market_price_sketch (
+    day DATE NOT NULL,
+    bucket INT NOT NULL,
+    chain_type VARCHAR(50) NOT NULL,
+    chain_purity VARCHAR(10) NOT NULL,
+    chain_color VARCHAR(20) NOT NULL,
+    observations INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, bucket, chain_type, chain_purity, chain_color)
+);
+
+INSERT INTO table_versions (table_name, version, modified_at) VALUES ('market_price', 0, 0);
@@ -0,0 +1,23 @@
+-- One price per user, product and day, enforced by a unique key so
+-- submit_purchase is a single INSERT ... ON DUPLICATE KEY UPDATE instead of
+-- a SELECT on DATE(purchase_date) followed by an UPDATE or INSERT.
+-- Retention trimming moved to `python trim_price_history.py`.
+
+ALTER TABLE price_history ADD COLUMN purchase_day DATE NULL;
+
+UPDATE price_history SET purchase_day = DATE(purchase_date);
+
+-- Keep the newest of any same-day duplicates so the unique key can be built
+DELETE FROM price_history
+WHERE historyID NOT IN (
+    SELECT historyID FROM (
+        SELECT MAX(historyID) as historyID
+        FROM price_history
+        GROUP BY userID, productID, purchase_day
+    ) as newest
+);
+
+CREATE UNIQUE INDEX ux_price_history_user_product_day ON price_history (userID, productID, purchase_day);
+
+-- Superseded by the unique key
+DROP INDEX ix_price_history_user_product_date ON price_history;
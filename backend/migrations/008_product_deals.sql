@@ -0,0 +1,21 @@
+-- Materialized best-deal ranking behind GET /api/products/best-deals. A
+-- product's row is rewritten whenever the product, its reported prices or
+-- its store's rating change. migrate.py fills it once this migration is
+-- applied, and `python best_deals.py` rebuilds it.
+-- Each index serves one filter combination of the top-N query in order.
+
+CREATE TABLE IF NOT EXISTS product_deals (
+    productID INT PRIMARY KEY,
+    storeID INT NOT NULL,
+    chain_type VARCHAR(50) NOT NULL,
+    length_bucket INT NOT NULL,
+    pure_price_per_gram DOUBLE NOT NULL,
+    score DOUBLE NOT NULL
+);
+
+CREATE INDEX ix_product_deals_score ON product_deals (score, productID);
+CREATE INDEX ix_product_deals_type_score ON product_deals (chain_type, score, productID);
+CREATE INDEX ix_product_deals_type_length_score ON product_deals (chain_type, length_bucket, score, productID);
+CREATE INDEX ix_product_deals_store ON product_deals (storeID);
+
+INSERT INTO table_versions (table_name, version, modified_at) VALUES ('product_deals', 0, 0);
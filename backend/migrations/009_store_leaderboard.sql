@@ -0,0 +1,19 @@
+-- Materialized top-stores leaderboard behind GET /api/stores/top. Every rated
+-- store has one row on the overall board, one per chain type it carries and
+-- one for its map cell, scored by a Bayesian average of its ratings. A
+-- store's rows are rewritten when its rating aggregate, products or location
+-- change. migrate.py fills it once this migration is applied, and
+-- `python leaderboard.py` rebuilds it.
+
+CREATE TABLE IF NOT EXISTS store_leaderboard (
+    board VARCHAR(10) NOT NULL,
+    board_key VARCHAR(50) NOT NULL,
+    storeID INT NOT NULL,
+    score DOUBLE NOT NULL,
+    PRIMARY KEY (board, board_key, storeID)
+);
+
+CREATE INDEX ix_store_leaderboard_rank ON store_leaderboard (board, board_key, score, storeID);
+CREATE INDEX ix_store_leaderboard_store ON store_leaderboard (storeID);
+
+INSERT INTO table_versions (table_name, version, modified_at) VALUES ('store_leaderboard', 0, 0);
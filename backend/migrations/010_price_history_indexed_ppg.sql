@@ -0,0 +1,13 @@
+-- The price per gram each price_history row is counted with in the market
+-- rollups (NULL when it is not counted). When a same-day resubmission
+-- replaces a price, exactly that observation is taken back out, even if the
+-- product's weight has changed since.
+
+ALTER TABLE price_history ADD COLUMN indexed_ppg DOUBLE NULL;
+
+UPDATE price_history SET indexed_ppg = (
+    SELECT CASE WHEN p.chain_weight > 0 AND price_history.latest_price > 0
+                THEN CAST(price_history.latest_price AS DOUBLE) / CAST(p.chain_weight AS DOUBLE) END
+    FROM product p
+    WHERE p.productID = price_history.productID
+);
@@ -0,0 +1,7 @@
+-- Set by bulk product inserts to one key per row, so the new productIDs are
+-- read back by key rather than assumed from lastrowid. NULL for products
+-- created one at a time.
+
+ALTER TABLE product ADD COLUMN batch_key VARCHAR(40) NULL;
+
+CREATE INDEX ix_product_batch_key ON product (batch_key);
@@ -0,0 +1,7 @@
+-- Set by bulk store inserts (the import endpoint and CLI) to one key per
+-- row, so the new storeIDs are read back by key. NULL for stores created
+-- one at a time.
+
+ALTER TABLE store ADD COLUMN batch_key VARCHAR(40) NULL;
+
+CREATE INDEX ix_store_batch_key ON store (batch_key);
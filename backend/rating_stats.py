@@ -0,0 +1,49 @@
+import sys
+import logging
+import pymysql
+from db import _connect
+from indexes import table_versions
+from repositories import rating_repository, store_repository
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def verify(connection) -> list:
+    """Stores whose store_rating_stats row disagrees with user_update."""
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    try:
+        return rating_repository.find_rating_stats_drift(cursor)
+    finally:
+        cursor.close()
+
+def rebuild(connection) -> int:
+    """Recompute store_rating_stats and store.rating in one transaction. Returns stores rebuilt."""
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    try:
+        stats = rating_repository.rebuild_rating_stats(cursor)
+        store_repository.update_store_ratings(cursor, [
+            (row['storeID'], rating_repository.average_rating(row)) for row in stats
+        ])
+        table_versions.mark_changed(cursor, 'user_update', 'store')
+        connection.commit()
+        return len(stats)
+    except Exception as e:
+        logger.error(f"Rebuilding rating stats failed: {e}")
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    connection = _connect()
+    try:
+        if '--verify' in sys.argv:
+            drift = verify(connection)
+            for row in drift:
+                print(f"store {row['storeID']}: stored {row['stored']} expected {row['expected']}")
+            print(f"{len(drift)} store(s) out of sync")
+            sys.exit(1 if drift else 0)
+        else:
+            print(f"Rebuilt rating stats for {rebuild(connection)} store(s)")
+    finally:
+        connection.close()
@@ -0,0 +1,79 @@
+from typing import List, Optional
+
+# Everything a product's deal score depends on; {where} picks the products
+SELECT_DEAL_INPUTS = """
+    SELECT p.productID, p.storeID, p.chain_type, p.chain_purity, p.chain_length,
+           p.chain_weight, p.set_price, s.rating
+    FROM product p
+    JOIN store s ON p.storeID = s.storeID
+    WHERE {where}
+"""
+
+UPSERT_PRODUCT_DEAL = """
+    INSERT INTO product_deals
+        (productID, storeID, chain_type, length_bucket, pure_price_per_gram, score)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        storeID = VALUES(storeID),
+        chain_type = VALUES(chain_type),
+        length_bucket = VALUES(length_bucket),
+        pure_price_per_gram = VALUES(pure_price_per_gram),
+        score = VALUES(score)
+"""
+
+DELETE_PRODUCT_DEALS = "DELETE FROM product_deals WHERE productID IN ({placeholders})"
+
+DELETE_ALL_PRODUCT_DEALS = "DELETE FROM product_deals"
+
+# Best scores first; {where} is at most chain_type and length_bucket
+# equalities, each combination walking one ix_product_deals_* index in order
+SELECT_TOP_DEALS = """
+    SELECT d.productID, d.pure_price_per_gram, d.score, d.length_bucket,
+           p.storeID, p.chain_type, p.chain_purity, p.chain_thickness, p.chain_length,
+           p.chain_color, p.chain_weight, p.set_price, s.store_name, s.rating
+    FROM product_deals d
+    JOIN product p ON p.productID = d.productID
+    JOIN store s ON s.storeID = d.storeID
+    WHERE {where}
+    ORDER BY d.score, d.productID
+    LIMIT %s
+"""
+
+
+def get_deal_inputs(cursor, product_ids: Optional[List[int]] = None, store_id: Optional[int] = None) -> List[dict]:
+    """Score inputs for the given products, a store's products, or every product."""
+    if product_ids is not None:
+        if not product_ids:
+            return []
+        where, params = f"p.productID IN ({','.join(['%s'] * len(product_ids))})", tuple(product_ids)
+    elif store_id is not None:
+        where, params = 'p.storeID = %s', (store_id,)
+    else:
+        where, params = '1 = 1', ()
+    cursor.execute(SELECT_DEAL_INPUTS.format(where=where), params)
+    return cursor.fetchall()
+
+def upsert_product_deals(cursor, deals: List[tuple]) -> None:
+    """Write (productID, storeID, chain_type, length_bucket, pure_price_per_gram, score) rows."""
+    if deals:
+        cursor.executemany(UPSERT_PRODUCT_DEAL, deals)
+
+def delete_product_deals(cursor, product_ids: List[int]) -> None:
+    if product_ids:
+        placeholders = ','.join(['%s'] * len(product_ids))
+        cursor.execute(DELETE_PRODUCT_DEALS.format(placeholders=placeholders), tuple(product_ids))
+
+def delete_all_product_deals(cursor) -> None:
+    cursor.execute(DELETE_ALL_PRODUCT_DEALS)
+
+def get_top_deals(cursor, limit: int, chain_type: Optional[str] = None,
+                  length_bucket: Optional[int] = None) -> List[dict]:
+    clauses, params = [], []
+    if chain_type is not None:
+        clauses.append('d.chain_type = %s')
+        params.append(chain_type)
+        if length_bucket is not None:
+            clauses.append('d.length_bucket = %s')
+            params.append(length_bucket)
+    cursor.execute(SELECT_TOP_DEALS.format(where=' AND '.join(clauses) or '1 = 1'), tuple(params) + (limit,))
+    return cursor.fetchall()
@@ -0,0 +1,77 @@
+from typing import List, Optional
+
+# Leaderboards: the overall one, one per chain type and one per map cell
+LEADERBOARD_ALL = 'all'
+LEADERBOARD_TYPE = 'type'
+LEADERBOARD_CELL = 'cell'
+
+# Rating aggregate and location of rated stores; {where} picks the stores
+SELECT_LEADERBOARD_STORES = """
+    SELECT s.storeID, s.latitude, s.longitude, r.rating_sum, r.rating_count
+    FROM store s
+    JOIN store_rating_stats r ON r.storeID = s.storeID
+    WHERE r.rating_count > 0 AND {where}
+"""
+
+SELECT_STORE_CHAIN_TYPES = "SELECT DISTINCT storeID, chain_type FROM product WHERE {where}"
+
+INSERT_LEADERBOARD_ENTRY = """
+    INSERT INTO store_leaderboard (board, board_key, storeID, score)
+    VALUES (%s, %s, %s, %s)
+"""
+
+DELETE_LEADERBOARD_STORES = "DELETE FROM store_leaderboard WHERE storeID IN ({placeholders})"
+
+DELETE_ALL_LEADERBOARD = "DELETE FROM store_leaderboard"
+
+# Best first, walking ix_store_leaderboard_rank backwards and stopping after
+# the limit, so the cost grows with the limit rather than the board
+SELECT_TOP_STORES = """
+    SELECT l.storeID, l.score, s.store_name, s.address, s.latitude, s.longitude,
+           s.rating, r.rating_count
+    FROM store_leaderboard l
+    JOIN store s ON s.storeID = l.storeID
+    JOIN store_rating_stats r ON r.storeID = l.storeID
+    WHERE l.board = %s AND l.board_key = %s
+    ORDER BY l.score DESC, l.storeID DESC
+    LIMIT %s
+"""
+
+
+def _where_store_ids(column: str, store_ids: Optional[List[int]]) -> tuple:
+    if store_ids is None:
+        return '1 = 1', ()
+    return f"{column} IN ({','.join(['%s'] * len(store_ids))})", tuple(store_ids)
+
+def get_leaderboard_stores(cursor, store_ids: Optional[List[int]] = None) -> List[dict]:
+    """Rated stores among store_ids, or every rated store."""
+    if store_ids is not None and not store_ids:
+        return []
+    where, params = _where_store_ids('s.storeID', store_ids)
+    cursor.execute(SELECT_LEADERBOARD_STORES.format(where=where), params)
+    return cursor.fetchall()
+
+def get_store_chain_types(cursor, store_ids: Optional[List[int]] = None) -> List[dict]:
+    """Distinct (storeID, chain_type) pairs of the stores' products."""
+    if store_ids is not None and not store_ids:
+        return []
+    where, params = _where_store_ids('storeID', store_ids)
+    cursor.execute(SELECT_STORE_CHAIN_TYPES.format(where=where), params)
+    return cursor.fetchall()
+
+def insert_leaderboard_entries(cursor, entries: List[tuple]) -> None:
+    """Write (board, board_key, storeID, score) rows."""
+    if entries:
+        cursor.executemany(INSERT_LEADERBOARD_ENTRY, entries)
+
+def delete_leaderboard_stores(cursor, store_ids: List[int]) -> None:
+    if store_ids:
+        placeholders = ','.join(['%s'] * len(store_ids))
+        cursor.execute(DELETE_LEADERBOARD_STORES.format(placeholders=placeholders), tuple(store_ids))
+
+def delete_all_leaderboard(cursor) -> None:
+    cursor.execute(DELETE_ALL_LEADERBOARD)
+
+def get_top_stores(cursor, board: str, board_key: str, limit: int) -> List[dict]:
+    cursor.execute(SELECT_TOP_STORES, (board, board_key, limit))
+    return cursor.fetchall()
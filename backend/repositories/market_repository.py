@@ -0,0 +1,151 @@
+from typing import Dict, List, Optional, Tuple
+from utils.price_sketch import bucket_of
+
+# Equality filters accepted by the market index, by query name
+MARKET_SEGMENT_FILTERS = {'type': 'chain_type', 'purity': 'chain_purity', 'color': 'chain_color'}
+
+# Adds observations to a day's segment, creating the row on its first one
+UPSERT_MARKET_DAY = """
+    INSERT INTO market_price_daily
+        (day, chain_type, chain_purity, chain_color, observations, total_ppg, min_ppg, max_ppg)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        observations = observations + VALUES(observations),
+        total_ppg = total_ppg + VALUES(total_ppg),
+        min_ppg = LEAST(min_ppg, VALUES(min_ppg)),
+        max_ppg = GREATEST(max_ppg, VALUES(max_ppg))
+"""
+
+UPSERT_MARKET_SKETCH = """
+    INSERT INTO market_price_sketch
+        (day, bucket, chain_type, chain_purity, chain_color, observations)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE observations = observations + VALUES(observations)
+"""
+
+# Take back an observation counted earlier. min and max keep it until the
+# next rebuild. A row that was never counted is left alone, and counts never
+# go below zero.
+RETRACT_MARKET_DAY = """
+    UPDATE market_price_daily
+    SET observations = GREATEST(observations - 1, 0), total_ppg = GREATEST(total_ppg - %s, 0)
+    WHERE day = %s AND chain_type = %s AND chain_purity = %s AND chain_color = %s
+"""
+
+RETRACT_MARKET_SKETCH = """
+    UPDATE market_price_sketch
+    SET observations = GREATEST(observations - 1, 0)
+    WHERE day = %s AND bucket = %s AND chain_type = %s AND chain_purity = %s AND chain_color = %s
+"""
+
+# Segments matching {where} merged into one row per day
+SELECT_MARKET_DAYS = """
+    SELECT day, SUM(observations) as observations, SUM(total_ppg) as total_ppg,
+           MIN(min_ppg) as min_ppg, MAX(max_ppg) as max_ppg
+    FROM market_price_daily
+    WHERE observations > 0 AND {where}
+    GROUP BY day
+"""
+
+SELECT_MARKET_SKETCH = """
+    SELECT day, bucket, SUM(observations) as observations
+    FROM market_price_sketch
+    WHERE {where}
+    GROUP BY day, bucket
+"""
+
+# One user's price entry for a product and day, locked so concurrent
+# resubmissions reconcile it with the rollups one at a time
+SELECT_PRICE_OBSERVATION_FOR_UPDATE = """
+    SELECT historyID, latest_price, indexed_ppg
+    FROM price_history
+    WHERE userID = %s AND productID = %s AND purchase_day = %s
+    FOR UPDATE
+"""
+
+# indexed_ppg is the price per gram a price_history row is counted with in
+# the rollups, NULL while it is not counted
+UPDATE_INDEXED_PPG = "UPDATE price_history SET indexed_ppg = %s WHERE historyID = %s"
+
+# Every observation still in price_history, only used to rebuild the rollups
+SELECT_PRICE_OBSERVATIONS = """
+    SELECT ph.historyID, ph.purchase_date, ph.latest_price,
+           p.chain_type, p.chain_purity, p.chain_color, p.chain_weight
+    FROM price_history ph
+    JOIN product p ON ph.productID = p.productID
+"""
+
+DELETE_ALL_MARKET_DAYS = "DELETE FROM market_price_daily"
+
+DELETE_ALL_MARKET_SKETCHES = "DELETE FROM market_price_sketch"
+
+
+def price_per_gram(price, weight) -> Optional[float]:
+    weight = float(weight or 0)
+    return float(price) / weight if weight > 0 and float(price) > 0 else None
+
+def observation_segment(product: dict) -> Tuple[str, str, str]:
+    return (product['chain_type'], product['chain_purity'], product['chain_color'])
+
+def record_observations(cursor, observations: List[tuple]) -> None:
+    """Add (day, (type, purity, color), price_per_gram) observations to the rollups.
+
+    Observations are pre-merged per day/segment and per sketch bucket, so a
+    batch costs two multi-row upserts however many rows it holds.
+    """
+    days, sketches = {}, {}
+    for day, segment, ppg in observations:
+        key = (day, *segment)
+        count, total, low, high = days.get(key, (0, 0.0, ppg, ppg))
+        days[key] = (count + 1, total + ppg, min(low, ppg), max(high, ppg))
+        sketch_key = (day, bucket_of(ppg), *segment)
+        sketches[sketch_key] = sketches.get(sketch_key, 0) + 1
+    if days:
+        cursor.executemany(UPSERT_MARKET_DAY, [key + value for key, value in sorted(days.items())])
+        cursor.executemany(UPSERT_MARKET_SKETCH, [key + (count,) for key, count in sorted(sketches.items())])
+
+def retract_observation(cursor, day: str, segment: Tuple[str, str, str], ppg: float) -> None:
+    cursor.execute(RETRACT_MARKET_DAY, (ppg, day, *segment))
+    cursor.execute(RETRACT_MARKET_SKETCH, (day, bucket_of(ppg), *segment))
+
+def lock_price_observation(cursor, user_id: int, product_id: int, day: str) -> Optional[dict]:
+    cursor.execute(SELECT_PRICE_OBSERVATION_FOR_UPDATE, (user_id, product_id, day))
+    return cursor.fetchone()
+
+def set_indexed_ppg(cursor, history_id: int, ppg: Optional[float]) -> None:
+    cursor.execute(UPDATE_INDEXED_PPG, (ppg, history_id))
+
+def market_condition(segment: Dict[str, str], start: str, end: str) -> Tuple[str, tuple]:
+    """SQL condition for a date range and optional MARKET_SEGMENT_FILTERS values."""
+    clauses, params = ['day >= %s', 'day <= %s'], [start, end]
+    for name, column in MARKET_SEGMENT_FILTERS.items():
+        if segment.get(name):
+            clauses.append(f"{column} = %s")
+            params.append(segment[name])
+    return ' AND '.join(clauses), tuple(params)
+
+def get_market_days(cursor, segment: Dict[str, str], start: str, end: str) -> List[dict]:
+    where, params = market_condition(segment, start, end)
+    cursor.execute(SELECT_MARKET_DAYS.format(where=where), params)
+    return cursor.fetchall()
+
+def get_market_sketches(cursor, segment: Dict[str, str], start: str, end: str) -> List[dict]:
+    where, params = market_condition(segment, start, end)
+    cursor.execute(SELECT_MARKET_SKETCH.format(where=where), params)
+    return cursor.fetchall()
+
+def rebuild_market_rollups(cursor) -> int:
+    """Recompute both rollups from price_history. Returns the observations counted."""
+    cursor.execute(SELECT_PRICE_OBSERVATIONS)
+    observations, indexed = [], []
+    for row in cursor.fetchall():
+        ppg = price_per_gram(row['latest_price'], row['chain_weight'])
+        if ppg is not None:
+            observations.append((str(row['purchase_date'])[:10], observation_segment(row), ppg))
+        indexed.append((ppg, row['historyID']))
+    cursor.execute(DELETE_ALL_MARKET_DAYS)
+    cursor.execute(DELETE_ALL_MARKET_SKETCHES)
+    record_observations(cursor, observations)
+    if indexed:
+        cursor.executemany(UPDATE_INDEXED_PPG, indexed)
+    return len(observations)
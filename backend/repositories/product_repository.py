@@ -0,0 +1,349 @@
+import uuid
+from typing import Dict, List, Optional, Tuple
+from utils.pagination import keyset_condition, keyset_order
+
+PRODUCT_FIELDS = ('chain_type', 'chain_purity', 'chain_thickness', 'chain_length',
+                  'chain_color', 'chain_weight', 'set_price')
+
+SELECT_ALL_PRODUCTS = """
+    SELECT productID, storeID, chain_type, chain_purity,
+           chain_thickness, chain_length, chain_color,
+           chain_weight, set_price
+    FROM product
+"""
+
+# One keyset page of products; {where} and {order} come from keyset_condition/keyset_order
+SELECT_PRODUCTS_PAGE = """
+    SELECT productID, storeID, chain_type, chain_purity,
+           chain_thickness, chain_length, chain_color,
+           chain_weight, set_price
+    FROM product
+    WHERE {where}
+    ORDER BY {order}
+    LIMIT %s
+"""
+
+# sort name -> (column, descending); ties break on productID
+PRODUCT_PAGE_SORTS = {
+    'id': ('productID', False),
+    'price': ('set_price', False),
+    'price_desc': ('set_price', True),
+}
+
+# Attributes the search page filters on by exact value and shows counts for
+FACET_COLUMNS = ('chain_type', 'chain_purity', 'chain_thickness', 'chain_length', 'chain_color')
+
+# Range filter name -> (column, operator)
+RANGE_FILTERS = {
+    'min_price': ('set_price', '>='),
+    'max_price': ('set_price', '<='),
+    'min_weight': ('chain_weight', '>='),
+    'max_weight': ('chain_weight', '<='),
+}
+
+COUNT_PRODUCTS = "SELECT COUNT(*) as total FROM product WHERE {where}"
+
+SELECT_PRODUCT_FACET = """
+    SELECT {column} as value, COUNT(*) as count
+    FROM product
+    WHERE {where}
+    GROUP BY {column}
+"""
+
+SELECT_PRODUCT = "SELECT * FROM product WHERE productID = %s"
+
+SELECT_PRODUCTS_BY_IDS = """
+    SELECT productID, storeID, chain_type, chain_purity,
+           chain_thickness, chain_length, chain_color,
+           chain_weight, set_price
+    FROM product
+    WHERE productID IN ({placeholders})
+"""
+
+# Attribute values offered as search suggestions, with how many products use each
+SUGGEST_ATTRIBUTES = ('chain_type', 'chain_color', 'chain_purity')
+
+SELECT_PRODUCT_VALUE_COUNTS = """
+    SELECT 'chain_type' AS attribute, chain_type AS value, COUNT(*) AS product_count
+    FROM product GROUP BY chain_type
+    UNION ALL
+    SELECT 'chain_color', chain_color, COUNT(*) FROM product GROUP BY chain_color
+    UNION ALL
+    SELECT 'chain_purity', chain_purity, COUNT(*) FROM product GROUP BY chain_purity
+"""
+
+SELECT_PRODUCTS_BY_STORE = """
+    SELECT productID, storeID, chain_type, chain_purity,
+           chain_thickness, chain_length, chain_color,
+           chain_weight, set_price
+    FROM product
+    WHERE storeID = %s
+"""
+
+# executemany() sends a list of these as multi-row INSERTs
+INSERT_PRODUCT = """
+    INSERT INTO product (
+        storeID, chain_type, chain_purity, chain_thickness,
+        chain_length, chain_color, chain_weight, set_price, batch_key
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# The IDs of a bulk insert, by the per-row keys it was given
+SELECT_PRODUCT_IDS_BY_BATCH = "SELECT productID, batch_key FROM product WHERE batch_key LIKE %s"
+
+UPDATE_PRODUCT = """
+    UPDATE product
+    SET chain_type = %s,
+        chain_purity = %s,
+        chain_thickness = %s,
+        chain_length = %s,
+        chain_color = %s,
+        chain_weight = %s,
+        set_price = %s
+    WHERE productID = %s
+"""
+
+DELETE_PRODUCT = "DELETE FROM product WHERE productID = %s"
+
+SELECT_RECENT_PURCHASES = """
+    SELECT
+        CONCAT(
+            u.first_name,
+            ' ',
+            LEFT(u.last_name, 1),
+            '.'
+        ) AS full_name,
+        ph.latest_price,
+        ph.purchase_date
+    FROM
+        price_history ph
+    JOIN
+        users u ON ph.userID = u.userID
+    WHERE
+        ph.productID = %s
+    ORDER BY
+        ph.purchase_date DESC,
+        ph.historyID DESC
+    LIMIT %s
+"""
+
+# The latest purchases of several products at once: each product's rows are
+# numbered newest first and only the first %s of each are kept
+SELECT_RECENT_PURCHASES_FOR_PRODUCTS = """
+    SELECT productID, full_name, latest_price, purchase_date
+    FROM (
+        SELECT
+            ph.productID,
+            CONCAT(u.first_name, ' ', LEFT(u.last_name, 1), '.') AS full_name,
+            ph.latest_price,
+            ph.purchase_date,
+            ROW_NUMBER() OVER (
+                PARTITION BY ph.productID
+                ORDER BY ph.purchase_date DESC, ph.historyID DESC
+            ) AS recency
+        FROM price_history ph
+        JOIN users u ON ph.userID = u.userID
+        WHERE ph.productID IN ({placeholders})
+    ) ranked
+    WHERE recency <= %s
+    ORDER BY productID, recency
+"""
+
+# One row per user, product and day (ux_price_history_user_product_day): a
+# same-day resubmission replaces the price in the same statement
+UPSERT_PRICE_ENTRY = """
+    INSERT INTO price_history
+    (userID, productID, storeID, latest_price, purchase_date, purchase_day)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        latest_price = VALUES(latest_price),
+        purchase_date = VALUES(purchase_date)
+"""
+
+SELECT_PRICE_HISTORY_PRODUCT_BOUNDS = """
+    SELECT MIN(productID) as first_id, MAX(productID) as last_id
+    FROM price_history
+"""
+
+# Entries beyond the newest %s of each product in a productID range, for
+# the background retention pass
+SELECT_EXPIRED_PRICE_IDS = """
+    SELECT historyID
+    FROM (
+        SELECT historyID,
+               ROW_NUMBER() OVER (PARTITION BY productID ORDER BY purchase_date DESC, historyID DESC) AS recency
+        FROM price_history
+        WHERE productID >= %s AND productID < %s
+    ) ranked
+    WHERE recency > %s
+"""
+
+DELETE_PRICE_ENTRIES = "DELETE FROM price_history WHERE historyID IN ({placeholders})"
+
+
+def _product_values(product: dict) -> tuple:
+    return tuple(product[field] for field in PRODUCT_FIELDS)
+
+def get_all_products(cursor) -> List[dict]:
+    cursor.execute(SELECT_ALL_PRODUCTS)
+    return cursor.fetchall()
+
+def get_product(cursor, product_id: int) -> Optional[dict]:
+    cursor.execute(SELECT_PRODUCT, (product_id,))
+    return cursor.fetchone()
+
+def get_products_by_ids(cursor, product_ids: List[int]) -> List[dict]:
+    """Fetch several products at once, returned in the order of product_ids."""
+    if not product_ids:
+        return []
+    placeholders = ','.join(['%s'] * len(product_ids))
+    cursor.execute(SELECT_PRODUCTS_BY_IDS.format(placeholders=placeholders), tuple(product_ids))
+    by_id = {row['productID']: row for row in cursor.fetchall()}
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+def get_product_value_counts(cursor) -> List[dict]:
+    cursor.execute(SELECT_PRODUCT_VALUE_COUNTS)
+    return cursor.fetchall()
+
+def get_products_by_store(cursor, store_id: int) -> List[dict]:
+    cursor.execute(SELECT_PRODUCTS_BY_STORE, (store_id,))
+    return cursor.fetchall()
+
+def product_page_key(row: dict, sort: str) -> tuple:
+    column, _ = PRODUCT_PAGE_SORTS[sort]
+    return (row['productID'],) if column == 'productID' else (row[column], row['productID'])
+
+def get_products_page(cursor, limit: int, sort: str = 'id', after: Optional[Tuple] = None,
+                      store_id: Optional[int] = None) -> List[dict]:
+    """Up to limit + 1 products following `after`, optionally for one store."""
+    column, descending = PRODUCT_PAGE_SORTS[sort]
+    where, params = keyset_condition(column, 'productID', descending, after)
+    if store_id is not None:
+        where, params = f"storeID = %s AND {where}", (store_id,) + params
+    cursor.execute(SELECT_PRODUCTS_PAGE.format(where=where, order=keyset_order(column, 'productID', descending)),
+                   params + (limit + 1,))
+    return cursor.fetchall()
+
+def product_filter_condition(filters: dict, exclude: Optional[str] = None) -> Tuple[str, tuple]:
+    """SQL condition for a search filter set, optionally ignoring one facet column.
+
+    filters maps facet columns to lists of accepted values, RANGE_FILTERS
+    names to bounds and 'store_ids' to a list of stores (empty matches nothing).
+    """
+    clauses, params = [], []
+    for column in FACET_COLUMNS:
+        values = filters.get(column)
+        if values and column != exclude:
+            clauses.append(f"{column} IN ({','.join(['%s'] * len(values))})")
+            params.extend(values)
+    for name, (column, operator) in RANGE_FILTERS.items():
+        if filters.get(name) is not None:
+            clauses.append(f"{column} {operator} %s")
+            params.append(filters[name])
+    store_ids = filters.get('store_ids')
+    if store_ids is not None:
+        if not store_ids:
+            clauses.append('1 = 0')
+        else:
+            clauses.append(f"storeID IN ({','.join(['%s'] * len(store_ids))})")
+            params.extend(store_ids)
+    return ' AND '.join(clauses) or '1 = 1', tuple(params)
+
+def search_products_page(cursor, filters: dict, limit: int, sort: str = 'id',
+                         after: Optional[Tuple] = None) -> List[dict]:
+    """Up to limit + 1 matching products following `after`."""
+    column, descending = PRODUCT_PAGE_SORTS[sort]
+    where, params = product_filter_condition(filters)
+    keyset, keyset_params = keyset_condition(column, 'productID', descending, after)
+    cursor.execute(SELECT_PRODUCTS_PAGE.format(where=f"{where} AND {keyset}",
+                                               order=keyset_order(column, 'productID', descending)),
+                   params + keyset_params + (limit + 1,))
+    return cursor.fetchall()
+
+def count_products(cursor, filters: dict) -> int:
+    where, params = product_filter_condition(filters)
+    cursor.execute(COUNT_PRODUCTS.format(where=where), params)
+    return int(cursor.fetchone()['total'])
+
+def facet_key(value) -> str:
+    # Numeric facets come back as Decimal from MySQL and int/float from SQLite
+    return value if isinstance(value, str) else format(float(value), 'g')
+
+def get_product_facets(cursor, filters: dict) -> dict:
+    """Counts per value of each facet column, most common first.
+
+    Each facet ignores its own filter, so the page can show how many results
+    picking another value of that attribute would give.
+    """
+    facets = {}
+    for column in FACET_COLUMNS:
+        where, params = product_filter_condition(filters, exclude=column)
+        cursor.execute(SELECT_PRODUCT_FACET.format(column=column, where=where), params)
+        counts = {facet_key(row['value']): int(row['count']) for row in cursor.fetchall()}
+        facets[column] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+    return facets
+
+def insert_product(cursor, product: dict) -> int:
+    cursor.execute(INSERT_PRODUCT, (product['storeID'], *_product_values(product), None))
+    return cursor.lastrowid
+
+def insert_products(cursor, products: List[dict]) -> List[int]:
+    """Insert many products in multi-row INSERTs and return their IDs in order.
+
+    executemany() may split the rows over several statements, so the IDs are
+    not derived from lastrowid. Each row gets a key under a random batch
+    prefix, and the IDs are read back by that key.
+    """
+    if not products:
+        return []
+    batch = uuid.uuid4().hex
+    cursor.executemany(INSERT_PRODUCT, [
+        (product['storeID'], *_product_values(product), f"{batch}:{index}")
+        for index, product in enumerate(products)
+    ])
+    cursor.execute(SELECT_PRODUCT_IDS_BY_BATCH, (f"{batch}:%",))
+    ids = {row['batch_key']: row['productID'] for row in cursor.fetchall()}
+    return [ids[f"{batch}:{index}"] for index in range(len(products))]
+
+def update_product(cursor, product_id: int, product: dict) -> None:
+    cursor.execute(UPDATE_PRODUCT, (*_product_values(product), product_id))
+
+def delete_product(cursor, product_id: int) -> None:
+    cursor.execute(DELETE_PRODUCT, (product_id,))
+
+def get_recent_purchases(cursor, product_id: int, limit: int = 5) -> List[dict]:
+    cursor.execute(SELECT_RECENT_PURCHASES, (product_id, limit))
+    return cursor.fetchall()
+
+def get_recent_purchases_for_products(cursor, product_ids: List[int], limit: int = 5) -> Dict[int, List[dict]]:
+    """Up to `limit` latest purchases per product, newest first, keyed by productID."""
+    purchases = {product_id: [] for product_id in product_ids}
+    if not product_ids:
+        return purchases
+    placeholders = ','.join(['%s'] * len(product_ids))
+    cursor.execute(SELECT_RECENT_PURCHASES_FOR_PRODUCTS.format(placeholders=placeholders),
+                   tuple(product_ids) + (limit,))
+    for row in cursor.fetchall():
+        # Rows arrive ordered by productID, recency
+        purchases[row.pop('productID')].append(row)
+    return purchases
+
+def upsert_price_entry(cursor, user_id: int, product_id: int, store_id: int, price: float,
+                       purchase_date: str) -> None:
+    """Record a user's price for a product, replacing their entry for the same day."""
+    cursor.execute(UPSERT_PRICE_ENTRY, (user_id, product_id, store_id, price, purchase_date, purchase_date[:10]))
+
+def get_price_history_product_bounds(cursor) -> Tuple[Optional[int], Optional[int]]:
+    cursor.execute(SELECT_PRICE_HISTORY_PRODUCT_BOUNDS)
+    row = cursor.fetchone()
+    return row['first_id'], row['last_id']
+
+def get_expired_price_ids(cursor, first_product_id: int, end_product_id: int, keep: int = 5) -> List[int]:
+    """historyIDs past the newest `keep` entries of each product in [first, end)."""
+    cursor.execute(SELECT_EXPIRED_PRICE_IDS, (first_product_id, end_product_id, keep))
+    return [row['historyID'] for row in cursor.fetchall()]
+
+def delete_price_entries(cursor, history_ids: List[int]) -> None:
+    if history_ids:
+        placeholders = ','.join(['%s'] * len(history_ids))
+        cursor.execute(DELETE_PRICE_ENTRIES.format(placeholders=placeholders), tuple(history_ids))
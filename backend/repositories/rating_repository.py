@@ -0,0 +1,154 @@
+from typing import List, Optional
+
+# Locks the existing row so the old value used for the aggregate delta
+# cannot change underneath a concurrent resubmission
+SELECT_RATING_ID = """
+    SELECT updateID, rating
+    FROM user_update
+    WHERE userID = %s AND storeID = %s AND productID = %s
+    FOR UPDATE
+"""
+
+UPDATE_RATING = """
+    UPDATE user_update
+    SET rating = %s, submitted_at = CURRENT_TIMESTAMP
+    WHERE updateID = %s
+"""
+
+INSERT_RATING = """
+    INSERT INTO user_update (userID, productID, storeID, rating)
+    VALUES (%s, %s, %s, %s)
+"""
+
+RATING_STATS_COLUMNS = ('rating_sum', 'rating_count', 'count_1', 'count_2', 'count_3', 'count_4', 'count_5')
+
+SELECT_RATING_STATS = """
+    SELECT rating_sum, rating_count, count_1, count_2, count_3, count_4, count_5
+    FROM store_rating_stats
+    WHERE storeID = %s
+"""
+
+# Adds a delta to a store's aggregates, creating the row on its first rating
+UPSERT_RATING_STATS = """
+    INSERT INTO store_rating_stats
+        (storeID, rating_sum, rating_count, count_1, count_2, count_3, count_4, count_5)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        rating_sum = rating_sum + VALUES(rating_sum),
+        rating_count = rating_count + VALUES(rating_count),
+        count_1 = count_1 + VALUES(count_1),
+        count_2 = count_2 + VALUES(count_2),
+        count_3 = count_3 + VALUES(count_3),
+        count_4 = count_4 + VALUES(count_4),
+        count_5 = count_5 + VALUES(count_5)
+"""
+
+# Full recomputation from user_update, only used to rebuild or verify
+SELECT_RATING_AGGREGATES = """
+    SELECT storeID, SUM(rating) as rating_sum, COUNT(*) as rating_count,
+           SUM(CASE WHEN rating = 1 THEN 1 ELSE 0 END) as count_1,
+           SUM(CASE WHEN rating = 2 THEN 1 ELSE 0 END) as count_2,
+           SUM(CASE WHEN rating = 3 THEN 1 ELSE 0 END) as count_3,
+           SUM(CASE WHEN rating = 4 THEN 1 ELSE 0 END) as count_4,
+           SUM(CASE WHEN rating = 5 THEN 1 ELSE 0 END) as count_5
+    FROM user_update
+    WHERE rating IS NOT NULL
+    GROUP BY storeID
+"""
+
+SELECT_ALL_RATING_STATS = """
+    SELECT storeID, rating_sum, rating_count, count_1, count_2, count_3, count_4, count_5
+    FROM store_rating_stats
+"""
+
+DELETE_ALL_RATING_STATS = "DELETE FROM store_rating_stats"
+
+SELECT_USER_RATING = """
+    SELECT rating
+    FROM user_update
+    WHERE storeID = %s AND userID = %s
+    ORDER BY submitted_at DESC
+    LIMIT 1
+"""
+
+
+
+def find_rating(cursor, user_id: int, store_id: int, product_id: int) -> Optional[dict]:
+    cursor.execute(SELECT_RATING_ID, (user_id, store_id, product_id))
+    return cursor.fetchone()
+
+def update_rating(cursor, update_id: int, rating: int) -> None:
+    cursor.execute(UPDATE_RATING, (rating, update_id))
+
+def insert_rating(cursor, user_id: int, product_id: int, store_id: int, rating: int) -> None:
+    cursor.execute(INSERT_RATING, (user_id, product_id, store_id, rating))
+
+def rating_delta(old_rating: Optional[int], new_rating: int) -> dict:
+    """Change to a store's aggregates when a rating goes from old_rating to new_rating."""
+    delta = {column: 0 for column in RATING_STATS_COLUMNS}
+    if old_rating is not None:
+        delta['rating_sum'] -= int(old_rating)
+        delta['rating_count'] -= 1
+        delta[f'count_{int(old_rating)}'] -= 1
+    delta['rating_sum'] += new_rating
+    delta['rating_count'] += 1
+    delta[f'count_{new_rating}'] += 1
+    return delta
+
+def apply_rating_delta(cursor, store_id: int, delta: dict) -> None:
+    cursor.execute(UPSERT_RATING_STATS, (store_id,) + tuple(delta[column] for column in RATING_STATS_COLUMNS))
+
+def get_rating_stats(cursor, store_id: int) -> dict:
+    cursor.execute(SELECT_RATING_STATS, (store_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return {column: 0 for column in RATING_STATS_COLUMNS}
+    return {column: int(row[column]) for column in RATING_STATS_COLUMNS}
+
+def average_rating(stats: dict) -> float:
+    if not stats['rating_count']:
+        return 0.00
+    return round(stats['rating_sum'] / stats['rating_count'], 2)
+
+def get_rating_summary(cursor, store_id: int) -> dict:
+    stats = get_rating_stats(cursor, store_id)
+    return {'rating_count': stats['rating_count'], 'avg_rating': average_rating(stats)}
+
+def get_user_rating(cursor, store_id: int, user_id: int) -> Optional[dict]:
+    cursor.execute(SELECT_USER_RATING, (store_id, user_id))
+    return cursor.fetchone()
+
+def get_rating_distribution(cursor, store_id: int) -> dict:
+    stats = get_rating_stats(cursor, store_id)
+    return {star: stats[f'count_{star}'] for star in range(1, 6)}
+
+def _stats_by_store(rows: List[dict]) -> dict:
+    return {row['storeID']: {column: int(row[column] or 0) for column in RATING_STATS_COLUMNS}
+            for row in rows}
+
+def find_rating_stats_drift(cursor) -> List[dict]:
+    """Stores whose stored aggregates differ from a recount of user_update."""
+    cursor.execute(SELECT_RATING_AGGREGATES)
+    expected = _stats_by_store(cursor.fetchall())
+    cursor.execute(SELECT_ALL_RATING_STATS)
+    stored = _stats_by_store(cursor.fetchall())
+    empty = {column: 0 for column in RATING_STATS_COLUMNS}
+    drift = []
+    for store_id in sorted(expected.keys() | stored.keys()):
+        want, have = expected.get(store_id, empty), stored.get(store_id, empty)
+        if want != have:
+            drift.append({'storeID': store_id, 'expected': want, 'stored': have})
+    return drift
+
+def rebuild_rating_stats(cursor) -> List[dict]:
+    """Recompute every store's aggregates from user_update. Returns the new rows."""
+    cursor.execute(SELECT_RATING_AGGREGATES)
+    rows = cursor.fetchall()
+    cursor.execute(DELETE_ALL_RATING_STATS)
+    stats = _stats_by_store(rows)
+    if stats:
+        cursor.executemany(UPSERT_RATING_STATS, [
+            (store_id,) + tuple(values[column] for column in RATING_STATS_COLUMNS)
+            for store_id, values in stats.items()
+        ])
+    return [{'storeID': store_id, **values} for store_id, values in stats.items()]
@@ -0,0 +1,282 @@
+import uuid
+from typing import Iterable, List, Optional, Tuple
+from utils.pagination import keyset_condition, keyset_order
+
+DAYS_OF_WEEK = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Columns the owner dashboard may edit one at a time
+UPDATABLE_STORE_COLUMNS = ('store_name', 'address', 'latitude', 'longitude', 'phone', 'email')
+
+SELECT_ALL_STORES = """
+    SELECT s.storeID, s.ownerID, s.store_name, s.rating,
+           s.address, s.latitude, s.longitude, s.phone, s.email,
+           COALESCE(r.rating_count, 0) as rating_count
+    FROM store s
+    JOIN store_owners o ON s.ownerID = o.ownerID
+    LEFT JOIN store_rating_stats r ON s.storeID = r.storeID
+"""
+
+# One keyset page of the listing; {where} and {order} come from keyset_condition/keyset_order
+SELECT_STORES_PAGE = """
+    SELECT s.storeID, s.ownerID, s.store_name, s.rating,
+           s.address, s.latitude, s.longitude, s.phone, s.email,
+           COALESCE(r.rating_count, 0) as rating_count
+    FROM store s
+    JOIN store_owners o ON s.ownerID = o.ownerID
+    LEFT JOIN store_rating_stats r ON s.storeID = r.storeID
+    WHERE {where}
+    ORDER BY {order}
+    LIMIT %s
+"""
+
+# sort name -> (column, result key, descending); ties break on storeID
+STORE_PAGE_SORTS = {
+    'id': ('s.storeID', 'storeID', False),
+    'rating': ('s.rating', 'rating', True),
+}
+
+SELECT_STORE = """
+    SELECT s.storeID, s.ownerID, s.store_name, s.rating,
+           s.address, s.latitude, s.longitude, s.phone, s.email
+    FROM store s
+    WHERE s.storeID = %s
+"""
+
+# A store with its rating aggregates, for the composite store page
+SELECT_STORE_DETAIL = """
+    SELECT s.storeID, s.ownerID, s.store_name, s.rating,
+           s.address, s.latitude, s.longitude, s.phone, s.email,
+           COALESCE(r.rating_count, 0) as rating_count,
+           COALESCE(r.count_1, 0) as count_1, COALESCE(r.count_2, 0) as count_2,
+           COALESCE(r.count_3, 0) as count_3, COALESCE(r.count_4, 0) as count_4,
+           COALESCE(r.count_5, 0) as count_5
+    FROM store s
+    LEFT JOIN store_rating_stats r ON s.storeID = r.storeID
+    WHERE s.storeID = %s
+"""
+
+SELECT_STORE_ROW = "SELECT * FROM store WHERE storeID = %s"
+
+SELECT_STORES_BY_IDS = """
+    SELECT s.storeID, s.ownerID, s.store_name, s.rating,
+           s.address, s.latitude, s.longitude, s.phone, s.email,
+           COALESCE(r.rating_count, 0) as rating_count
+    FROM store s
+    LEFT JOIN store_rating_stats r ON s.storeID = r.storeID
+    WHERE s.storeID IN ({placeholders})
+"""
+
+SELECT_STORE_LOCATIONS = "SELECT storeID, latitude, longitude FROM store"
+
+SELECT_STORE_SEARCH_TEXT = "SELECT storeID, store_name, address FROM store"
+
+SELECT_STORE_SUGGESTIONS = """
+    SELECT s.storeID, s.store_name, COALESCE(r.rating_count, 0) as rating_count
+    FROM store s
+    LEFT JOIN store_rating_stats r ON s.storeID = r.storeID
+"""
+
+# Substring search, used when the trigram index is unavailable
+# Covered by ix_store_rating (rating, storeID)
+SELECT_STORE_IDS_MIN_RATING = "SELECT storeID FROM store WHERE rating >= %s"
+
+SEARCH_STORES_LIKE = """
+    SELECT storeID
+    FROM store
+    WHERE store_name LIKE %s ESCAPE '!' OR address LIKE %s ESCAPE '!'
+    LIMIT %s
+"""
+
+# executemany() sends a list of these as multi-row INSERTs
+INSERT_STORE = """
+    INSERT INTO store (ownerID, store_name, rating, address,
+                     latitude, longitude, phone, email, batch_key)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# The IDs of a bulk insert, by the per-row keys it was given
+SELECT_STORE_IDS_BY_BATCH = "SELECT storeID, batch_key FROM store WHERE batch_key LIKE %s"
+
+UPDATE_STORE_FIELD = """
+    UPDATE store
+    SET {column} = %s
+    WHERE storeID = %s
+"""
+
+UPDATE_STORE_RATING = """
+    UPDATE store
+    SET rating = %s
+    WHERE storeID = %s
+"""
+
+SELECT_STORE_HOURS = """
+    SELECT
+        storeHourID,
+        storeID,
+        daysOpen,
+        openTime,
+        closeTime
+    FROM store_hours
+    WHERE storeID = %s
+"""
+
+SELECT_FORMATTED_STORE_HOURS = """
+    SELECT storeHourID, storeID, daysOpen,
+           TIME_FORMAT(openTime, '%%h:%%i %%p') as openTime,
+           TIME_FORMAT(closeTime, '%%h:%%i %%p') as closeTime
+    FROM store_hours
+    WHERE storeID = %s
+"""
+
+# PyMySQL's executemany() rewrites a plain INSERT ... VALUES into a single
+# multi-row statement, so a week of hours is one round trip
+INSERT_STORE_HOURS = """
+    INSERT INTO store_hours (storeID, daysOpen, openTime, closeTime)
+    VALUES (%s, %s, %s, %s)
+"""
+
+SELECT_ALL_STORE_HOURS = "SELECT storeID, daysOpen, openTime, closeTime FROM store_hours"
+
+DELETE_STORE_HOURS = "DELETE FROM store_hours WHERE storeID = %s"
+
+
+def get_all_stores(cursor) -> List[dict]:
+    cursor.execute(SELECT_ALL_STORES)
+    return cursor.fetchall()
+
+def store_page_key(row: dict, sort: str) -> tuple:
+    _, key, _ = STORE_PAGE_SORTS[sort]
+    return (row['storeID'],) if key == 'storeID' else (row[key], row['storeID'])
+
+def get_stores_page(cursor, limit: int, sort: str = 'id', after: Optional[Tuple] = None,
+                    store_ids: Optional[Iterable[int]] = None) -> List[dict]:
+    """Up to limit + 1 stores following `after`, so the caller can tell if another page exists.
+
+    With store_ids only those stores are paged over.
+    """
+    column, _, descending = STORE_PAGE_SORTS[sort]
+    where, params = keyset_condition(column, 's.storeID', descending, after)
+    if store_ids is not None:
+        store_ids = sorted(store_ids)
+        if not store_ids:
+            return []
+        where = f"{where} AND s.storeID IN ({','.join(['%s'] * len(store_ids))})"
+        params += tuple(store_ids)
+    cursor.execute(SELECT_STORES_PAGE.format(where=where, order=keyset_order(column, 's.storeID', descending)),
+                   params + (limit + 1,))
+    return cursor.fetchall()
+
+def get_store(cursor, store_id: int) -> Optional[dict]:
+    cursor.execute(SELECT_STORE, (store_id,))
+    return cursor.fetchone()
+
+def get_store_detail(cursor, store_id: int) -> Optional[dict]:
+    cursor.execute(SELECT_STORE_DETAIL, (store_id,))
+    return cursor.fetchone()
+
+def get_store_row(cursor, store_id: int) -> Optional[dict]:
+    cursor.execute(SELECT_STORE_ROW, (store_id,))
+    return cursor.fetchone()
+
+def get_stores_by_ids(cursor, store_ids: List[int]) -> List[dict]:
+    """Fetch several stores at once, returned in the order of store_ids."""
+    if not store_ids:
+        return []
+    placeholders = ','.join(['%s'] * len(store_ids))
+    cursor.execute(SELECT_STORES_BY_IDS.format(placeholders=placeholders), tuple(store_ids))
+    by_id = {row['storeID']: row for row in cursor.fetchall()}
+    return [by_id[store_id] for store_id in store_ids if store_id in by_id]
+
+def get_store_ids_with_min_rating(cursor, min_rating: float) -> set:
+    cursor.execute(SELECT_STORE_IDS_MIN_RATING, (min_rating,))
+    return {row['storeID'] for row in cursor.fetchall()}
+
+def get_store_locations(cursor) -> List[dict]:
+    cursor.execute(SELECT_STORE_LOCATIONS)
+    return cursor.fetchall()
+
+def get_store_search_text(cursor) -> List[dict]:
+    cursor.execute(SELECT_STORE_SEARCH_TEXT)
+    return cursor.fetchall()
+
+def get_store_suggestions(cursor) -> List[dict]:
+    cursor.execute(SELECT_STORE_SUGGESTIONS)
+    return cursor.fetchall()
+
+def search_stores_like(cursor, text: str, limit: int) -> List[int]:
+    pattern = '%' + text.replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+    cursor.execute(SEARCH_STORES_LIKE, (pattern, pattern, limit))
+    return [row['storeID'] for row in cursor.fetchall()]
+
+def _store_values(store: dict, rating: float) -> tuple:
+    return (store['ownerID'], store['store_name'], rating, store['address'],
+            store['latitude'], store['longitude'], store['phone'], store['email'])
+
+def insert_store(cursor, store: dict, rating: float = 0.00) -> int:
+    cursor.execute(INSERT_STORE, (*_store_values(store, rating), None))
+    return cursor.lastrowid
+
+def insert_stores(cursor, stores: List[dict], rating: float = 0.00) -> List[int]:
+    """Insert many stores in multi-row INSERTs and return their IDs in order.
+
+    executemany() may split the rows over several statements, so the IDs are
+    not derived from lastrowid. Each row gets a key under a random batch
+    prefix, and the IDs are read back by that key.
+    """
+    if not stores:
+        return []
+    batch = uuid.uuid4().hex
+    cursor.executemany(INSERT_STORE, [
+        (*_store_values(store, rating), f"{batch}:{index}") for index, store in enumerate(stores)
+    ])
+    cursor.execute(SELECT_STORE_IDS_BY_BATCH, (f"{batch}:%",))
+    ids = {row['batch_key']: row['storeID'] for row in cursor.fetchall()}
+    return [ids[f"{batch}:{index}"] for index in range(len(stores))]
+
+def insert_hours_for_stores(cursor, hours: List[tuple]) -> None:
+    """Insert (storeID, daysOpen, openTime, closeTime) rows for several stores at once."""
+    if hours:
+        cursor.executemany(INSERT_STORE_HOURS, hours)
+
+def update_store_field(cursor, store_id: int, column: str, value) -> None:
+    if column not in UPDATABLE_STORE_COLUMNS:
+        raise ValueError(f"Invalid store column: {column}")
+    cursor.execute(UPDATE_STORE_FIELD.format(column=column), (value, store_id))
+
+def update_store_rating(cursor, store_id: int, rating: float) -> None:
+    cursor.execute(UPDATE_STORE_RATING, (rating, store_id))
+
+def update_store_ratings(cursor, ratings: List[tuple]) -> None:
+    """Set several stores' ratings from (storeID, rating) pairs."""
+    if ratings:
+        cursor.executemany(UPDATE_STORE_RATING, [(rating, store_id) for store_id, rating in ratings])
+
+def sort_by_weekday(hours: List[dict]) -> List[dict]:
+    # At most seven rows, so ordering here avoids a filesort on ORDER BY FIELD()
+    order = {day: i for i, day in enumerate(DAYS_OF_WEEK)}
+    return sorted(hours, key=lambda hour: order.get(hour['daysOpen'], len(order)))
+
+def get_store_hours(cursor, store_id: int) -> List[dict]:
+    cursor.execute(SELECT_STORE_HOURS, (store_id,))
+    return sort_by_weekday(cursor.fetchall())
+
+def get_formatted_store_hours(cursor, store_id: int) -> List[dict]:
+    cursor.execute(SELECT_FORMATTED_STORE_HOURS, (store_id,))
+    return sort_by_weekday(cursor.fetchall())
+
+def get_all_store_hours(cursor) -> List[dict]:
+    cursor.execute(SELECT_ALL_STORE_HOURS)
+    return cursor.fetchall()
+
+def insert_store_hours(cursor, store_id: int, hours: List[dict]) -> None:
+    """Insert all of a store's hours rows in one batched statement."""
+    if not hours:
+        return
+    cursor.executemany(INSERT_STORE_HOURS, [
+        (store_id, hour['daysOpen'], hour['openTime'], hour['closeTime'])
+        for hour in hours
+    ])
+
+def replace_store_hours(cursor, store_id: int, hours: List[dict]) -> None:
+    cursor.execute(DELETE_STORE_HOURS, (store_id,))
+    insert_store_hours(cursor, store_id, hours)
@@ -0,0 +1,44 @@
+from typing import List, Optional
+
+INSERT_STORE_OWNER = """
+    INSERT INTO store_owners (userID)
+    VALUES (%s)
+"""
+
+INSERT_SUBSCRIPTION = """
+    INSERT INTO subscriptions (ownerID, start_date, end_date, join_fee)
+    VALUES (%s, %s, %s, %s)
+"""
+
+SELECT_LATEST_SUBSCRIPTION = """
+    SELECT * FROM subscriptions
+    WHERE ownerID = %s
+    ORDER BY start_date DESC
+    LIMIT 1
+"""
+
+SELECT_TOTAL_REVENUE = "SELECT SUM(join_fee) AS total_revenue FROM subscriptions"
+
+SELECT_ALL_SUBSCRIPTIONS = "SELECT * FROM subscriptions"
+
+
+def insert_store_owner(cursor, user_id: int) -> int:
+    cursor.execute(INSERT_STORE_OWNER, (user_id,))
+    return cursor.lastrowid
+
+def insert_subscription(cursor, owner_id: int, start_date, end_date, join_fee) -> int:
+    cursor.execute(INSERT_SUBSCRIPTION, (owner_id, start_date, end_date, join_fee))
+    return cursor.lastrowid
+
+def get_latest_subscription(cursor, owner_id: int) -> Optional[dict]:
+    cursor.execute(SELECT_LATEST_SUBSCRIPTION, (owner_id,))
+    return cursor.fetchone()
+
+def get_total_revenue(cursor):
+    cursor.execute(SELECT_TOTAL_REVENUE)
+    result = cursor.fetchone()
+    return result["total_revenue"] if result and result["total_revenue"] is not None else 0
+
+def get_all_subscriptions(cursor) -> List[dict]:
+    cursor.execute(SELECT_ALL_SUBSCRIPTIONS)
+    return cursor.fetchall()
@@ -0,0 +1,47 @@
+from typing import Optional
+
+UPDATABLE_USER_COLUMNS = ('first_name', 'last_name', 'email', 'user_password')
+
+SELECT_LOGIN_USER = """
+    SELECT users.userID, users.email, users.user_password, store_owners.ownerID
+    FROM users
+    LEFT JOIN store_owners ON users.userID = store_owners.userID
+    WHERE users.email = %s
+"""
+
+SELECT_USER_PROFILE = "SELECT first_name, last_name, email FROM users WHERE userID = %s"
+
+SELECT_USER_BY_EMAIL = "SELECT userID FROM users WHERE email = %s"
+
+INSERT_USER = """
+    INSERT INTO users (first_name, last_name, email, user_password)
+    VALUES (%s, %s, %s, %s)
+"""
+
+UPDATE_USER_FIELD = """
+    UPDATE users
+    SET {column} = %s
+    WHERE userID = %s
+"""
+
+
+def get_login_user(cursor, email: str) -> Optional[dict]:
+    cursor.execute(SELECT_LOGIN_USER, (email,))
+    return cursor.fetchone()
+
+def get_user_profile(cursor, user_id: int) -> Optional[dict]:
+    cursor.execute(SELECT_USER_PROFILE, (user_id,))
+    return cursor.fetchone()
+
+def email_exists(cursor, email: str) -> bool:
+    cursor.execute(SELECT_USER_BY_EMAIL, (email,))
+    return cursor.fetchone() is not None
+
+def insert_user(cursor, first_name: str, last_name: str, email: str, password: str) -> int:
+    cursor.execute(INSERT_USER, (first_name, last_name, email, password))
+    return cursor.lastrowid
+
+def update_user_field(cursor, user_id: int, column: str, value) -> None:
+    if column not in UPDATABLE_USER_COLUMNS:
+        raise ValueError(f"Invalid user column: {column}")
+    cursor.execute(UPDATE_USER_FIELD.format(column=column), (value, user_id))
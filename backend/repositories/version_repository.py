@@ -0,0 +1,19 @@
+from typing import Dict
+
+SELECT_TABLE_VERSIONS = "SELECT table_name, version, modified_at FROM table_versions"
+
+# modified_at is Unix seconds, set by the app so it is the same on MySQL and SQLite
+BUMP_TABLE_VERSION = """
+    UPDATE table_versions
+    SET version = version + 1, modified_at = %s
+    WHERE table_name = %s
+"""
+
+
+def get_table_versions(cursor) -> Dict[str, dict]:
+    cursor.execute(SELECT_TABLE_VERSIONS)
+    return {row['table_name']: {'version': int(row['version']), 'modified_at': int(row['modified_at'])}
+            for row in cursor.fetchall()}
+
+def bump_table_version(cursor, table: str, modified_at: int) -> None:
+    cursor.execute(BUMP_TABLE_VERSION, (modified_at, table))
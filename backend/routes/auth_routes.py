@@ -1,11 +1,18 @@
 import pymysql.cursors
 from flask import Blueprint, request, jsonify, session
+import db
 from db import get_db_connection
+from indexes import user_roles
+from repositories import user_repository
+from utils.auth import issue_token, require_auth
+from utils.passwords import HashingBusy, hash_password, verify_password
 
 auth_bp = Blueprint('auth_bp', __name__)
 
 @auth_bp.route('/api/login', methods=['POST'])
 def login():
+    connection = None
+    cursor = None
     try:
         data = request.get_json()
         email = data.get('email')
@@ -18,30 +25,31 @@ def login():
         cursor = connection.cursor(pymysql.cursors.DictCursor)
 
         # First check users table
-        cursor.execute("""
-            SELECT users.*, store_owners.ownerID 
-            FROM users 
-            LEFT JOIN store_owners ON users.userID = store_owners.userID 
-            WHERE users.email = %s
-        """, (email,))
-        user = cursor.fetchone()
-
-        if user and user['user_password'] == password:
-            # Determine if user is a business owner
-            is_business = user['ownerID'] is not None
+        user = user_repository.get_login_user(cursor, email)
+        matches, rehash = verify_password(password, user['user_password']) if user else (False, False)
 
+        if matches:
+            # Plaintext and outdated hashes are replaced on a successful login
+            if rehash:
+                user_repository.update_user_field(cursor, user['userID'], 'user_password', hash_password(password))
+                connection.commit()
+
+            identity = user_roles.remember(user['userID'], user['ownerID'])
             return jsonify({
                 'message': 'User logged in successfully',
                 'user': {
                     'userID': user['userID'],
                     'email': user['email'],
-                    'role': 'business' if is_business else 'shopper',
-                    'ownerID': user['ownerID'] if is_business else None
-                }
+                    'role': identity['role'],
+                    'ownerID': identity['ownerID']
+                },
+                **issue_token(identity)
             }), 200
         else:
             return jsonify({'error': 'Invalid credentials'}), 401
 
+    except HashingBusy:
+        return jsonify({'error': 'Too many logins in progress, try again shortly'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -57,12 +65,14 @@ def logout():
     return jsonify({'message': 'Logged out'})
 
 @auth_bp.route('/api/users/<int:userId>', methods=['GET'])
+@require_auth(self_arg='userId')
 def get_user(userId):
+    connection = None
+    cursor = None
     try:
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
-        cursor.execute("SELECT first_name, last_name, email FROM users WHERE userID = %s", (userId,))
-        user = cursor.fetchone()
+        user = user_repository.get_user_profile(cursor, userId)
 
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -79,7 +89,10 @@ def get_user(userId):
             connection.close()
 
 @auth_bp.route('/api/users/<int:userId>', methods=['PUT'])
+@require_auth(self_arg='userId')
 def update_user(userId):
+    connection = None
+    cursor = None
     try:
         data = request.get_json()
         field = data.get('field')
@@ -103,21 +116,22 @@ def update_user(userId):
         if not db_field:
             return jsonify({'error': 'Invalid field'}), 400
 
+        if db_field == 'user_password':
+            value = hash_password(value)
+
         # Update the specified field
-        cursor.execute(f"""
-            UPDATE users 
-            SET {db_field} = %s
-            WHERE userID = %s
-        """, (value, userId))
+        user_repository.update_user_field(cursor, userId, db_field, value)
         
         connection.commit()
+        db.after_commit(lambda: user_roles.invalidate(userId))
 
         # Fetch updated user data
-        cursor.execute("SELECT first_name, last_name, email FROM users WHERE userID = %s", (userId,))
-        updated_user = cursor.fetchone()
+        updated_user = user_repository.get_user_profile(cursor, userId)
 
         return jsonify(updated_user), 200
 
+    except HashingBusy:
+        return jsonify({'error': 'Too many password changes in progress, try again shortly'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"Error updating user: {e}")
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify
+from db import get_pool_stats
+from utils import admission
+
+health_bp = Blueprint('health_bp', __name__)
+
+@health_bp.route('/api/health/db', methods=['GET'])
+def get_db_health():
+    try:
+        return jsonify(get_pool_stats()), 200
+    except Exception as e:
+        print(f"Error fetching pool stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@health_bp.route('/api/health/admission', methods=['GET'])
+def get_admission_health():
+    """In-flight, queued and rejected requests per admission lane."""
+    return jsonify(admission.stats()), 200
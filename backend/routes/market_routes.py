@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+from flask import Blueprint, jsonify, request
+from controllers.market_controller import MarketController, MARKET_BUCKETS
+from repositories.market_repository import MARKET_SEGMENT_FILTERS
+from utils.http_cache import conditional_get
+
+market_bp = Blueprint('market_bp', __name__)
+market_controller = MarketController()
+
+DEFAULT_RANGE_DAYS = 90
+
+@market_bp.route('/api/market/index', methods=['GET'])
+@conditional_get('market_price')
+def get_market_index():
+    """Price per gram over time: ?type=&purity=&color=&from=YYYY-MM-DD&to=YYYY-MM-DD&bucket=day|week|month"""
+    try:
+        try:
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+            start = (date.fromisoformat(request.args['from']) if request.args.get('from')
+                     else end - timedelta(days=DEFAULT_RANGE_DAYS))
+        except ValueError:
+            return jsonify({"error": "from and to must be dates (YYYY-MM-DD)"}), 400
+        if start > end:
+            return jsonify({"error": "from must not be after to"}), 400
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in MARKET_BUCKETS:
+            return jsonify({"error": f"bucket must be one of {', '.join(MARKET_BUCKETS)}"}), 400
+
+        segment = {name: request.args[name] for name in MARKET_SEGMENT_FILTERS if request.args.get(name)}
+        series = market_controller.get_index(segment, start, end, bucket)
+        return jsonify({'from': start.isoformat(), 'to': end.isoformat(), 'bucket': bucket,
+                        **segment, 'series': series})
+    except Exception as e:
+        print(f"Error getting market index: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -1,18 +1,44 @@
 from flask import Blueprint, jsonify, request
+from controllers.deal_controller import DealController
+from controllers.leaderboard_controller import LeaderboardController
 from controllers.product_controller import ProductController
+import db
 from db import get_db_connection
+from config import Config
+from indexes import product_catalog, suggestions, table_versions
+from repositories import product_repository
+from utils.auth import acting_as, require_auth
+from utils.http_cache import conditional_get
+from utils.pagination import page_args
 import pymysql.cursors
 import logging
 
 product_bp = Blueprint('product_bp', __name__)
 product_controller = ProductController()
+deal_controller = DealController()
+leaderboard_controller = LeaderboardController()
 
 @product_bp.route('/api/products', methods=['GET'])
+@conditional_get('product')
 def get_products():
     try:
         store_id = request.args.get('storeID')
         if store_id:
             store_id = int(store_id)
+
+        # ?limit=&cursor=&sort=id|price returns one keyset page; without them
+        # the full list is returned as before
+        try:
+            page = page_args(request.args, product_repository.PRODUCT_PAGE_SORTS,
+                             Config.PAGE_DEFAULT_LIMIT, Config.PAGE_MAX_LIMIT, id_column='productID')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if page is not None:
+            limit, sort, after = page
+            products, next_cursor = product_controller.get_products_page(limit, sort, after, store_id or None)
+            return jsonify({'items': products, 'next_cursor': next_cursor})
+
+        if store_id:
             products = product_controller.get_products_by_store(store_id)
         else:
             products = product_controller.get_all_products()
@@ -21,6 +47,111 @@ def get_products():
         print(f"Error getting products: {e}")
         return jsonify({"error": str(e)}), 500
 
+def _list_arg(name: str) -> list:
+    """Values of a filter given repeated (?x=a&x=b) or comma-separated (?x=a,b)."""
+    return [value.strip() for raw in request.args.getlist(name) for value in raw.split(',') if value.strip()]
+
+def _search_filters() -> dict:
+    """Facet, range and store filters from the query string; raises ValueError on bad numbers."""
+    filters = {column: _list_arg(column) for column in product_repository.FACET_COLUMNS}
+    for name in product_repository.RANGE_FILTERS:
+        if request.args.get(name):
+            filters[name] = float(request.args[name])
+    if request.args.get('storeID'):
+        filters['store_ids'] = [int(value) for value in _list_arg('storeID')]
+    return filters
+
+@product_bp.route('/api/products/search', methods=['GET'])
+@conditional_get('product', 'store')
+def search_products():
+    try:
+        try:
+            filters = _search_filters()
+            near = None
+            if any(request.args.get(name) for name in ('lat', 'lng', 'radius')):
+                near = (float(request.args['lat']), float(request.args['lng']), float(request.args['radius']))
+                if near[2] <= 0:
+                    raise ValueError("radius must be positive")
+
+            args = request.args.to_dict()
+            args.setdefault('limit', Config.PAGE_DEFAULT_LIMIT)
+            limit, sort, after = page_args(args, product_repository.PRODUCT_PAGE_SORTS,
+                                           Config.PAGE_DEFAULT_LIMIT, Config.PAGE_MAX_LIMIT,
+                                           id_column='productID')
+        except (KeyError, ValueError) as e:
+            message = f"Missing parameter: {e}" if isinstance(e, KeyError) else str(e)
+            return jsonify({"error": message}), 400
+
+        return jsonify(product_controller.search_products(filters, limit, sort, after, near))
+    except Exception as e:
+        print(f"Error searching products: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@product_bp.route('/api/products/stats', methods=['GET'])
+@conditional_get('product')
+def get_price_stats():
+    """Set-price statistics per value of ?group_by=, under the same filters as search."""
+    try:
+        group_by = request.args.get('group_by', 'chain_type')
+        if group_by not in product_repository.FACET_COLUMNS:
+            return jsonify({"error": f"group_by must be one of {', '.join(product_repository.FACET_COLUMNS)}"}), 400
+        try:
+            filters = _search_filters()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        stats = product_controller.get_price_stats(filters, group_by)
+        if stats is None:
+            return jsonify({"error": "Price statistics are unavailable"}), 503
+        return jsonify({'group_by': group_by, 'groups': stats})
+    except Exception as e:
+        print(f"Error getting price stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@product_bp.route('/api/products/best-deals', methods=['GET'])
+@conditional_get('product_deals', 'product', 'store')
+def get_best_deals():
+    """Lowest price per gram of pure gold first: ?type=Rope&length=20&limit=20"""
+    try:
+        chain_type = request.args.get('type') or None
+        try:
+            length = float(request.args['length']) if request.args.get('length') else None
+            limit = int(request.args.get('limit', Config.PAGE_DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({"error": "length and limit must be numbers"}), 400
+        if not 1 <= limit <= Config.PAGE_MAX_LIMIT:
+            return jsonify({"error": f"limit must be between 1 and {Config.PAGE_MAX_LIMIT}"}), 400
+        if length is not None and chain_type is None:
+            return jsonify({"error": "length requires type"}), 400
+
+        return jsonify(deal_controller.get_best_deals(limit, chain_type, length))
+    except Exception as e:
+        print(f"Error getting best deals: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@product_bp.route('/api/products/purchases', methods=['GET', 'POST'])
+def get_purchases_for_products():
+    """Latest purchases of many products: ?ids=1,2,3 or a POST body {"ids": [1, 2, 3]}."""
+    try:
+        try:
+            if request.method == 'POST':
+                ids = (request.get_json(silent=True) or {}).get('ids') or []
+            else:
+                ids = _list_arg('ids')
+            product_ids = list(dict.fromkeys(int(product_id) for product_id in ids))
+        except (TypeError, ValueError):
+            return jsonify({"error": "ids must be a list of product IDs"}), 400
+        if not product_ids:
+            return jsonify({"error": "ids is required"}), 400
+        if len(product_ids) > Config.PAGE_MAX_LIMIT:
+            return jsonify({"error": f"At most {Config.PAGE_MAX_LIMIT} ids per request"}), 400
+
+        purchases = product_controller.get_purchases_for_products(product_ids)
+        return jsonify({str(product_id): rows for product_id, rows in purchases.items()})
+    except Exception as e:
+        print(f"Error getting purchases: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @product_bp.route('/api/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     try:
@@ -39,6 +170,7 @@ def get_product(product_id):
         return jsonify({"error": str(e)}), 500
 
 @product_bp.route('/api/products/<int:productID>/purchases', methods=['POST'])
+@require_auth()
 def submit_purchase(productID):
     try:
         data = request.get_json()
@@ -49,6 +181,8 @@ def submit_purchase(productID):
 
         if not all([userID, productID, storeID, latest_price, purchase_date]):
             return jsonify({'error': 'Missing required fields'}), 400
+        if not acting_as(userID):
+            return jsonify({'error': 'Not allowed for this account'}), 403
 
         product_controller = ProductController()
         success = product_controller.submit_purchase(
@@ -65,47 +199,50 @@ def submit_purchase(productID):
         return jsonify({'error': str(e)}), 500
 
 @product_bp.route('/api/products', methods=['POST'])
+@require_auth('business')
 def create_product():
     try:
         data = request.get_json()
+
+        # A JSON array creates many products at once
+        is_batch = isinstance(data, list)
+        products = data if is_batch else [data]
         
         # Validate required fields
         required_fields = ['storeID', 'chain_type', 'chain_purity', 'chain_thickness', 
                          'chain_length', 'chain_color', 'chain_weight', 'set_price']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        for product in products:
+            for field in required_fields:
+                if field not in product:
+                    return jsonify({'error': f'Missing required field: {field}'}), 400
 
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
 
         try:
-            # Insert product
-            cursor.execute("""
-                INSERT INTO product (
-                    storeID, chain_type, chain_purity, chain_thickness,
-                    chain_length, chain_color, chain_weight, set_price
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                data['storeID'],
-                data['chain_type'],
-                data['chain_purity'],
-                data['chain_thickness'],
-                data['chain_length'],
-                data['chain_color'],
-                data['chain_weight'],
-                data['set_price']
-            ))
+            if is_batch:
+                # The whole list in one transaction
+                product_ids = product_repository.insert_products(cursor, products)
+                deal_controller.refresh_products(cursor, product_ids)
+                leaderboard_controller.refresh_stores(cursor, [product['storeID'] for product in products])
+                table_versions.mark_changed(cursor, 'product')
+                created = product_repository.get_products_by_ids(cursor, product_ids)
+                db.after_commit(lambda: product_catalog.update_products(created))
+                db.after_commit(lambda: suggestions.count_products(created, 1))
+                connection.commit()
+                return jsonify({'productIDs': product_ids}), 201
 
+            # Insert product
+            product_id = product_repository.insert_product(cursor, data)
+            deal_controller.refresh_products(cursor, [product_id])
+            leaderboard_controller.refresh_stores(cursor, [data['storeID']])
+            table_versions.mark_changed(cursor, 'product')
             connection.commit()
-            product_id = cursor.lastrowid
 
             # Return the created product
-            cursor.execute("""
-                SELECT * FROM product WHERE productID = %s
-            """, (product_id,))
-            
-            new_product = cursor.fetchone()
+            new_product = product_repository.get_product(cursor, product_id)
+            db.after_commit(lambda: product_catalog.update_product(new_product))
+            db.after_commit(lambda: suggestions.count_products([new_product], 1))
             return jsonify(new_product), 201
 
         except Exception as e:
@@ -121,6 +258,7 @@ def create_product():
         return jsonify({'error': str(e)}), 500
 
 @product_bp.route('/api/products/<int:productID>', methods=['PUT'])
+@require_auth('business')
 def update_product(productID):
     try:
         data = request.get_json()
@@ -136,36 +274,22 @@ def update_product(productID):
         cursor = connection.cursor(pymysql.cursors.DictCursor)
 
         try:
-            # Update product
-            cursor.execute("""
-                UPDATE product 
-                SET chain_type = %s, 
-                    chain_purity = %s, 
-                    chain_thickness = %s,
-                    chain_length = %s, 
-                    chain_color = %s, 
-                    chain_weight = %s, 
-                    set_price = %s
-                WHERE productID = %s
-            """, (
-                data['chain_type'],
-                data['chain_purity'],
-                data['chain_thickness'],
-                data['chain_length'],
-                data['chain_color'],
-                data['chain_weight'],
-                data['set_price'],
-                productID
-            ))
-
+            # Update product; the old row moves its attribute values' suggestion counts
+            previous = product_repository.get_product(cursor, productID)
+            product_repository.update_product(cursor, productID, data)
+            deal_controller.refresh_products(cursor, [productID])
+            if previous is not None:
+                # The store may have gained or lost a chain type
+                leaderboard_controller.refresh_stores(cursor, [previous['storeID']])
+            table_versions.mark_changed(cursor, 'product')
             connection.commit()
 
             # Return the updated product
-            cursor.execute("""
-                SELECT * FROM product WHERE productID = %s
-            """, (productID,))
-            
-            updated_product = cursor.fetchone()
+            updated_product = product_repository.get_product(cursor, productID)
+            if updated_product is not None:
+                db.after_commit(lambda: product_catalog.update_product(updated_product))
+                db.after_commit(lambda: suggestions.count_products([previous], -1))
+                db.after_commit(lambda: suggestions.count_products([updated_product], 1))
             return jsonify(updated_product), 200
 
         except Exception as e:
@@ -181,6 +305,7 @@ def update_product(productID):
         return jsonify({'error': str(e)}), 500
 
 @product_bp.route('/api/products/<int:productID>', methods=['DELETE'])
+@require_auth('business')
 def delete_product(productID):
     try:
         connection = get_db_connection()
@@ -188,7 +313,15 @@ def delete_product(productID):
 
         try:
             # Delete product
-            cursor.execute("DELETE FROM product WHERE productID = %s", (productID,))
+            previous = product_repository.get_product(cursor, productID)
+            product_repository.delete_product(cursor, productID)
+            deal_controller.refresh_products(cursor, [productID])
+            if previous is not None:
+                leaderboard_controller.refresh_stores(cursor, [previous['storeID']])
+            table_versions.mark_changed(cursor, 'product')
+            db.after_commit(lambda: product_catalog.remove_product(productID))
+            if previous is not None:
+                db.after_commit(lambda: suggestions.count_products([previous], -1))
             connection.commit()
             
             return jsonify({'message': 'Product deleted successfully'}), 200
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from controllers.store_controller import StoreController
 from db import get_db_connection
+from indexes import table_versions
+from repositories import rating_repository
+from utils.auth import acting_as, require_auth
 import pymysql
 import logging
 
@@ -11,6 +14,7 @@ rating_bp = Blueprint('rating_bp', __name__)
 store_controller = StoreController()
 
 @rating_bp.route('/api/ratings/<int:storeID>', methods=['POST'])
+@require_auth()
 def submit_rating(storeID):
     connection = None
     cursor = None
@@ -24,8 +28,12 @@ def submit_rating(storeID):
 
         if not all([userID, productID, rating]):
             return jsonify({'error': 'Missing required fields'}), 400
+        if not acting_as(userID):
+            return jsonify({'error': 'Not allowed for this account'}), 403
 
         rating = int(rating)  # Ensure rating is numeric
+        if not 1 <= rating <= 5:
+            return jsonify({'error': 'Rating must be between 1 and 5'}), 400
 
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
@@ -33,38 +41,31 @@ def submit_rating(storeID):
         logger.info(f"\u2192 Updating rating for storeID: {storeID}, productID: {productID}, userID: {userID}")
 
         # First check if a rating exists
-        cursor.execute("""
-            SELECT updateID 
-            FROM user_update 
-            WHERE userID = %s AND storeID = %s AND productID = %s
-        """, (userID, storeID, productID))
-        
-        existing_rating = cursor.fetchone()
+        existing_rating = rating_repository.find_rating(cursor, userID, storeID, productID)
 
         if existing_rating:
             # Update existing rating
-            cursor.execute("""
-                UPDATE user_update 
-                SET rating = %s, submitted_at = CURRENT_TIMESTAMP
-                WHERE updateID = %s
-            """, (rating, existing_rating['updateID']))
+            rating_repository.update_rating(cursor, existing_rating['updateID'], rating)
             logger.info(f"Updated existing rating (updateID: {existing_rating['updateID']})")
+            previous = existing_rating['rating']
         else:
             # Insert new rating
-            cursor.execute("""
-                INSERT INTO user_update (userID, productID, storeID, rating)
-                VALUES (%s, %s, %s, %s)
-            """, (userID, productID, storeID, rating))
+            rating_repository.insert_rating(cursor, userID, productID, storeID, rating)
             logger.info("Inserted new rating")
+            previous = None
+
+        # Move the store's sum/count/histogram by the difference, in the same
+        # transaction as the rating itself
+        if previous is None or int(previous) != rating:
+            rating_repository.apply_rating_delta(cursor, storeID, rating_repository.rating_delta(previous, rating))
 
+        # Update store's average rating on the same request connection so the
+        # rating and the aggregate are committed together
+        store_controller.update_store_rating(storeID)
+        logger.info("Store rating updated successfully")
+
+        table_versions.mark_changed(cursor, 'user_update')
         connection.commit()
-        
-        # Update store's average rating
-        try:
-            store_controller.update_store_rating(storeID)  # Remove cursor and connection parameters
-            logger.info("Store rating updated successfully")
-        except Exception as e:
-            logger.error(f"Failed to update store rating: {e}")
 
         return jsonify({'message': 'Rating submitted successfully'}), 200
 
@@ -87,17 +88,8 @@ def get_user_rating(storeID, userID):
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         
-        # Query to get the user's most recent rating for the store
-        query = """
-            SELECT rating 
-            FROM user_update 
-            WHERE storeID = %s AND userID = %s 
-            ORDER BY submitted_at DESC 
-            LIMIT 1
-        """
-        
-        cursor.execute(query, (storeID, userID))
-        result = cursor.fetchone()
+        # Get the user's most recent rating for the store
+        result = rating_repository.get_user_rating(cursor, storeID, userID)
         
         if result:
             return jsonify({'rating': float(result['rating'])}), 200
@@ -122,21 +114,7 @@ def get_rating_distribution(storeID):
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
         
-        cursor.execute("""
-            SELECT rating, COUNT(*) as count
-            FROM user_update
-            WHERE storeID = %s AND rating IS NOT NULL
-            GROUP BY rating
-        """, (storeID,))
-        
-        results = cursor.fetchall()
-        
-        # Initialize distribution with zeros
-        distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        
-        # Update with actual counts
-        for row in results:
-            distribution[int(row['rating'])] = row['count']
+        distribution = rating_repository.get_rating_distribution(cursor, storeID)
             
         return jsonify(distribution), 200
 
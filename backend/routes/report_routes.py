@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 import pymysql.cursors
 from db import get_db_connection
+from repositories import subscription_repository
 
 
 report_bp = Blueprint('report_bp', __name__)
@@ -13,14 +14,11 @@ def get_reports():
        cursor = connection.cursor(pymysql.cursors.DictCursor)
       
        # Fetch total join fee
-       cursor.execute("SELECT SUM(join_fee) AS total_revenue FROM subscriptions")
-       result = cursor.fetchone()
-       total_revenue = result["total_revenue"] if result and result["total_revenue"] is not None else 0
+       total_revenue = subscription_repository.get_total_revenue(cursor)
 
 
        # Fetch all subscriptions (reports)
-       cursor.execute("SELECT * FROM subscriptions")
-       reports = cursor.fetchall()
+       reports = subscription_repository.get_all_subscriptions(cursor)
       
        return jsonify({"reports": reports, "total": total_revenue}), 200
    except Exception as e:
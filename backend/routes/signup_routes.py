@@ -1,6 +1,10 @@
 import pymysql.cursors
 from flask import Blueprint, request, jsonify, session
 from db import get_db_connection
+from indexes import user_roles
+from repositories import user_repository
+from utils.auth import issue_token
+from utils.passwords import HashingBusy, hash_password
 
 signup_bp = Blueprint('signup_bp', __name__)
 
@@ -24,8 +28,7 @@ def signup():
         cursor = connection.cursor(pymysql.cursors.DictCursor)
 
         # Check for duplicate email
-        cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-        if cursor.fetchone():
+        if user_repository.email_exists(cursor, email):
             return jsonify({'error': 'Email already exists'}), 409
 
         # Start transaction
@@ -33,12 +36,7 @@ def signup():
 
         try:
             # Insert into users table first
-            cursor.execute("""
-                INSERT INTO users (first_name, last_name, email, user_password)
-                VALUES (%s, %s, %s, %s)
-            """, (first_name, last_name, email, password))
-            
-            user_id = cursor.lastrowid
+            user_id = user_repository.insert_user(cursor, first_name, last_name, email, hash_password(password))
             
             # Commit transaction
             connection.commit()
@@ -55,7 +53,8 @@ def signup():
                     "first_name": first_name,
                     "last_name": last_name,
                     "email": email
-                }
+                },
+                **issue_token(user_roles.remember(user_id, None))
             }
 
             return jsonify(response_data), 201
@@ -64,6 +63,8 @@ def signup():
             connection.rollback()
             raise e
 
+    except HashingBusy:
+        return jsonify({'error': 'Too many signups in progress, try again shortly'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print("Signup error:", e)
         return jsonify({'error': str(e)}), 500
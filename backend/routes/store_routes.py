@@ -1,21 +1,169 @@
+import io
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
-from controllers.store_controller import StoreController
+from controllers.leaderboard_controller import LeaderboardController
+from controllers.store_controller import StoreController, STORE_FULL_SECTIONS
+from config import Config
+import db
 from db import get_db_connection
+from indexes import store_hours, store_locations, store_search, suggestions, table_versions
+from repositories import leaderboard_repository, store_repository
+from utils.auth import owns, require_auth
+from utils.http_cache import conditional_get
+from utils.leaderboard_score import cell_key
+from utils.pagination import page_args
+from utils.store_import import parse_csv, parse_ndjson
 import pymysql.cursors
 
 store_bp = Blueprint('store_bp', __name__)
 store_controller = StoreController()
+leaderboard_controller = LeaderboardController()
+
+def open_filter():
+    """The moment named by ?open_now=true or ?open_at=<ISO datetime>, or None."""
+    if request.args.get('open_at'):
+        try:
+            return datetime.fromisoformat(request.args['open_at'])
+        except ValueError:
+            raise ValueError("open_at must be an ISO 8601 datetime")
+    if request.args.get('open_now', '').lower() == 'true':
+        return datetime.now(timezone.utc)
+    return None
+
+def open_now_minute():
+    # open_now answers change every minute, so they must not share an ETag
+    if request.args.get('open_now', '').lower() == 'true':
+        return store_hours.local_time().strftime('%Y-%m-%d %H:%M')
+    return None
 
 @store_bp.route('/api/stores', methods=['GET'])
+@conditional_get('store', 'store_hours', 'user_update', vary=open_now_minute)
 def get_stores():
     try:
-        stores = store_controller.get_all_stores()
+        try:
+            open_at = open_filter()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # ?limit=&cursor=&sort=id|rating returns one keyset page; without them
+        # the full list is returned as before
+        try:
+            page = page_args(request.args, store_repository.STORE_PAGE_SORTS,
+                             Config.PAGE_DEFAULT_LIMIT, Config.PAGE_MAX_LIMIT, id_column='s.storeID')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if page is not None:
+            stores, next_cursor = store_controller.get_stores_page(*page, open_at=open_at)
+            return jsonify({'items': stores, 'next_cursor': next_cursor})
+
+        stores = store_controller.get_all_stores(open_at)
         return jsonify(stores)
     except Exception as e:
         print(f"Error getting stores: {e}")
         return jsonify({"error": str(e)}), 500
 
+@store_bp.route('/api/stores/nearby', methods=['GET'])
+def get_nearby_stores():
+    try:
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        radius = request.args.get('radius', type=float)
+        k = request.args.get('k', type=int)
+        try:
+            open_at = open_filter()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if lat is None or lng is None:
+            return jsonify({"error": "lat and lng are required"}), 400
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return jsonify({"error": "lat/lng out of range"}), 400
+        if radius is not None and not 0 < radius <= Config.NEARBY_MAX_RADIUS_KM:
+            return jsonify({"error": f"radius must be between 0 and {Config.NEARBY_MAX_RADIUS_KM:g} km"}), 400
+        if k is not None and k <= 0:
+            return jsonify({"error": "k must be positive"}), 400
+
+        # radius is in kilometres; k is always capped so a wide radius
+        # cannot return the whole table
+        if k is None:
+            k = Config.NEARBY_MAX_RESULTS if radius is not None else 10
+        k = min(k, Config.NEARBY_MAX_RESULTS)
+
+        stores = store_controller.get_nearby_stores(lat, lng, radius_km=radius, k=k, open_at=open_at)
+        return jsonify(stores)
+    except Exception as e:
+        print(f"Error getting nearby stores: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@store_bp.route('/api/stores/top', methods=['GET'])
+@conditional_get('store_leaderboard', 'store')
+def get_top_stores():
+    """Best-rated stores by Bayesian average: ?n=10, optionally &type=Rope or &lat=&lng= for a local board."""
+    try:
+        try:
+            n = int(request.args.get('n', 10))
+            lat = float(request.args['lat']) if request.args.get('lat') else None
+            lng = float(request.args['lng']) if request.args.get('lng') else None
+        except ValueError:
+            return jsonify({"error": "n, lat and lng must be numbers"}), 400
+        chain_type = request.args.get('type') or None
+        if not 1 <= n <= Config.PAGE_MAX_LIMIT:
+            return jsonify({"error": f"n must be between 1 and {Config.PAGE_MAX_LIMIT}"}), 400
+        if (lat is None) != (lng is None):
+            return jsonify({"error": "lat and lng must be given together"}), 400
+        if lat is not None and chain_type is not None:
+            return jsonify({"error": "Use either type or lat/lng"}), 400
+
+        if chain_type is not None:
+            board, key = leaderboard_repository.LEADERBOARD_TYPE, chain_type
+        elif lat is not None:
+            board, key = leaderboard_repository.LEADERBOARD_CELL, cell_key(lat, lng, Config.LEADERBOARD_CELL_DEGREES)
+        else:
+            board, key = leaderboard_repository.LEADERBOARD_ALL, ''
+        stores = leaderboard_controller.get_top_stores(board, key, n)
+        return jsonify({'board': board, 'key': key, 'stores': stores})
+    except Exception as e:
+        print(f"Error getting top stores: {e}")
+        return jsonify({"error": str(e)}), 500
+
+STORE_SEARCH_SORTS = ('relevance', 'rating', 'distance')
+
+@store_bp.route('/api/stores/search', methods=['GET'])
+@conditional_get('store')
+def search_stores():
+    """Typo-tolerant search over store names and addresses: ?q=golde chian&min_rating=4&lat=&lng=&radius=&sort="""
+    try:
+        text = (request.args.get('q') or '').strip()
+        sort = request.args.get('sort', 'relevance')
+        try:
+            limit = int(request.args.get('limit', Config.PAGE_DEFAULT_LIMIT))
+            min_rating = float(request.args['min_rating']) if request.args.get('min_rating') else None
+            near = None
+            if any(request.args.get(name) for name in ('lat', 'lng', 'radius')):
+                near = (float(request.args['lat']), float(request.args['lng']), float(request.args['radius']))
+        except KeyError as e:
+            return jsonify({"error": f"Missing parameter: {e}"}), 400
+        except ValueError:
+            return jsonify({"error": "limit, min_rating, lat, lng and radius must be numbers"}), 400
+
+        if not text:
+            return jsonify({"error": "q is required"}), 400
+        if not 1 <= limit <= Config.PAGE_MAX_LIMIT:
+            return jsonify({"error": f"limit must be between 1 and {Config.PAGE_MAX_LIMIT}"}), 400
+        if sort not in STORE_SEARCH_SORTS:
+            return jsonify({"error": f"sort must be one of {', '.join(STORE_SEARCH_SORTS)}"}), 400
+        if near is not None and near[2] <= 0:
+            return jsonify({"error": "radius must be positive"}), 400
+        if sort == 'distance' and near is None:
+            return jsonify({"error": "sort=distance requires lat, lng and radius"}), 400
+
+        return jsonify(store_controller.search_stores(text, limit, min_rating, near, sort))
+    except Exception as e:
+        print(f"Error searching stores: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @store_bp.route('/api/stores/<int:storeID>', methods=['GET'])
+@conditional_get('store', 'store_hours')
 def get_store(storeID):
     try:
         store = store_controller.get_store_by_id(storeID)
@@ -26,7 +174,30 @@ def get_store(storeID):
         print(f"Error getting store: {e}")
         return jsonify({"error": str(e)}), 500
 
+@store_bp.route('/api/stores/<int:storeID>/full', methods=['GET'])
+@conditional_get('store', 'store_hours', 'product', 'user_update')
+def get_store_full(storeID):
+    """Everything the store page needs in one call: ?include=hours,products,ratings,user_rating&userID="""
+    try:
+        include = request.args.get('include')
+        include = set(include.split(',')) if include else set(STORE_FULL_SECTIONS)
+        unknown = include - set(STORE_FULL_SECTIONS)
+        if unknown:
+            return jsonify({"error": f"Unknown include: {', '.join(sorted(unknown))}"}), 400
+        user_id = request.args.get('userID', type=int)
+        if 'user_rating' in include and user_id is None and request.args.get('include'):
+            return jsonify({"error": "userID is required for user_rating"}), 400
+
+        result = store_controller.get_store_full(storeID, include, user_id)
+        if result is None:
+            return jsonify({"error": "Store not found"}), 404
+        return jsonify(result)
+    except Exception as e:
+        print(f"Error getting store page: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @store_bp.route('/api/stores/<int:storeID>/hours', methods=['GET'])
+@conditional_get('store_hours')
 def get_store_hours(storeID):
     try:
         hours = store_controller.get_store_hours(storeID)
@@ -38,13 +209,16 @@ def get_store_hours(storeID):
         return jsonify({"error": str(e)}), 500
 
 @store_bp.route('/api/stores', methods=['POST'])
+@require_auth('business')
 def create_store():
     connection = None
     cursor = None
 
     try:
         data = request.get_json()
-        
+        if not owns(data.get('ownerID')):
+            return jsonify({'error': 'Not allowed for this account'}), 403
+
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
 
@@ -52,36 +226,20 @@ def create_store():
         connection.begin()
 
         try:
-            # Create store
-            cursor.execute("""
-                INSERT INTO store (ownerID, store_name, rating, address, latitude, longitude, phone, email)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                data['ownerID'],
-                data['store_name'],
-                0.00,  # default rating
-                data['address'],
-                data['latitude'],
-                data['longitude'],
-                data['phone'],
-                data['email']
-            ))
-            
-            store_id = cursor.lastrowid
+            # Create store with the default rating
+            store_id = store_repository.insert_store(cursor, data)
 
             # Insert store hours
-            for hour in data['hours']:
-                cursor.execute("""
-                    INSERT INTO store_hours (storeID, daysOpen, openTime, closeTime)
-                    VALUES (%s, %s, %s, %s)
-                """, (
-                    store_id,
-                    hour['daysOpen'],
-                    hour['openTime'],
-                    hour['closeTime']
-                ))
+            store_repository.insert_store_hours(cursor, store_id, data['hours'])
 
+            table_versions.mark_changed(cursor, 'store', 'store_hours')
             connection.commit()
+            db.after_commit(lambda: store_locations.update_store(
+                store_id, data['latitude'], data['longitude']))
+            db.after_commit(lambda: store_hours.update_store(store_id, data['hours']))
+            db.after_commit(lambda: store_search.update_store(
+                store_id, data['store_name'], data['address']))
+            db.after_commit(lambda: suggestions.update_store(store_id, data['store_name']))
 
             return jsonify({
                 'message': 'Store created successfully',
@@ -100,7 +258,30 @@ def create_store():
         if cursor: cursor.close()
         if connection: connection.close()
 
+@store_bp.route('/api/stores/import', methods=['POST'])
+@require_auth('business')
+def import_stores():
+    """Bulk-create stores from an NDJSON or CSV body (?format=ndjson|csv)."""
+    try:
+        fmt = request.args.get('format')
+        if fmt is None:
+            fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+        # Read the body line by line instead of buffering it
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        records = parse_csv(lines) if fmt == 'csv' else parse_ndjson(lines)
+        chunk_size = min(request.args.get('chunk_size', Config.IMPORT_CHUNK_SIZE, type=int),
+                         Config.IMPORT_CHUNK_SIZE)
+        report = store_controller.import_stores(records, max(chunk_size, 1), owns=owns)
+        return jsonify(report), 200
+    except Exception as e:
+        print("Store import error:", e)
+        return jsonify({'error': str(e)}), 500
+
 @store_bp.route('/api/stores/<int:storeID>/hours', methods=['PUT'])
+@require_auth('business')
 def update_store_hours(storeID):
     connection = None
     cursor = None
@@ -110,28 +291,24 @@ def update_store_hours(storeID):
         hours = data.get('hours', [])
         
         connection = get_db_connection()
-        cursor = connection.cursor()
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
+
+        store = store_repository.get_store(cursor, storeID)
+        if store is None:
+            return jsonify({'error': 'Store not found'}), 404
+        if not owns(store['ownerID']):
+            return jsonify({'error': 'Not allowed for this account'}), 403
 
         # Start transaction
         connection.begin()
 
         try:
-            # Delete existing hours
-            cursor.execute("DELETE FROM store_hours WHERE storeID = %s", (storeID,))
-            
-            # Insert new hours
-            for hour in hours:
-                cursor.execute("""
-                    INSERT INTO store_hours (storeID, daysOpen, openTime, closeTime)
-                    VALUES (%s, %s, %s, %s)
-                """, (
-                    storeID,
-                    hour['daysOpen'],
-                    hour['openTime'],
-                    hour['closeTime']
-                ))
+            # Replace existing hours
+            store_repository.replace_store_hours(cursor, storeID, hours)
 
+            table_versions.mark_changed(cursor, 'store_hours')
             connection.commit()
+            db.after_commit(lambda: store_hours.update_store(storeID, hours))
             return jsonify({'message': 'Store hours updated successfully'}), 200
 
         except Exception as e:
@@ -147,6 +324,7 @@ def update_store_hours(storeID):
         if connection: connection.close()
 
 @store_bp.route('/api/stores/<int:storeID>', methods=['PUT'])
+@require_auth('business')
 def update_store(storeID):
     try:
         data = request.get_json()
@@ -173,18 +351,31 @@ def update_store(storeID):
         if not db_field:
             return jsonify({'error': f'Invalid field: {field}'}), 400
 
+        store = store_repository.get_store(cursor, storeID)
+        if store is None:
+            return jsonify({'error': 'Store not found'}), 404
+        if not owns(store['ownerID']):
+            return jsonify({'error': 'Not allowed for this account'}), 403
+
         # Update the store table with the new value
-        cursor.execute(f"""
-            UPDATE store 
-            SET {db_field} = %s
-            WHERE storeID = %s
-        """, (value, storeID))
+        store_repository.update_store_field(cursor, storeID, db_field, value)
+        if db_field in ('latitude', 'longitude'):
+            # Moving the store can move it to another local leaderboard
+            leaderboard_controller.refresh_stores(cursor, [storeID])
         
+        table_versions.mark_changed(cursor, 'store')
         connection.commit()
 
         # Return updated store data
-        cursor.execute("SELECT * FROM store WHERE storeID = %s", (storeID,))
-        updated_store = cursor.fetchone()
+        updated_store = store_repository.get_store_row(cursor, storeID)
+        if db_field in ('latitude', 'longitude') and updated_store:
+            db.after_commit(lambda: store_locations.update_store(
+                storeID, updated_store['latitude'], updated_store['longitude']))
+        if db_field in ('store_name', 'address') and updated_store:
+            db.after_commit(lambda: store_search.update_store(
+                storeID, updated_store['store_name'], updated_store['address']))
+        if db_field == 'store_name' and updated_store:
+            db.after_commit(lambda: suggestions.update_store(storeID, updated_store['store_name']))
         
         return jsonify(updated_store), 200
 
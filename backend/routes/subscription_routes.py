@@ -1,11 +1,16 @@
 from flask import Blueprint, request, jsonify
+import db
 from db import get_db_connection
+from indexes import user_roles
+from repositories import subscription_repository
+from utils.auth import acting_as, issue_token, require_auth
 from datetime import datetime, timedelta
 import pymysql.cursors
 
 subscription_bp = Blueprint('subscription_bp', __name__)
 
 @subscription_bp.route('/api/subscriptions', methods=['POST'])
+@require_auth()
 def create_subscription():
     connection = None
     cursor = None
@@ -18,6 +23,8 @@ def create_subscription():
 
         if not all([user_id, subscription_type, join_fee]):
             return jsonify({'error': 'Missing required fields'}), 400
+        if not acting_as(user_id):
+            return jsonify({'error': 'Not allowed for this account'}), 403
 
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
@@ -27,11 +34,7 @@ def create_subscription():
 
         try:
             # Create store owner entry first
-            cursor.execute("""
-                INSERT INTO store_owners (userID)
-                VALUES (%s)
-            """, (user_id,))
-            owner_id = cursor.lastrowid
+            owner_id = subscription_repository.insert_store_owner(cursor, user_id)
 
             # Calculate subscription dates
             start_date = datetime.now()
@@ -43,17 +46,17 @@ def create_subscription():
                 end_date = start_date + timedelta(days=365)
 
             # Create subscription with ownerID
-            cursor.execute("""
-                INSERT INTO subscriptions (ownerID, start_date, end_date, join_fee)
-                VALUES (%s, %s, %s, %s)
-            """, (owner_id, start_date, end_date, join_fee))
-            
-            subscription_id = cursor.lastrowid
+            subscription_id = subscription_repository.insert_subscription(
+                cursor, owner_id, start_date, end_date, join_fee
+            )
             
             # Commit transaction
             connection.commit()
+            # The user is a business from now on, without logging in again
+            identity = user_roles.identity(int(user_id), owner_id)
+            db.after_commit(lambda: user_roles.remember(int(user_id), owner_id))
 
-            # Return success response with ownerID
+            # Return success response with ownerID and a token carrying the new role
             return jsonify({
                 'message': 'Subscription created successfully',
                 'data': {
@@ -65,7 +68,8 @@ def create_subscription():
                         'end_date': end_date.isoformat(),
                         'join_fee': float(join_fee)
                     }
-                }
+                },
+                **issue_token(identity)
             }), 201
 
         except Exception as e:
@@ -87,14 +91,7 @@ def get_subscription(ownerID):
         connection = get_db_connection()
         cursor = connection.cursor(pymysql.cursors.DictCursor)
 
-        cursor.execute("""
-            SELECT * FROM subscriptions 
-            WHERE ownerID = %s 
-            ORDER BY start_date DESC 
-            LIMIT 1
-        """, (ownerID,))
-        
-        subscription = cursor.fetchone()
+        subscription = subscription_repository.get_latest_subscription(cursor, ownerID)
         
         if not subscription:
             return jsonify({'error': 'No subscription found'}), 404
@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify, request
+from controllers.suggest_controller import SuggestController, SUGGEST_TYPES
+from config import Config
+
+suggest_bp = Blueprint('suggest_bp', __name__)
+suggest_controller = SuggestController()
+
+@suggest_bp.route('/api/suggest', methods=['GET'])
+def suggest():
+    """Typeahead for the search bar: ?prefix=gol&limit=8&types=store,chain_type"""
+    try:
+        prefix = request.args.get('prefix', '')
+        try:
+            limit = int(request.args.get('limit', Config.SUGGEST_DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({"error": "limit must be a number"}), 400
+        if not 1 <= limit <= Config.SUGGEST_MAX_LIMIT:
+            return jsonify({"error": f"limit must be between 1 and {Config.SUGGEST_MAX_LIMIT}"}), 400
+        types = None
+        if request.args.get('types'):
+            types = frozenset(value.strip() for value in request.args['types'].split(',') if value.strip())
+            unknown = types - set(SUGGEST_TYPES)
+            if unknown:
+                return jsonify({"error": f"Unknown types: {', '.join(sorted(unknown))}"}), 400
+
+        return jsonify(suggest_controller.suggest(prefix, limit, types))
+    except Exception as e:
+        print(f"Error getting suggestions: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,58 @@
+import threading
+from flask import Flask
+from config import Config
+from utils.admission import Lane, client_key
+from utils.rate_limit import RateLimiter, TokenBucket
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_allows_bursts_then_the_rate():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.take() for _ in range(4)] == [0, 0, 0, 0.5]
+    clock.now = 0.5
+    assert bucket.take() == 0
+    clock.now = 100
+    assert [bucket.take() for _ in range(4)][-1] == 0.5
+
+def test_rate_limiter_keeps_keys_apart():
+    limiter = RateLimiter(max_keys=10, clock=Clock())
+    assert limiter.check('a', 1, 1) == 0
+    assert limiter.check('a', 1, 1) > 0
+    assert limiter.check(('a', 'login'), 1, 1) == 0
+    assert limiter.check('b', 1, 1) == 0
+
+def test_lane_queues_briefly_then_rejects():
+    lane = Lane('read', limit=1, queue=1, timeout=0.05)
+    assert lane.acquire()
+    assert not lane.acquire()                # waited for the timeout
+
+    released = threading.Timer(0.01, lane.release)
+    released.start()
+    lane.timeout = 1
+    assert lane.acquire()                    # got the slot freed while queued
+    released.join()
+    assert lane.stats() == {'limit': 1, 'in_flight': 1, 'waiting': 0, 'queue': 1, 'rejected': 1}
+
+def test_lane_refuses_at_once_when_the_queue_is_full():
+    lane = Lane('write', limit=1, queue=0, timeout=5)
+    assert lane.acquire()
+    assert not lane.acquire()
+
+def test_client_key_takes_the_hop_added_by_the_outermost_trusted_proxy(monkeypatch):
+    app = Flask(__name__)
+    headers = {'X-Forwarded-For': '6.6.6.6, 1.2.3.4, 10.0.0.2'}
+    with app.test_request_context(headers=headers, environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        monkeypatch.setattr(Config, 'RATE_LIMIT_TRUSTED_PROXIES', 0)
+        assert client_key() == '10.0.0.1'
+        monkeypatch.setattr(Config, 'RATE_LIMIT_TRUSTED_PROXIES', 1)
+        assert client_key() == '10.0.0.2'
+        monkeypatch.setattr(Config, 'RATE_LIMIT_TRUSTED_PROXIES', 2)
+        assert client_key() == '1.2.3.4'
+        monkeypatch.setattr(Config, 'RATE_LIMIT_TRUSTED_PROXIES', 5)
+        assert client_key() == '6.6.6.6'
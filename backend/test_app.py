@@ -0,0 +1,750 @@
+"""End-to-end checks of every blueprint against the embedded SQLite backend."""
+import pymysql.cursors
+import pytest
+import db
+from config import Config
+from indexes import (product_catalog, store_hours, store_locations, store_search, suggestions, table_versions,
+                     user_roles)
+from utils import admission, sqlite_backend
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Config, 'DB_BACKEND', 'sqlite')
+    monkeypatch.setattr(Config, 'SQLITE_PATH', ':memory:')
+    monkeypatch.setattr(Config, 'PASSWORD_SCRYPT_N', 2 ** 8)
+    # Tests replay many writes from one address; test_admission sets its own limits
+    monkeypatch.setattr(Config, 'RATE_LIMIT_DEFAULT', (1000, 1000))
+    monkeypatch.setattr(Config, 'RATE_LIMIT_ROUTES', {})
+    # Run after-commit follow-up work inline so each response already reflects it
+    monkeypatch.setattr(Config, 'BACKGROUND_WORKERS', 0)
+    admission.reset()
+    db.close_pools()
+    sqlite_backend.drop_database(':memory:')
+    store_locations.invalidate()
+    table_versions.invalidate()
+    store_hours.invalidate()
+    product_catalog.invalidate()
+    store_search.invalidate()
+    suggestions.invalidate()
+    user_roles.invalidate()
+    from app import app
+    app.config['TESTING'] = True
+    app.secret_key = 'test'
+    yield app.test_client()
+    db.close_pools()
+    sqlite_backend.drop_database(':memory:')
+
+WEEK = [
+    {'daysOpen': day, 'openTime': '10:00', 'closeTime': '19:00'}
+    for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+] + [{'daysOpen': 'Sunday', 'openTime': None, 'closeTime': None}]
+
+PRODUCT = {'chain_type': 'Rope', 'chain_purity': '14K', 'chain_thickness': 3,
+           'chain_length': 20, 'chain_color': 'Yellow', 'chain_weight': 12.5, 'set_price': 900}
+
+def seed_store(client):
+    """Sign up an owner, subscribe them and open a store. Returns (userID, storeID)."""
+    response = client.post('/api/signup', json={'first_name': 'Ada', 'last_name': 'Lovelace',
+                                               'email': 'ada@example.com', 'password': 'pw'})
+    assert response.status_code == 201
+    user_id = response.get_json()['user']['userID']
+
+    response = client.post('/api/subscriptions', json={'userID': user_id, 'subscriptionType': '1 MONTH',
+                                                      'joinFee': 25})
+    assert response.status_code == 201
+    owner_id = response.get_json()['data']['ownerID']
+
+    response = client.post('/api/stores', json={'ownerID': owner_id, 'store_name': 'Canal Gold',
+                                               'address': '1 Canal St', 'latitude': 40.719,
+                                               'longitude': -74.0, 'phone': '555-0100',
+                                               'email': 'shop@example.com', 'hours': WEEK})
+    assert response.status_code == 201
+    return user_id, response.get_json()['storeID']
+
+def test_store_endpoints(client):
+    _, store_id = seed_store(client)
+
+    stores = client.get('/api/stores').get_json()
+    assert [s['store_name'] for s in stores] == ['Canal Gold']
+
+    store = client.get(f'/api/stores/{store_id}').get_json()
+    assert store['hours'][0]['daysOpen'] == 'Monday'
+    assert store['hours'][0]['openTime'] == '10:00 AM'
+
+    hours = client.get(f'/api/stores/{store_id}/hours').get_json()
+    assert len(hours) == 7
+    assert hours[-1]['openTime'] == 'CLOSED'
+
+    response = client.put(f'/api/stores/{store_id}/hours', json={'hours': WEEK[:2]})
+    assert response.status_code == 200
+    assert len(client.get(f'/api/stores/{store_id}/hours').get_json()) == 2
+
+    response = client.put(f'/api/stores/{store_id}', json={'field': 'phone', 'value': '555-0199'})
+    assert response.get_json()['phone'] == '555-0199'
+    assert client.get('/api/stores/999').status_code == 404
+
+def test_open_filter_pages_only_over_open_stores(client):
+    _, store_id = seed_store(client)
+    owner_id = client.get(f'/api/stores/{store_id}').get_json()['ownerID']
+    sunday_only = [{'daysOpen': 'Sunday', 'openTime': '10:00', 'closeTime': '18:00'}]
+    created = [client.post('/api/stores', json={'ownerID': owner_id, 'store_name': f'Branch {i}',
+                                                 'address': f'{i} Canal St', 'latitude': 40.72,
+                                                 'longitude': -74.0, 'phone': '555', 'email': 'b@x.com',
+                                                 'hours': WEEK if i % 2 else sunday_only}
+                           ).get_json()['storeID'] for i in range(6)]
+
+    pages, cursor = [], ''
+    while cursor is not None:
+        page = client.get(f'/api/stores?open_at=2025-03-03T12:00&limit=2&cursor={cursor}').get_json()
+        pages.append([s['storeID'] for s in page['items']])
+        cursor = page['next_cursor']
+    assert pages == [[store_id, created[1]], [created[3], created[5]]]
+
+def test_nearby_stores(client):
+    _, store_id = seed_store(client)
+
+    stores = client.get('/api/stores/nearby?lat=40.72&lng=-74.0&k=5').get_json()
+    assert [s['storeID'] for s in stores] == [store_id]
+    assert stores[0]['distance_km'] < 1
+
+    # Moving the store is visible immediately through the after-commit hook
+    client.put(f'/api/stores/{store_id}', json={'field': 'latitude', 'value': 41.5})
+    assert client.get('/api/stores/nearby?lat=40.72&lng=-74.0&radius=5').get_json() == []
+    assert client.get('/api/stores/nearby?lat=41.5&lng=-74.0&radius=5').get_json()[0]['storeID'] == store_id
+
+    assert client.get('/api/stores/nearby?lat=40.72').status_code == 400
+    assert client.get('/api/stores/nearby?lat=95&lng=0').status_code == 400
+    assert client.get('/api/stores/nearby?lat=40&lng=-74&radius=-1').status_code == 400
+    assert client.get('/api/stores/nearby?lat=40&lng=-74&radius=10000').status_code == 400
+
+def test_open_filters(client):
+    _, store_id = seed_store(client)
+    monday_noon, sunday_noon = '2025-03-03T12:00', '2025-03-09T12:00'
+
+    assert [s['storeID'] for s in client.get(f'/api/stores?open_at={monday_noon}').get_json()] == [store_id]
+    assert client.get(f'/api/stores?open_at={sunday_noon}').get_json() == []
+    assert client.get(f'/api/stores?open_at={sunday_noon}&limit=5').get_json() == {'items': [], 'next_cursor': None}
+    assert client.get(f'/api/stores/nearby?lat=40.72&lng=-74.0&open_at={sunday_noon}').get_json() == []
+
+    # Overnight hours are picked up as soon as the update commits
+    client.put(f'/api/stores/{store_id}/hours', json={'hours': [
+        {'daysOpen': 'Monday', 'openTime': '22:00', 'closeTime': '02:00'}]})
+    assert len(client.get('/api/stores?open_at=2025-03-04T01:30').get_json()) == 1
+    assert client.get(f'/api/stores?open_at={monday_noon}').get_json() == []
+    assert client.get('/api/stores?open_at=tomorrow').status_code == 400
+
+@pytest.mark.parametrize('use_index', [True, False])
+def test_store_search(client, monkeypatch, use_index):
+    if not use_index:
+        monkeypatch.setattr(store_search, '_index', None)
+    elif not store_search.available():
+        pytest.skip('numpy is not installed')
+    _, store_id = seed_store(client)
+    client.post('/api/stores/import', content_type='application/x-ndjson', data='\n'.join(
+        '{"ownerID": 1, "store_name": "%s", "address": "%s", "latitude": %s, "longitude": -74.0, '
+        '"phone": "555", "email": "b@x.com", "hours": []}' % row
+        for row in [('Harbor Jewelers', '12 Canal St', 40.9), ('Midtown Pawn', '5 Broadway', 40.72)]))
+
+    found = client.get('/api/stores/search?q=canal').get_json()
+    assert [s['store_name'] for s in found] == ['Canal Gold', 'Harbor Jewelers']
+    nearby = client.get('/api/stores/search?q=canal&lat=40.72&lng=-74.0&radius=5').get_json()
+    assert [s['storeID'] for s in nearby] == [store_id] and nearby[0]['distance_km'] < 1
+
+    if use_index:
+        # Typos still match, names outrank addresses, and renames apply on commit
+        assert client.get('/api/stores/search?q=cnal gld').get_json()[0]['storeID'] == store_id
+        assert client.get('/api/stores/search?q=canal').get_json()[0]['similarity'] == 1.0
+        client.put(f'/api/stores/{store_id}', json={'field': 'name', 'value': 'Bowery Bullion'})
+        assert client.get('/api/stores/search?q=bowery bulion').get_json()[0]['storeID'] == store_id
+
+        # min_rating is applied while scanning, not to the capped candidate list
+        from repositories import store_repository
+        harbor = found[1]['storeID']
+        connection = db.get_standalone_connection()
+        try:
+            store_repository.update_store_rating(connection.cursor(), harbor, 4.5)
+            connection.commit()
+        finally:
+            connection.close()
+        monkeypatch.setattr(Config, 'STORE_SEARCH_MAX_CANDIDATES', 1)
+        assert [s['storeID'] for s in client.get('/api/stores/search?q=canal&min_rating=4').get_json()] == [harbor]
+
+    assert client.get('/api/stores/search').status_code == 400
+    assert client.get('/api/stores/search?q=gold&sort=distance').status_code == 400
+    assert client.get('/api/stores/search?q=gold&min_rating=high').status_code == 400
+
+def test_suggest(client):
+    user_id, store_id = seed_store(client)
+    client.post('/api/products', json=[{**PRODUCT, 'storeID': store_id, 'chain_type': chain_type}
+                                       for chain_type in ('Rope', 'Rope', 'Rolo')])
+
+    found = client.get('/api/suggest?prefix=ro').get_json()
+    assert [(s['type'], s['value'], s['weight']) for s in found] == [('chain_type', 'Rope', 2), ('chain_type', 'Rolo', 1)]
+    assert client.get('/api/suggest?prefix=gol').get_json() == [
+        {'type': 'store', 'value': 'Canal Gold', 'weight': 0, 'storeID': store_id}]
+
+    # Writes show up without a reload
+    client.put(f'/api/stores/{store_id}', json={'field': 'name', 'value': 'Rocket Gold'})
+    products = client.get(f'/api/products?storeID={store_id}').get_json()
+    rope_id = next(p['productID'] for p in products if p['chain_type'] == 'Rope')
+    client.post(f'/api/ratings/{store_id}', json={'userID': user_id, 'productID': rope_id, 'rating': 5})
+    client.delete(f'/api/products/{rope_id}')
+    found = client.get('/api/suggest?prefix=ro&types=store,chain_type').get_json()
+    assert [(s['value'], s['weight']) for s in found] == [('Rocket Gold', 1), ('Rolo', 1), ('Rope', 1)]
+    assert client.get('/api/suggest?prefix=canal').get_json() == []
+
+    assert client.get('/api/suggest?prefix=ro&types=brand').status_code == 400
+    assert client.get('/api/suggest?prefix=ro&limit=500').status_code == 400
+
+def test_bulk_store_import(client):
+    import json
+    seed_store(client)
+    lines = [json.dumps({'ownerID': 1, 'store_name': f'Branch {i}', 'address': f'{i} Main St',
+                         'latitude': 40.7 + i / 1000, 'longitude': -74.0, 'phone': '555', 'email': 'b@x.com',
+                         'hours': WEEK}) for i in range(5)]
+    lines.insert(2, '{"store_name": "No owner"}')
+    lines.insert(4, 'not json')
+    response = client.post('/api/stores/import?chunk_size=2', data='\n'.join(lines),
+                           content_type='application/x-ndjson')
+    report = response.get_json()
+    assert (report['created'], report['failed']) == (5, 2)
+    assert [r['status'] for r in report['results']] == ['created', 'created', 'error', 'created', 'error',
+                                                        'created', 'created']
+    store_id = report['results'][-1]['storeID']
+    assert len(client.get(f'/api/stores/{store_id}/hours').get_json()) == 7
+    assert len(client.get('/api/stores').get_json()) == 6
+    assert len(client.get('/api/stores/nearby?lat=40.7&lng=-74.0&k=10').get_json()) == 6
+
+    csv_body = ('ownerID,store_name,address,latitude,longitude,phone,email,monday_open,monday_close\n'
+                '1,Night Owl,9 Bowery,40.71,-73.99,555,n@x.com,22:00,02:00\n'
+                '1,Bad,9 Bowery,north,-73.99,555,n@x.com,,\n')
+    report = client.post('/api/stores/import?format=csv', data=csv_body).get_json()
+    assert report['results'][1] == {'record': 3, 'status': 'error',
+                                    'error': 'ownerID, latitude and longitude must be numbers'}
+    hours = client.get(f"/api/stores/{report['results'][0]['storeID']}/hours").get_json()
+    assert [(h['daysOpen'], h['openTime'][:5]) for h in hours][:2] == [('Monday', '22:00'), ('Tuesday', 'CLOSE')]
+
+def test_bulk_store_import_blames_only_the_failing_record(client, monkeypatch):
+    import json
+    from repositories import store_repository
+    seed_store(client)
+    insert_stores = store_repository.insert_stores
+
+    def failing_insert(cursor, stores, rating=0.00):
+        if any(store['store_name'] == 'Branch 1' for store in stores):
+            raise pymysql.err.IntegrityError(1452, 'foreign key constraint fails')
+        return insert_stores(cursor, stores, rating)
+
+    monkeypatch.setattr(store_repository, 'insert_stores', failing_insert)
+    lines = [json.dumps({'ownerID': 1, 'store_name': f'Branch {i}', 'address': f'{i} Main St',
+                         'latitude': 40.7, 'longitude': -74.0, 'phone': '555', 'email': 'b@x.com',
+                         'hours': WEEK}) for i in range(3)]
+    report = client.post('/api/stores/import', data='\n'.join(lines),
+                         content_type='application/x-ndjson').get_json()
+    assert (report['created'], report['failed']) == (2, 1)
+    assert [r['status'] for r in report['results']] == ['created', 'error', 'created']
+    assert 'foreign key' in report['results'][1]['error']
+    assert len(client.get('/api/stores').get_json()) == 3
+    assert len(client.get(f"/api/stores/{report['results'][2]['storeID']}/hours").get_json()) == 7
+
+@pytest.mark.parametrize('use_catalog', [True, False])
+def test_product_search(client, monkeypatch, use_catalog):
+    monkeypatch.setattr(Config, 'PRODUCT_CATALOG_ENABLED', use_catalog)
+    _, store_id = seed_store(client)
+    catalog = [('Rope', 'Yellow', 500), ('Rope', 'White', 900), ('Cuban', 'Yellow', 1500),
+               ('Cuban', 'Yellow', 700), ('Figaro', 'Rose', 300)]
+    client.post('/api/products', json=[{**PRODUCT, 'storeID': store_id, 'chain_type': chain_type,
+                                        'chain_color': color, 'set_price': price}
+                                       for chain_type, color, price in catalog])
+
+    result = client.get('/api/products/search?chain_color=Yellow&max_price=1000&sort=price').get_json()
+    assert [float(p['set_price']) for p in result['items']] == [500, 700]
+    assert result['total'] == 2
+    # A facet ignores its own filter but honours the others
+    assert result['facets']['chain_color'] == {'Yellow': 2, 'Rose': 1, 'White': 1}
+    assert result['facets']['chain_type'] == {'Cuban': 1, 'Rope': 1}
+    assert result['facets']['chain_thickness'] == {'3': 2}
+
+    page = client.get('/api/products/search?chain_type=Rope,Cuban&limit=2&sort=price_desc').get_json()
+    assert [float(p['set_price']) for p in page['items']] == [1500, 900]
+    rest = client.get(f"/api/products/search?chain_type=Rope,Cuban&limit=2&sort=price_desc"
+                      f"&cursor={page['next_cursor']}").get_json()
+    assert [float(p['set_price']) for p in rest['items']] == [700, 500]
+
+    assert client.get('/api/products/search?lat=40.72&lng=-74.0&radius=2').get_json()['total'] == 5
+    assert client.get('/api/products/search?lat=10&lng=10&radius=2').get_json()['total'] == 0
+    assert client.get('/api/products/search?lat=10').status_code == 400
+    assert client.get('/api/products/search?min_price=cheap').status_code == 400
+
+def test_product_catalog_stats_and_writes(client, monkeypatch):
+    _, store_id = seed_store(client)
+    prices = [('Rope', 100), ('Rope', 200), ('Rope', 300), ('Rope', 400), ('Cuban', 1000)]
+    ids = client.post('/api/products', json=[{**PRODUCT, 'storeID': store_id, 'chain_type': chain_type,
+                                              'set_price': price} for chain_type, price in prices]
+                      ).get_json()['productIDs']
+
+    stats = client.get('/api/products/stats?group_by=chain_type').get_json()['groups']
+    assert stats['Rope'] == {'count': 4, 'min': 100, 'max': 400, 'mean': 250, 'p25': 175, 'p50': 250,
+                             'p75': 325, 'p90': 370}
+    assert stats['Cuban']['p50'] == 1000
+    assert client.get('/api/products/stats?group_by=chain_type&max_price=250').get_json()['groups'] == {
+        'Rope': {'count': 2, 'min': 100, 'max': 200, 'mean': 150, 'p25': 125, 'p50': 150, 'p75': 175, 'p90': 190}}
+    assert client.get('/api/products/stats?group_by=set_price').status_code == 400
+
+    # Writes reach the loaded catalog without a reload
+    client.put(f'/api/products/{ids[0]}', json={**PRODUCT, 'chain_type': 'Cuban', 'set_price': 2000})
+    client.delete(f'/api/products/{ids[1]}')
+    client.post('/api/products', json={**PRODUCT, 'storeID': store_id, 'chain_type': 'Figaro', 'set_price': 50})
+    result = client.get('/api/products/search?sort=price').get_json()
+    assert [(p['chain_type'], float(p['set_price'])) for p in result['items']] == [
+        ('Figaro', 50), ('Rope', 300), ('Rope', 400), ('Cuban', 1000), ('Cuban', 2000)]
+    assert result['facets']['chain_type'] == {'Cuban': 2, 'Rope': 2, 'Figaro': 1}
+
+    monkeypatch.setattr(Config, 'PRODUCT_CATALOG_ENABLED', False)
+    assert client.get('/api/products/stats').status_code == 503
+
+def test_market_index(client):
+    user_id, store_id = seed_store(client)
+    product_ids = client.post('/api/products', json=[
+        {**PRODUCT, 'storeID': store_id, 'chain_weight': 10, 'set_price': 1000},
+        {**PRODUCT, 'storeID': store_id, 'chain_weight': 20, 'set_price': 2000},
+        {**PRODUCT, 'storeID': store_id, 'chain_purity': '18K', 'chain_weight': 10, 'set_price': 1500},
+    ]).get_json()['productIDs']
+    submissions = [(product_ids[0], 700, '2025-03-03'), (product_ids[1], 1600, '2025-03-03'),
+                   (product_ids[0], 900, '2025-03-05'), (product_ids[2], 1200, '2025-03-05')]
+    for product_id, price, day in submissions:
+        response = client.post(f'/api/products/{product_id}/purchases', json={
+            'userID': user_id, 'storeID': store_id, 'latest_price': price, 'purchase_date': f'{day}T12:00:00Z'})
+        assert response.status_code == 200
+
+    index = client.get('/api/market/index?type=Rope&purity=14K&from=2025-03-01&to=2025-03-31').get_json()
+    assert [(p['bucket'], p['count'], p['mean'], p['min'], p['max']) for p in index['series']] == [
+        ('2025-03-03', 2, 75.0, 70.0, 80.0), ('2025-03-05', 1, 90.0, 90.0, 90.0)]
+    assert abs(index['series'][0]['p50'] - 70.0) <= 0.7
+
+    weekly = client.get('/api/market/index?from=2025-03-01&to=2025-03-31&bucket=week').get_json()['series']
+    assert [(p['bucket'], p['count'], p['min'], p['max']) for p in weekly] == [('2025-03-03', 4, 70.0, 120.0)]
+    assert client.get('/api/market/index?purity=18K&from=2025-03-04&to=2025-03-04').get_json()['series'] == []
+    assert client.get('/api/market/index?bucket=year').status_code == 400
+    assert client.get('/api/market/index?from=2025-04-01&to=2025-03-01').status_code == 400
+
+    # Rebuilding from price_history reproduces the incremental rollups
+    from market_index import rebuild
+    connection = db.get_standalone_connection()
+    try:
+        assert rebuild(connection) == 4
+    finally:
+        connection.close()
+    assert client.get('/api/market/index?from=2025-03-01&to=2025-03-31&bucket=week').get_json()['series'] == weekly
+
+    # A same-day resubmission replaces the user's observation instead of adding one
+    client.post(f'/api/products/{product_ids[0]}/purchases', json={
+        'userID': user_id, 'storeID': store_id, 'latest_price': 750, 'purchase_date': '2025-03-03T18:00:00Z'})
+    day = client.get('/api/market/index?type=Rope&purity=14K&from=2025-03-03&to=2025-03-03').get_json()['series']
+    assert [(p['count'], p['mean']) for p in day] == [(2, 77.5)]
+    assert abs(day[0]['p25'] - 75.0) <= 0.75
+
+    # Reconciling the same entry again changes nothing
+    from controllers.product_controller import ProductController
+    ProductController().record_purchase(user_id, product_ids[0], '2025-03-03')
+    assert client.get('/api/market/index?type=Rope&purity=14K&from=2025-03-03&to=2025-03-03'
+                      ).get_json()['series'] == day
+
+    # After a weight edit the retraction still hits the bucket the old price was counted in
+    client.put(f'/api/products/{product_ids[0]}', json={**PRODUCT, 'chain_weight': 20, 'set_price': 1000})
+    client.post(f'/api/products/{product_ids[0]}/purchases', json={
+        'userID': user_id, 'storeID': store_id, 'latest_price': 800, 'purchase_date': '2025-03-03T20:00:00Z'})
+    day = client.get('/api/market/index?type=Rope&purity=14K&from=2025-03-03&to=2025-03-03').get_json()['series']
+    assert [(p['count'], p['mean']) for p in day] == [(2, 60.0)]
+    connection = db.get_standalone_connection()
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    try:
+        cursor.execute("SELECT MIN(observations) AS low, SUM(observations) AS total FROM market_price_sketch "
+                       "WHERE day = '2025-03-03' AND chain_purity = '14K'")
+        assert {key: int(value) for key, value in cursor.fetchone().items()} == {'low': 0, 'total': 2}
+    finally:
+        cursor.close()
+        connection.close()
+
+def test_price_submission_upsert_and_trim(client):
+    user_id, store_id = seed_store(client)
+    product_id = client.post('/api/products', json={'storeID': store_id, **PRODUCT}).get_json()['productID']
+    other_id = client.post('/api/products', json={'storeID': store_id, **PRODUCT}).get_json()['productID']
+
+    def submit(product, price, when):
+        return client.post(f'/api/products/{product}/purchases', json={
+            'userID': user_id, 'storeID': store_id, 'latest_price': price, 'purchase_date': when})
+
+    # A second price on the same day replaces the first
+    assert submit(product_id, 900, '2025-03-01T09:00:00Z').status_code == 200
+    assert submit(product_id, 950, '2025-03-01T18:00:00Z').status_code == 200
+    purchases = client.get(f'/api/products/{product_id}').get_json()['purchases']
+    assert [float(p['latest_price']) for p in purchases] == [950]
+
+    for day in range(2, 9):
+        submit(product_id, 900 + day, f'2025-03-{day:02d}T12:00:00Z')
+    submit(other_id, 800, '2025-03-01T12:00:00Z')
+
+    from trim_price_history import trim
+    connection = db.get_standalone_connection()
+    try:
+        assert trim(connection, keep=5, batch=1) == 3
+        assert trim(connection, keep=5, batch=1) == 0
+    finally:
+        connection.close()
+    purchases = client.get(f'/api/products/purchases?ids={product_id},{other_id}').get_json()
+    assert [float(p['latest_price']) for p in purchases[str(product_id)]] == [908, 907, 906, 905, 904]
+    assert len(purchases[str(other_id)]) == 1
+
+def test_best_deals(client):
+    user_id, store_id = seed_store(client)
+    ids = client.post('/api/products', json=[
+        {**PRODUCT, 'storeID': store_id, 'chain_purity': '14K', 'chain_weight': 10, 'set_price': 700},   # 120/g
+        {**PRODUCT, 'storeID': store_id, 'chain_purity': '18K', 'chain_weight': 10, 'set_price': 600},   # 80/g
+        {**PRODUCT, 'storeID': store_id, 'chain_purity': '24K', 'chain_weight': 10, 'set_price': 900},   # 90/g
+        {**PRODUCT, 'storeID': store_id, 'chain_type': 'Cuban', 'chain_purity': '24K', 'chain_weight': 10,
+         'set_price': 500},                                                                             # 50/g
+        {**PRODUCT, 'storeID': store_id, 'chain_length': 24, 'chain_purity': '24K', 'chain_weight': 10,
+         'set_price': 400},                                                                             # 40/g
+    ]).get_json()['productIDs']
+
+    def ranked(query=''):
+        return [deal['productID'] for deal in client.get(f'/api/products/best-deals?{query}').get_json()]
+
+    assert ranked() == [ids[4], ids[3], ids[1], ids[2], ids[0]]
+    assert ranked('type=Rope&length=20') == [ids[1], ids[2], ids[0]]
+    assert ranked('type=Rope&length=21&limit=1') == [ids[1]]
+    assert client.get('/api/products/best-deals?length=20').status_code == 400
+
+    # Writes re-rank incrementally: a price cut, a reported price and a deletion
+    client.put(f'/api/products/{ids[0]}', json={**PRODUCT, 'chain_purity': '14K', 'chain_weight': 10,
+                                                  'set_price': 350})   # 60/g
+    client.post(f'/api/products/{ids[2]}/purchases', json={
+        'userID': user_id, 'storeID': store_id, 'latest_price': 500, 'purchase_date': '2025-03-01T12:00:00Z'})
+    client.delete(f'/api/products/{ids[4]}')
+    deals = client.get('/api/products/best-deals?type=Rope').get_json()
+    assert [deal['productID'] for deal in deals] == [ids[0], ids[2], ids[1]]
+    assert deals[1]['pure_price_per_gram'] == 70.0
+
+    # Rebuilding from scratch gives the same ranking
+    from best_deals import rebuild
+    connection = db.get_standalone_connection()
+    try:
+        assert rebuild(connection) == 4
+    finally:
+        connection.close()
+    assert client.get('/api/products/best-deals?type=Rope').get_json() == deals
+
+def test_migration_backfills_product_deals(client):
+    _, store_id = seed_store(client)
+    ids = client.post('/api/products', json=[
+        {**PRODUCT, 'storeID': store_id, 'chain_purity': '24K', 'chain_weight': 10, 'set_price': price}
+        for price in (900, 500)
+    ]).get_json()['productIDs']
+    expected = client.get('/api/products/best-deals').get_json()
+    assert [deal['productID'] for deal in expected] == [ids[1], ids[0]]
+
+    # Roll the database back to before product_deals existed, then migrate again
+    from migrate import migrate
+    connection = db.get_standalone_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DROP TABLE product_deals")
+        cursor.execute("DELETE FROM table_versions WHERE table_name = 'product_deals'")
+        cursor.execute("DELETE FROM schema_migrations WHERE version = '008_product_deals.sql'")
+        connection.commit()
+        assert migrate(connection) == ['008_product_deals.sql']
+    finally:
+        cursor.close()
+        connection.close()
+    assert client.get('/api/products/best-deals').get_json() == expected
+
+def test_top_stores(client):
+    user_id, store_id = seed_store(client)
+    client.post('/api/stores/import', content_type='application/x-ndjson', data=(
+        '{"ownerID": 1, "store_name": "One Review", "address": "2 Elm St", "latitude": 40.72, '
+        '"longitude": -74.0, "phone": "555", "email": "b@x.com", "hours": []}'))
+    other_id = store_id + 1
+    product_ids = client.post('/api/products', json=[{**PRODUCT, 'storeID': sid} for sid in (store_id, other_id)]
+                              ).get_json()['productIDs']
+
+    # One 5-star review does not beat a steady run of 4s and 5s
+    client.post(f'/api/ratings/{other_id}', json={'userID': user_id, 'productID': product_ids[1], 'rating': 5})
+    for number in range(12):
+        response = client.post('/api/signup', json={'first_name': 'R', 'last_name': str(number),
+                                                   'email': f'r{number}@example.com', 'password': 'pw'})
+        client.post(f'/api/ratings/{store_id}', json={'userID': response.get_json()['user']['userID'],
+                                                     'productID': product_ids[0], 'rating': 4 + number % 2})
+    top = client.get('/api/stores/top?n=5').get_json()
+    assert [s['storeID'] for s in top['stores']] == [store_id, other_id]
+    assert top['stores'][1]['score'] == round((3.5 * 10 + 5) / 11, 4)
+
+    assert [s['storeID'] for s in client.get('/api/stores/top?type=Rope').get_json()['stores']] == [store_id, other_id]
+    local = client.get('/api/stores/top?lat=40.72&lng=-74.0&n=1').get_json()
+    assert (local['board'], [s['storeID'] for s in local['stores']]) == ('cell', [store_id])
+
+    # Changing what a store carries or where it is moves it between boards
+    client.put(f'/api/products/{product_ids[0]}', json={**PRODUCT, 'chain_type': 'Cuban'})
+    assert [s['storeID'] for s in client.get('/api/stores/top?type=Rope').get_json()['stores']] == [other_id]
+    client.put(f'/api/stores/{store_id}', json={'field': 'latitude', 'value': 45.1})
+    assert [s['storeID'] for s in client.get('/api/stores/top?lat=40.72&lng=-74.0').get_json()['stores']] == [other_id]
+
+    assert client.get('/api/stores/top?n=0').status_code == 400
+    assert client.get('/api/stores/top?lat=40').status_code == 400
+    assert client.get('/api/stores/top?type=Rope&lat=40&lng=-74').status_code == 400
+
+def test_product_and_purchase_endpoints(client):
+    user_id, store_id = seed_store(client)
+
+    response = client.post('/api/products', json={'storeID': store_id, **PRODUCT})
+    assert response.status_code == 201
+    product_id = response.get_json()['productID']
+
+    response = client.post('/api/products', json=[{'storeID': store_id, **PRODUCT}] * 3)
+    assert response.get_json()['productIDs'] == [product_id + 1, product_id + 2, product_id + 3]
+    assert len(client.get(f'/api/products?storeID={store_id}').get_json()) == 4
+
+    response = client.put(f'/api/products/{product_id}', json={**PRODUCT, 'set_price': 950})
+    assert float(response.get_json()['set_price']) == 950
+
+    response = client.post(f'/api/products/{product_id}/purchases', json={
+        'userID': user_id, 'storeID': store_id, 'latest_price': 925,
+        'purchase_date': '2025-03-01T12:00:00Z'})
+    assert response.status_code == 200
+
+    detail = client.get(f'/api/products/{product_id}').get_json()
+    assert detail['purchases'][0]['full_name'] == 'Ada L.'
+
+    client.post(f'/api/products/{product_id + 1}/purchases', json={
+        'userID': user_id, 'storeID': store_id, 'latest_price': 880, 'purchase_date': '2025-03-02T12:00:00Z'})
+    client.post(f'/api/products/{product_id}/purchases', json={
+        'userID': user_id, 'storeID': store_id, 'latest_price': 940, 'purchase_date': '2025-03-02T12:00:00Z'})
+    batch = client.get(f'/api/products/purchases?ids={product_id},{product_id + 1},{product_id + 2}').get_json()
+    assert [float(p['latest_price']) for p in batch[str(product_id)]] == [940, 925]
+    assert [float(p['latest_price']) for p in batch[str(product_id + 1)]] == [880]
+    assert batch[str(product_id + 2)] == []
+    assert client.post('/api/products/purchases', json={'ids': [product_id]}).get_json() == {
+        str(product_id): batch[str(product_id)]}
+    assert client.get('/api/products/purchases?ids=x').status_code == 400
+    assert client.post('/api/products/purchases', json={}).status_code == 400
+
+    assert client.delete(f'/api/products/{product_id}').status_code == 200
+    assert client.get(f'/api/products/{product_id}').status_code == 404
+
+def walk_pages(client, url):
+    items, cursor = [], None
+    while True:
+        page = client.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        items += page['items']
+        cursor = page['next_cursor']
+        if cursor is None:
+            return items
+
+def test_store_full(client):
+    user_id, store_id = seed_store(client)
+    product_id = client.post('/api/products', json={'storeID': store_id, **PRODUCT}).get_json()['productID']
+    client.post(f'/api/ratings/{store_id}', json={'userID': user_id, 'productID': product_id, 'rating': 4})
+
+    response = client.get(f'/api/stores/{store_id}/full?userID={user_id}')
+    page = response.get_json()
+    assert page['store']['store_name'] == 'Canal Gold'
+    assert page['store']['hours'][0]['openTime'] == '10:00 AM'
+    assert [p['productID'] for p in page['products']] == [product_id]
+    assert page['ratings'] == {'rating_count': 1, 'distribution': {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0}}
+    assert page['user_rating'] == 4.0
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+
+    page = client.get(f'/api/stores/{store_id}/full?include=ratings').get_json()
+    assert set(page) == {'store', 'ratings'}
+    assert 'hours' not in page['store']
+    assert client.get(f'/api/stores/{store_id}/full?include=reviews').status_code == 400
+    assert client.get(f'/api/stores/{store_id}/full?include=user_rating').status_code == 400
+    assert client.get('/api/stores/999/full').status_code == 404
+
+def test_keyset_pagination(client):
+    _, store_id = seed_store(client)
+    prices = [500, 300, 900, 300, 700]
+    client.post('/api/products', json=[{**PRODUCT, 'storeID': store_id, 'set_price': p} for p in prices])
+
+    by_id = walk_pages(client, '/api/products?limit=2')
+    assert [p['productID'] for p in by_id] == sorted(p['productID'] for p in by_id)
+    assert len(by_id) == 5
+
+    by_price = walk_pages(client, f'/api/products?storeID={store_id}&limit=2&sort=price')
+    assert [float(p['set_price']) for p in by_price] == sorted(prices)
+    assert len({p['productID'] for p in by_price}) == 5
+
+    assert walk_pages(client, '/api/stores?limit=1&sort=rating')[0]['storeID'] == store_id
+    assert isinstance(client.get('/api/products').get_json(), list)
+
+    assert client.get('/api/products?cursor=not-a-cursor').status_code == 400
+    cursor = client.get('/api/products?limit=2').get_json()['next_cursor']
+    assert client.get(f'/api/products?limit=2&sort=price&cursor={cursor}').status_code == 400
+    # Well-formed cursors with the wrong number of keys for their sort
+    from utils.pagination import encode_cursor
+    for token in (encode_cursor('price', ()), encode_cursor('price', (900,)), encode_cursor('price', (900, 1, 2))):
+        assert client.get(f'/api/products?limit=2&sort=price&cursor={token}').status_code == 400
+    assert client.get(f"/api/stores?limit=2&cursor={encode_cursor('id', ())}").status_code == 400
+    assert client.get('/api/stores?limit=0').status_code == 400
+
+def test_rating_endpoints(client):
+    user_id, store_id = seed_store(client)
+    product_id = client.post('/api/products', json={'storeID': store_id, **PRODUCT}).get_json()['productID']
+
+    for rating in (3, 5):
+        response = client.post(f'/api/ratings/{store_id}', json={'userID': user_id, 'productID': product_id,
+                                                                'rating': rating})
+        assert response.status_code == 200
+
+    assert client.get(f'/api/ratings/{store_id}/user/{user_id}').get_json() == {'rating': 5.0}
+    distribution = client.get(f'/api/ratings/{store_id}/distribution').get_json()
+    assert distribution == {'1': 0, '2': 0, '3': 0, '4': 0, '5': 1}
+    assert float(client.get(f'/api/stores/{store_id}').get_json()['rating']) == 5.0
+    assert client.post(f'/api/ratings/{store_id}', json={'userID': user_id, 'productID': product_id,
+                                                        'rating': 6}).status_code == 400
+
+def test_rating_stats_rebuild(client):
+    import rating_stats
+    from repositories import rating_repository
+    user_id, store_id = seed_store(client)
+    client.post(f'/api/ratings/{store_id}', json={'userID': user_id, 'productID': 1, 'rating': 4})
+
+    connection = db._connect()
+    try:
+        assert rating_stats.verify(connection) == []
+        # A rating written behind the aggregates' back shows up as drift
+        cursor = connection.cursor()
+        rating_repository.insert_rating(cursor, user_id, 2, store_id, 2)
+        connection.commit()
+        assert [row['storeID'] for row in rating_stats.verify(connection)] == [store_id]
+
+        assert rating_stats.rebuild(connection) == 1
+        assert rating_stats.verify(connection) == []
+    finally:
+        connection.close()
+    assert float(client.get(f'/api/stores/{store_id}').get_json()['rating']) == 3.0
+    assert client.get('/api/stores').get_json()[0]['rating_count'] == 2
+
+def test_auth_and_report_endpoints(client):
+    user_id, _ = seed_store(client)
+
+    response = client.post('/api/login', json={'email': 'ada@example.com', 'password': 'pw'})
+    assert response.get_json()['user']['role'] == 'business'
+    assert client.post('/api/login', json={'email': 'ada@example.com', 'password': 'no'}).status_code == 401
+
+    response = client.put(f'/api/users/{user_id}', json={'field': 'firstName', 'value': 'Augusta'})
+    assert response.get_json()['first_name'] == 'Augusta'
+    assert client.get(f'/api/users/{user_id}').get_json()['first_name'] == 'Augusta'
+
+    reports = client.get('/api/reports').get_json()
+    assert float(reports['total']) == 25
+    owner_id = reports['reports'][0]['ownerID']
+    assert client.get(f'/api/subscriptions/{owner_id}').status_code == 200
+
+def test_token_auth(client, monkeypatch):
+    monkeypatch.setattr(Config, 'AUTH_REQUIRED', True)
+    response = client.post('/api/signup', json={'first_name': 'Ada', 'last_name': 'Lovelace',
+                                               'email': 'ada@example.com', 'password': 'pw'})
+    user_id, token = response.get_json()['user']['userID'], response.get_json()['token']
+    shopper = {'Authorization': f'Bearer {token}'}
+
+    assert client.post('/api/products', json={**PRODUCT, 'storeID': 1}).status_code == 401
+    assert client.post('/api/products', json={**PRODUCT, 'storeID': 1}, headers=shopper).status_code == 403
+    assert client.get(f'/api/users/{user_id}', headers=shopper).status_code == 200
+    assert client.get(f'/api/users/{user_id + 1}', headers=shopper).status_code == 403
+    assert client.get(f'/api/users/{user_id}', headers={'Authorization': f'Bearer {token[:-2]}xx'}).status_code == 401
+    assert client.get(f'/api/users/{user_id}', headers={'Authorization': 'Bearer abc.\u00e9'}).status_code == 401
+    assert client.get('/api/stores', headers={'Authorization': 'Bearer abc.\u00e9'}).status_code == 200
+
+    # Subscribing makes the same token a business one at once in this process
+    response = client.post('/api/subscriptions', json={'userID': user_id, 'subscriptionType': '1 MONTH',
+                                                      'joinFee': 25}, headers=shopper)
+    assert response.get_json()['token'] != token
+    owner_id = response.get_json()['data']['ownerID']
+    response = client.post('/api/stores', headers=shopper, json={
+        'ownerID': owner_id, 'store_name': 'Canal Gold', 'address': '1 Canal St',
+        'latitude': 40.719, 'longitude': -74.0, 'phone': '555-0100', 'email': 'shop@example.com', 'hours': WEEK})
+    assert response.status_code == 201
+    store_id = response.get_json()['storeID']
+
+    # Another business account cannot add or change stores for this owner
+    other = client.post('/api/signup', json={'first_name': 'Bo', 'last_name': 'Ng',
+                                             'email': 'bo@example.com', 'password': 'pw'}).get_json()
+    rival = {'Authorization': f"Bearer {other['token']}"}
+    rival = {'Authorization': 'Bearer ' + client.post('/api/subscriptions', headers=rival, json={
+        'userID': other['user']['userID'], 'subscriptionType': '1 MONTH', 'joinFee': 25}).get_json()['token']}
+    assert client.post('/api/stores', headers=rival, json={
+        'ownerID': owner_id, 'store_name': 'Fake Gold', 'address': '2 Canal St', 'latitude': 40.719,
+        'longitude': -74.0, 'phone': '555', 'email': 'f@example.com', 'hours': WEEK}).status_code == 403
+    assert client.put(f'/api/stores/{store_id}/hours', headers=rival, json={'hours': []}).status_code == 403
+    assert client.put(f'/api/stores/{store_id}', headers=rival, json={'field': 'name', 'value': 'X'}).status_code == 403
+    assert client.put('/api/stores/999999/hours', headers=rival, json={'hours': []}).status_code == 404
+    report = client.post('/api/stores/import', headers=rival, content_type='application/x-ndjson', data=(
+        '{"ownerID": %d, "store_name": "Fake Gold", "address": "2 Canal St", "latitude": 40.7, '
+        '"longitude": -74.0, "hours": []}' % owner_id)).get_json()
+    assert (report['created'], report['failed']) == (0, 1)
+    assert client.put(f'/api/stores/{store_id}/hours', headers=shopper, json={'hours': WEEK}).status_code == 200
+
+    # Passwords are stored hashed, and a password change still logs in
+    assert client.put(f'/api/users/{user_id}', json={'field': 'password', 'value': 'new'},
+                      headers=shopper).status_code == 200
+    login = client.post('/api/login', json={'email': 'ada@example.com', 'password': 'new'}).get_json()
+    assert login['user']['role'] == 'business' and login['expires_in'] == Config.AUTH_TOKEN_TTL_SECONDS
+    connection = db.get_standalone_connection()
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    cursor.execute("SELECT user_password FROM users WHERE userID = %s", (user_id,))
+    assert cursor.fetchone()['user_password'].startswith('scrypt$')
+    connection.close()
+
+def test_admission(client, monkeypatch):
+    monkeypatch.setattr(Config, 'RATE_LIMIT_ROUTES', {'auth_bp.login': (0.01, 2)})
+    login = {'email': 'nobody@example.com', 'password': 'pw'}
+    assert [client.post('/api/login', json=login).status_code for _ in range(3)] == [401, 401, 429]
+    response = client.post('/api/login', json=login)
+    assert response.status_code == 429 and int(response.headers['Retry-After']) >= 90
+    # Other clients and routes are unaffected
+    assert client.post('/api/login', json=login, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 401
+    assert client.get('/api/stores').status_code == 200
+
+    # A full read lane sheds reads but leaves writes their own lane
+    monkeypatch.setattr(Config, 'ADMISSION_QUEUE_TIMEOUT', 0.01)
+    admission.reset()
+    read_lane = admission.get_lane('read')
+    for _ in range(read_lane.limit):
+        assert read_lane.acquire()
+    try:
+        response = client.get('/api/stores')
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+        assert client.post('/api/login', json=login).status_code == 401
+    finally:
+        for _ in range(read_lane.limit):
+            read_lane.release()
+    assert client.get('/api/stores').status_code == 200
+    assert client.get('/api/health/admission').get_json()['read']['rejected'] == 1
+
+def test_conditional_gets(client):
+    _, store_id = seed_store(client)
+
+    first = client.get('/api/stores')
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    repeat = client.get('/api/stores', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert 'Server-Timing' not in repeat.headers  # answered without a query
+
+    # A write invalidates the versions this process cached
+    client.put(f'/api/stores/{store_id}', json={'field': 'phone', 'value': '555-0111'})
+    changed = client.get('/api/stores', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+    hours_etag = client.get(f'/api/stores/{store_id}/hours').headers['ETag']
+    assert client.get('/api/products').headers['ETag'] != hours_etag
+    assert client.get(f'/api/stores/{store_id}/hours',
+                      headers={'If-None-Match': hours_etag}).status_code == 304
+
+def test_responses_carry_server_timing(client):
+    seed_store(client)
+    response = client.get('/api/stores')
+    assert response.headers['Server-Timing'].startswith('db;dur=')
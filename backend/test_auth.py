@@ -0,0 +1,49 @@
+import pytest
+from config import Config
+from utils import passwords, tokens
+from utils.lru import LRUCache
+
+@pytest.fixture(autouse=True)
+def cheap_hashes(monkeypatch):
+    monkeypatch.setattr(Config, 'PASSWORD_SCRYPT_N', 2 ** 8)
+
+def test_password_hashes_are_salted_and_verified():
+    first, second = passwords.hash_password('hunter2'), passwords.hash_password('hunter2')
+    assert first != second and 'hunter2' not in first
+    assert passwords.verify_password('hunter2', first) == (True, False)
+    assert passwords.verify_password('hunter3', first) == (False, False)
+
+def test_legacy_and_outdated_passwords_ask_for_a_rehash(monkeypatch):
+    assert passwords.verify_password('pw', 'pw') == (True, True)
+    assert passwords.verify_password('pw', 'other') == (False, False)
+    assert passwords.verify_password('pa$$word', 'pa$$word') == (True, True)
+    stored = passwords.hash_password('pw')
+    monkeypatch.setattr(Config, 'PASSWORD_SCRYPT_N', 2 ** 9)
+    assert passwords.verify_password('pw', stored) == (True, True)
+
+def test_tokens_reject_tampering_and_expiry(monkeypatch):
+    monkeypatch.setattr(Config, 'AUTH_TOKEN_SECRET', 'test-secret')
+    token = tokens.issue({'userID': 7, 'role': 'shopper', 'ownerID': None})
+    assert tokens.verify(token)['userID'] == 7
+    payload, signature = token.split('.')
+    assert tokens.verify(payload[:-1] + ('A' if payload[-1] != 'A' else 'B') + '.' + signature) is None
+    assert tokens.verify(tokens.issue({'userID': 7}, ttl_seconds=-1)) is None
+    assert tokens.verify(payload + '.\u00e9') is None
+    monkeypatch.setattr(Config, 'AUTH_TOKEN_SECRET', 'rotated')
+    assert tokens.verify(token) is None
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    cache.get(1)
+    cache.put(3, 'c')
+    assert (cache.get(1), cache.get(2), cache.get(3)) == ('a', None, 'c')
+    cache.invalidate(1)
+    assert len(cache) == 1
+
+def test_malformed_hashes_never_match():
+    stored = passwords.hash_password('pw')
+    for corrupt in (stored[:-10], stored.rsplit('$', 1)[0], 'scrypt$', 'scrypt$x$8$1$salt$hash', 'pbkdf2_sha256$1'):
+        assert passwords.verify_password('pw', corrupt) == (False, False)
+        assert passwords.verify_password(corrupt, corrupt) == (False, False)
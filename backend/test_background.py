@@ -0,0 +1,28 @@
+import threading
+from config import Config
+from utils import background
+
+def test_tasks_run_on_a_worker_and_are_dropped_when_the_queue_is_full(monkeypatch):
+    monkeypatch.setattr(Config, 'BACKGROUND_WORKERS', 1)
+    monkeypatch.setattr(Config, 'BACKGROUND_QUEUE', 1)
+    background.shutdown()
+    release, ran = threading.Event(), []
+
+    def task(name):
+        release.wait(5)
+        ran.append((name, threading.current_thread().name))
+
+    try:
+        assert background.submit(task, 'first')
+        assert background.submit(task, 'queued')
+        assert not background.submit(task, 'dropped')
+        assert ran == []
+        release.set()
+    finally:
+        background.shutdown()
+    assert [name for name, _ in ran] == ['first', 'queued']
+    assert all(thread.startswith('background') for _, thread in ran)
+
+def test_failures_are_logged_not_raised(monkeypatch):
+    monkeypatch.setattr(Config, 'BACKGROUND_WORKERS', 0)
+    assert background.submit(lambda: 1 / 0)
@@ -0,0 +1,117 @@
+import random
+import pytest
+
+np = pytest.importorskip('numpy')
+from utils.columnar_catalog import ColumnarCatalog
+
+TYPES = ('Rope', 'Cuban', 'Figaro', 'Franco')
+COLORS = ('Yellow', 'White', 'Rose')
+
+
+def make_row(product_id, rng):
+    return {'productID': product_id, 'storeID': rng.randint(1, 5), 'chain_type': rng.choice(TYPES),
+            'chain_purity': rng.choice(('10K', '14K', '18K')), 'chain_thickness': rng.choice((2, 3, 4.5)),
+            'chain_length': rng.choice((18, 20, 24)), 'chain_color': rng.choice(COLORS),
+            'chain_weight': round(rng.uniform(5, 50), 1), 'set_price': rng.randint(1, 40) * 50}
+
+def matches(row, filters):
+    for column in ('chain_type', 'chain_color', 'chain_thickness'):
+        if filters.get(column) and str(row[column]) not in [str(v) for v in filters[column]]:
+            return False
+    if filters.get('max_price') is not None and row['set_price'] > filters['max_price']:
+        return False
+    if filters.get('store_ids') is not None and row['storeID'] not in filters['store_ids']:
+        return False
+    return True
+
+def brute_force_search(rows, filters, limit, sort_column, descending, after):
+    key = (lambda r: (r['productID'],)) if sort_column == 'productID' else (lambda r: (r[sort_column], r['productID']))
+    ordered = sorted((r for r in rows.values() if matches(r, filters)), key=key, reverse=descending)
+    if after is not None:
+        ordered = [r for r in ordered if (key(r) < tuple(after) if descending else key(r) > tuple(after))]
+    return [r['productID'] for r in ordered[:limit + 1]]
+
+
+FILTERS = [
+    {},
+    {'chain_type': ['Rope', 'Cuban']},
+    {'chain_color': ['Yellow'], 'max_price': 1000},
+    {'chain_thickness': ['4.5'], 'store_ids': [1, 2]},
+    {'store_ids': []},
+]
+
+def test_matches_brute_force_through_writes():
+    rng = random.Random(7)
+    rows = {i: make_row(i, rng) for i in range(1, 400)}
+    catalog = ColumnarCatalog(capacity=16)
+    catalog.rebuild(list(rows.values()))
+
+    for _ in range(200):
+        # Warm the cached sort orders so writes have to patch them
+        for filters in FILTERS:
+            for sort_column, descending in (('productID', False), ('set_price', False), ('set_price', True)):
+                # The full order, so a misplaced row anywhere in a cached sort is caught
+                expected = brute_force_search(rows, filters, len(rows), sort_column, descending, None)
+                assert catalog.search(filters, len(rows), sort_column, descending) == expected
+                for cursor_id in expected[1:-1][::max(1, len(expected) // 3)]:
+                    cursor_row = rows[cursor_id]
+                    after = ((cursor_row['productID'],) if sort_column == 'productID'
+                             else (cursor_row['set_price'], cursor_row['productID']))
+                    assert catalog.search(filters, 5, sort_column, descending, after) == \
+                        brute_force_search(rows, filters, 5, sort_column, descending, after)
+            assert catalog.count(filters) == sum(matches(r, filters) for r in rows.values())
+
+        action = rng.random()
+        if action < 0.3 and rows:
+            product_id = rng.choice(list(rows))
+            del rows[product_id]
+            catalog.remove(product_id)
+        else:
+            product_id = rng.choice(list(rows)) if action < 0.8 and rows else max(rows, default=0) + 1
+            rows[product_id] = make_row(product_id, rng)
+            catalog.upsert(rows[product_id])
+        assert len(catalog) == len(rows)
+
+def test_price_update_moves_the_row_within_the_cached_order():
+    catalog = ColumnarCatalog()
+    rows = [{'productID': i, 'storeID': 1, 'chain_type': 'Rope', 'chain_purity': '14K', 'chain_thickness': 3,
+             'chain_length': 20, 'chain_color': 'Yellow', 'chain_weight': 10, 'set_price': i} for i in range(1, 6)]
+    catalog.rebuild(rows)
+    assert catalog.search({}, 10, 'set_price') == [1, 2, 3, 4, 5]
+
+    catalog.upsert({**rows[2], 'set_price': 0})
+    assert catalog.search({}, 10, 'set_price') == [3, 1, 2, 4, 5]
+    catalog.upsert({**rows[0], 'set_price': 9})
+    assert catalog.search({}, 10, 'set_price') == [3, 2, 4, 5, 1]
+    assert catalog.search({}, 10, 'set_price', after=(2, 2)) == [4, 5, 1]
+
+def test_facets_ignore_their_own_filter():
+    catalog = ColumnarCatalog()
+    catalog.rebuild([
+        {'productID': 1, 'storeID': 1, 'chain_type': 'Rope', 'chain_purity': '14K', 'chain_thickness': 3,
+         'chain_length': 20, 'chain_color': 'Yellow', 'chain_weight': 10, 'set_price': 500},
+        {'productID': 2, 'storeID': 1, 'chain_type': 'Cuban', 'chain_purity': '14K', 'chain_thickness': 3.0,
+         'chain_length': 20, 'chain_color': 'White', 'chain_weight': 10, 'set_price': 700},
+        {'productID': 3, 'storeID': 2, 'chain_type': 'Cuban', 'chain_purity': '18K', 'chain_thickness': 4,
+         'chain_length': 22, 'chain_color': 'Yellow', 'chain_weight': 10, 'set_price': 900},
+    ])
+    facets = catalog.facets({'chain_type': ['Cuban']})
+    assert facets['chain_type'] == {'Cuban': 2, 'Rope': 1}
+    assert facets['chain_color'] == {'White': 1, 'Yellow': 1}
+    assert facets['chain_thickness'] == {'3': 1, '4': 1}
+    assert catalog.count({'chain_thickness': ['3.0']}) == 2
+
+def test_price_stats_match_numpy_percentile():
+    rng = random.Random(3)
+    rows = [make_row(i, rng) for i in range(1, 300)]
+    catalog = ColumnarCatalog()
+    catalog.rebuild(rows)
+    stats = catalog.price_stats({'max_price': 1500}, 'chain_type', percentiles=(10, 50, 95))
+    for chain_type in TYPES:
+        prices = [r['set_price'] for r in rows if r['chain_type'] == chain_type and r['set_price'] <= 1500]
+        group = stats[chain_type]
+        assert group['count'] == len(prices)
+        assert group['min'] == min(prices) and group['max'] == max(prices)
+        for q in (10, 50, 95):
+            assert group[f'p{q}'] == round(float(np.percentile(prices, q)), 2)
+    assert catalog.price_stats({'store_ids': []}, 'chain_type') == {}
@@ -0,0 +1,168 @@
+from flask import Flask, jsonify
+import db
+from indexes import table_versions
+from utils.db_pool import ConnectionPool
+from utils.replica_router import Replica, ReplicaRouter
+
+class FakeCursor:
+    rowcount = 0
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=None):
+        self.connection.statements.append((' '.join(sql.split()), params))
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+        self.statements = []
+
+    def cursor(self, *args):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+def make_app(monkeypatch):
+    opened = []
+
+    def factory():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(db, '_pool', ConnectionPool(factory, min_size=0, max_size=2, reset=lambda raw: None))
+    app = Flask(__name__)
+    db.init_app(app)
+    return app, opened
+
+def test_request_shares_one_connection_and_commits_once(monkeypatch):
+    app, opened = make_app(monkeypatch)
+
+    @app.route('/write')
+    def write():
+        first = db.get_db_connection()
+        first.begin()
+        first.commit()
+        first.close()
+        second = db.get_db_connection()
+        second.commit()
+        return jsonify({'same': first is second})
+
+    response = app.test_client().get('/write')
+    assert response.get_json() == {'same': True}
+    assert len(opened) == 1
+    assert opened[0].commits == 1
+    assert db.get_pool_stats()['primary']['in_use'] == 0
+
+def test_server_error_rolls_back_request(monkeypatch):
+    app, opened = make_app(monkeypatch)
+
+    @app.route('/fail')
+    def fail():
+        db.get_db_connection().commit()
+        return jsonify({'error': 'boom'}), 500
+
+    app.test_client().get('/fail')
+    assert opened[0].commits == 0
+    assert opened[0].rollbacks == 1
+
+def test_failed_commit_returns_a_server_error(monkeypatch):
+    app, opened = make_app(monkeypatch)
+
+    def lost_connection():
+        raise RuntimeError('lost connection')
+
+    @app.route('/write', methods=['POST'])
+    def write():
+        connection = db.get_db_connection()
+        connection._connection.commit = lost_connection
+        connection.commit()
+        return jsonify({})
+
+    response = app.test_client().post('/write')
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'lost connection'}
+    assert opened[0].rollbacks == 1
+
+def test_table_versions_are_bumped_in_sorted_order_just_before_commit(monkeypatch):
+    app, opened = make_app(monkeypatch)
+
+    @app.route('/write', methods=['POST'])
+    def write():
+        connection = db.get_db_connection()
+        cursor = connection.cursor()
+        table_versions.mark_changed(cursor, 'store_hours', 'store')
+        cursor.execute("UPDATE product SET set_price = %s", (1,))
+        table_versions.mark_changed(cursor, 'product', 'store')
+        connection.commit()
+        return jsonify({})
+
+    app.test_client().post('/write')
+    statements = opened[0].statements
+    assert statements[0][0].startswith('UPDATE product')
+    assert [params[1] for _, params in statements[1:]] == ['product', 'store', 'store_hours']
+    assert opened[0].commits == 1
+
+def test_get_requests_use_replica_until_client_writes(monkeypatch):
+    app, opened = make_app(monkeypatch)
+    app.secret_key = 'test'
+    replica_opened = []
+
+    def replica_factory():
+        conn = FakeConnection()
+        replica_opened.append(conn)
+        return conn
+
+    replica = Replica('replica', ConnectionPool(replica_factory, min_size=0, max_size=1, reset=lambda raw: None))
+    monkeypatch.setattr(db, '_replica_router', ReplicaRouter([replica], lag_of=lambda conn: 0))
+
+    @app.route('/item', methods=['GET', 'POST'])
+    def item():
+        connection = db.get_db_connection()
+        connection.commit()
+        return jsonify({'read_only': connection.read_only})
+
+    client = app.test_client()
+    assert client.get('/item').get_json() == {'read_only': True}
+    client.post('/item')
+    assert client.get('/item').get_json() == {'read_only': False}
+
+def test_router_skips_failed_and_lagging_replicas():
+    def failing_factory():
+        raise ConnectionError("down")
+
+    down = Replica('down', ConnectionPool(failing_factory, min_size=0, max_size=1))
+    lagging = Replica('lagging', ConnectionPool(FakeConnection, min_size=0, max_size=1))
+    router = ReplicaRouter([down, lagging], lag_of=lambda conn: 60, max_lag=5)
+
+    assert router.get() is None
+    stats = {s['name']: s for s in router.stats()}
+    assert not stats['down']['available']
+    assert not stats['lagging']['available']
+    assert stats['lagging']['lag'] == 60
+
+def test_router_falls_back_without_marking_an_exhausted_replica_down():
+    busy = Replica('busy', ConnectionPool(FakeConnection, min_size=0, max_size=1, timeout=0))
+    router = ReplicaRouter([busy], lag_of=lambda conn: 0)
+    held = router.get()
+
+    assert router.get() is None
+    assert busy.stats()['available']
+    assert busy.failures == 0
+    held.close()
+    assert router.get() is not None
@@ -0,0 +1,108 @@
+import threading
+import time
+import pytest
+from utils.db_pool import ConnectionPool, PoolTimeout
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise ConnectionError("gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+def make_pool(**kwargs):
+    opened = []
+
+    def factory():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    return ConnectionPool(factory, **kwargs), opened
+
+def test_connections_are_reused():
+    pool, opened = make_pool(min_size=1, max_size=2)
+    conn = pool.get()
+    conn.close()
+    conn = pool.get()
+    conn.close()
+    assert len(opened) == 1
+    assert opened[0].rollbacks == 2
+    assert pool.stats()['idle'] == 1
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(min_size=0, max_size=1, timeout=0.05)
+    held = pool.get()
+    with pytest.raises(PoolTimeout):
+        pool.get()
+    held.close()
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waits'] == 1
+
+def test_waiter_gets_released_connection():
+    pool, opened = make_pool(min_size=0, max_size=1, timeout=2)
+    held = pool.get()
+    threading.Timer(0.05, held.close).start()
+    conn = pool.get()
+    conn.close()
+    assert len(opened) == 1
+    assert pool.stats()['wait_time_ms'] > 0
+
+def test_dead_connection_is_replaced_on_borrow():
+    pool, opened = make_pool(min_size=1, max_size=1, ping_interval=0)
+    opened[0].alive = False
+    conn = pool.get()
+    assert conn._raw is opened[1]
+    assert opened[0].closed
+    assert pool.stats()['discarded'] == 1
+
+def test_old_connection_is_recycled():
+    pool, opened = make_pool(min_size=1, max_size=1, max_lifetime=0.01)
+    time.sleep(0.02)
+    conn = pool.get()
+    assert conn._raw is opened[1]
+    assert pool.stats()['recycled'] == 1
+    assert pool.stats()['size'] == 1
+
+def test_discarded_connections_are_replaced_up_to_min_size():
+    pool, opened = make_pool(min_size=2, max_size=2)
+    first, second = pool.get(), pool.get()
+
+    def broken_rollback():
+        raise ConnectionError("gone away")
+
+    opened[0].rollback = broken_rollback
+    first.close()
+    second.close()
+    assert len(opened) == 3
+    stats = pool.stats()
+    assert (stats['size'], stats['idle'], stats['discarded']) == (2, 2, 1)
+
+def test_slot_lost_to_a_failed_reopen_is_refilled_on_release():
+    refuse = []
+
+    def factory():
+        if refuse:
+            raise ConnectionError("refused")
+        return FakeConnection()
+
+    pool = ConnectionPool(factory, min_size=2, max_size=2, ping_interval=0)
+    held = pool.get()
+    pool._idle[0][0].alive = False
+    refuse.append(True)
+    with pytest.raises(ConnectionError):
+        pool.get()
+    assert pool.stats()['size'] == 1
+    refuse.clear()
+    held.close()
+    assert (pool.stats()['size'], pool.stats()['idle']) == (2, 2)
@@ -0,0 +1,24 @@
+import pytest
+from utils.deal_score import deal_score, length_bucket, purity_fraction
+
+def test_purity_fraction():
+    assert purity_fraction('14K') == pytest.approx(14 / 24)
+    assert purity_fraction('18 kt') == pytest.approx(0.75)
+    assert purity_fraction('585') == pytest.approx(0.585)
+    assert purity_fraction('Silver') is None
+    assert purity_fraction('30K') is None
+
+def test_length_bucket():
+    assert [length_bucket(v) for v in (18, 19.5, 20, 21, 24)] == [18, 18, 20, 20, 24]
+
+def test_deal_score():
+    # 24K, 10 g, 1000 -> 100 per pure gram
+    assert deal_score(1000, 10, '24K') == (100.0, 100.0)
+    # Reports pull the price halfway towards their mean
+    assert deal_score(1000, 10, '24K', [800, 600]) == (85.0, 85.0)
+    # A 5-star store lowers the score, a 1-star store raises it, unrated is neutral
+    assert deal_score(1000, 10, '24K', rating=5)[1] == 95.0
+    assert deal_score(1000, 10, '24K', rating=1)[1] == 105.0
+    assert deal_score(1000, 10, '24K', rating=0)[1] == 100.0
+    assert deal_score(1000, 0, '24K') is None
+    assert deal_score(1000, 10, 'plated') is None
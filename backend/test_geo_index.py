@@ -0,0 +1,46 @@
+import random
+import time
+from utils.geo_index import GeoIndex, haversine_km
+
+def brute_force(points, lat, lng):
+    return sorted((haversine_km(lat, lng, plat, plng), key) for key, plat, plng in points)
+
+def make_points(n=2000, seed=7):
+    rng = random.Random(seed)
+    return [(i, 40.5 + rng.random() * 0.5, -74.3 + rng.random() * 0.6) for i in range(n)]
+
+def test_knn_matches_brute_force():
+    points = make_points()
+    index = GeoIndex(cell_degrees=0.01)
+    index.rebuild(points)
+    for lat, lng in [(40.7, -74.0), (40.5, -74.3), (41.5, -73.0)]:
+        expected = brute_force(points, lat, lng)[:10]
+        assert [key for _, key in index.nearby(lat, lng, k=10)] == [key for _, key in expected]
+
+def test_radius_matches_brute_force():
+    points = make_points()
+    index = GeoIndex(cell_degrees=0.01)
+    index.rebuild(points)
+    expected = [key for d, key in brute_force(points, 40.75, -74.0) if d <= 3]
+    assert [key for _, key in index.nearby(40.75, -74.0, radius_km=3)] == expected
+
+def test_far_and_filtered_queries_skip_empty_rings():
+    points = make_points()
+    index = GeoIndex(cell_degrees=0.01)
+    index.rebuild(points)
+    started = time.monotonic()
+    # Los Angeles, thousands of empty rings away from every point
+    assert index.nearby(34.0, -118.2, k=10) == brute_force(points, 34.0, -118.2)[:10]
+    rare = [point for point in points if point[0] % 499 == 0]
+    assert index.nearby(40.7, -74.0, k=10, accept=lambda key: key % 499 == 0) == brute_force(rare, 40.7, -74.0)
+    assert time.monotonic() - started < 2
+
+def test_upsert_and_remove():
+    index = GeoIndex()
+    index.upsert(1, 40.7, -74.0)
+    index.upsert(2, 40.8, -74.0)
+    index.upsert(1, 40.9, -74.0)
+    assert [key for _, key in index.nearby(40.9, -74.0, k=2)] == [1, 2]
+    index.remove(1)
+    assert [key for _, key in index.nearby(40.9, -74.0, k=2)] == [2]
+    assert len(index) == 1
@@ -0,0 +1,38 @@
+import random
+from datetime import datetime, timedelta
+from utils.hours_index import DAYS_OF_WEEK, WeeklyHoursIndex, minute_of_week, weekly_intervals
+
+MONDAY = datetime(2025, 3, 3)
+
+def random_week(rng):
+    hours = []
+    for day in DAYS_OF_WEEK:
+        if rng.random() < 0.2:
+            hours.append({'daysOpen': day, 'openTime': None, 'closeTime': None})
+            continue
+        opens, closes = rng.randrange(1440), rng.randrange(1440)
+        hours.append({'daysOpen': day, 'openTime': f'{opens // 60:02d}:{opens % 60:02d}',
+                      'closeTime': timedelta(minutes=closes)})
+    return hours
+
+def test_open_at_matches_the_intervals():
+    rng = random.Random(3)
+    weeks = {store_id: random_week(rng) for store_id in range(300)}
+    index = WeeklyHoursIndex()
+    index.rebuild(weeks)
+    for _ in range(200):
+        moment = MONDAY + timedelta(minutes=rng.randrange(7 * 1440))
+        minute = minute_of_week(moment)
+        expected = {store_id for store_id, hours in weeks.items()
+                    if any(start <= minute < end for start, end in weekly_intervals(hours))}
+        assert index.open_at(moment) == expected
+
+def test_overnight_sunday_wraps_to_monday():
+    index = WeeklyHoursIndex()
+    index.set_hours(1, [{'daysOpen': 'Sunday', 'openTime': '20:00', 'closeTime': '03:00'}])
+    assert index.open_at(MONDAY + timedelta(hours=2)) == {1}
+    assert index.open_at(MONDAY + timedelta(hours=3)) == set()
+    assert index.open_at(MONDAY + timedelta(days=6, hours=21)) == {1}
+
+    index.set_hours(1, [])
+    assert index.open_at(MONDAY + timedelta(hours=2)) == set()
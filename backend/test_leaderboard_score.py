@@ -0,0 +1,14 @@
+import pytest
+from utils.leaderboard_score import bayesian_rating, cell_key
+
+def test_bayesian_rating_needs_volume_to_leave_the_prior():
+    one_review = bayesian_rating(5, 1, prior_rating=3.5, prior_count=10)
+    many_reviews = bayesian_rating(4.8 * 400, 400, prior_rating=3.5, prior_count=10)
+    assert one_review == pytest.approx(3.636, abs=1e-3)
+    assert many_reviews == pytest.approx(4.768, abs=1e-3)
+    assert bayesian_rating(0, 0, prior_rating=3.5, prior_count=10) == 3.5
+
+def test_cell_key():
+    assert cell_key(40.72, -74.0, 0.5) == '81:-148'
+    assert cell_key(40.99, -73.51, 0.5) == '81:-148'
+    assert cell_key(-0.1, 0.1, 0.5) == '-1:0'
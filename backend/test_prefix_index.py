@@ -0,0 +1,24 @@
+from utils.prefix_index import PrefixIndex
+
+def test_prefix_matches_any_word_by_weight():
+    index = PrefixIndex(cache_depth=2, scan_limit=0)
+    index.rebuild([('store', 1, 'Canal Gold', 3), ('store', 2, 'Golden Chain Co', 9),
+                   ('chain_type', 'Rope', 'Rope', 5)])
+    assert [key for _, key, _, _ in index.suggest('gol', 5)] == [2, 1]
+    assert [key for _, key, _, _ in index.suggest('GOLDEN c', 5)] == [2]
+    assert index.suggest('ro', 5, kinds=frozenset({'store'})) == []
+    assert index.suggest('  ', 5) == []
+
+def test_writes_patch_cached_results():
+    index = PrefixIndex(cache_depth=1, scan_limit=0)
+    index.rebuild([('store', key, f'Gold {key}', key) for key in range(1, 4)])
+    assert index.suggest('g', 1)[0][1] == 3
+    index.set_weight('store', 1, 10)
+    assert index.suggest('g', 1)[0][1] == 1
+    index.upsert('store', 1, 'Silver 1')
+    index.remove('store', 3)
+    assert [key for _, key, _, _ in index.suggest('g', 1)] == [2]
+    index.add_weight('chain_type', 'Gourmette', 50)
+    assert index.suggest('g', 1)[0][:3] == ('chain_type', 'Gourmette', 'Gourmette')
+    index.add_weight('chain_type', 'Gourmette', -50)
+    assert ('chain_type', 'Gourmette') not in index
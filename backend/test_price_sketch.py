@@ -0,0 +1,17 @@
+import random
+from utils import price_sketch
+
+def test_quantiles_stay_within_relative_accuracy():
+    rng = random.Random(11)
+    values = sorted(rng.lognormvariate(4, 0.5) for _ in range(5000))
+    sketch = {}
+    for value in values:
+        bucket = price_sketch.bucket_of(value)
+        sketch[bucket] = sketch.get(bucket, 0) + 1
+    for q in (0.0, 0.1, 0.5, 0.9, 0.99, 1.0):
+        exact = values[int(q * (len(values) - 1))]
+        estimate = price_sketch.quantile(sketch, q)
+        assert abs(estimate - exact) <= exact * price_sketch.RELATIVE_ACCURACY + 1e-9
+
+def test_empty_sketch_has_no_quantile():
+    assert price_sketch.quantile({}, 0.5) is None
@@ -0,0 +1,285 @@
+"""EXPLAIN every repository query against the configured MySQL database.
+
+Run `python migrate.py` against an empty test database first. The module
+seeds it with a few thousand rows per table, runs ANALYZE TABLE so the
+optimizer sees real row counts, and deletes the rows again afterwards. Hot
+queries fail the suite unless every table in their plan is read through
+the expected index, without a full scan or filesort. The module is skipped
+when no MySQL database is reachable.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+import pymysql
+import pytest
+from repositories import (deal_repository, leaderboard_repository, market_repository, product_repository,
+                          rating_repository, store_repository, subscription_repository, user_repository,
+                          version_repository)
+
+REPOSITORIES = (deal_repository, leaderboard_repository, market_repository, product_repository, rating_repository,
+                store_repository, subscription_repository, user_repository, version_repository)
+
+# Product lookups by store may use either index that leads with storeID
+STORE_PRODUCTS = ('ix_product_store', 'ix_product_store_price')
+
+# (repository constant, sample parameters, index expected per table in the plan).
+# Hot queries name the key every table must be read through; None marks cold
+# queries that only need to be explainable.
+QUERY_PLANS = [
+    (store_repository.SELECT_ALL_STORES, (), None),
+    (store_repository.SELECT_STORES_PAGE.format(where='s.storeID > %s', order='s.storeID ASC'), (1, 51), {'s': 'PRIMARY', 'o': 'PRIMARY', 'r': 'PRIMARY'}),
+    (store_repository.SELECT_STORES_PAGE.format(
+        where='(s.rating < %s OR (s.rating = %s AND s.storeID < %s))', order='s.rating DESC, s.storeID DESC'),
+     (4.5, 4.5, 1, 51), {'s': 'ix_store_rating', 'o': 'PRIMARY', 'r': 'PRIMARY'}),
+    (store_repository.SELECT_STORES_PAGE.format(where='s.storeID > %s AND s.storeID IN (%s,%s,%s)',
+                                                order='s.storeID ASC'),
+     (1, 2, 3, 4, 51), {'s': 'PRIMARY', 'o': 'PRIMARY', 'r': 'PRIMARY'}),
+    (store_repository.SELECT_STORE, (1,), {'s': 'PRIMARY'}),
+    (store_repository.SELECT_STORE_DETAIL, (1,), {'s': 'PRIMARY', 'r': 'PRIMARY'}),
+    (store_repository.SELECT_STORE_ROW, (1,), {'store': 'PRIMARY'}),
+    (store_repository.SELECT_STORES_BY_IDS.format(placeholders='%s, %s'), (1, 2), {'s': 'PRIMARY', 'r': 'PRIMARY'}),
+    (store_repository.SELECT_STORE_LOCATIONS, (), None),
+    (store_repository.SELECT_STORE_SEARCH_TEXT, (), None),
+    (store_repository.SELECT_STORE_SUGGESTIONS, (), None),
+    (store_repository.SELECT_STORE_IDS_MIN_RATING, (4.5,), {'store': 'ix_store_rating'}),
+    (store_repository.SEARCH_STORES_LIKE, ('%gold%', '%gold%', 500), None),
+    (store_repository.INSERT_STORE, (1, 'Store', 0, 'Address', 40.7, -74.0, '555', 'a@b.c', None), None),
+    (store_repository.SELECT_STORE_IDS_BY_BATCH, ('0123456789abcdef0123456789abcdef:%',), {'store': 'ix_store_batch_key'}),
+    (store_repository.UPDATE_STORE_FIELD.format(column='phone'), ('555', 1), {'store': 'PRIMARY'}),
+    (store_repository.UPDATE_STORE_RATING, (4.5, 1), {'store': 'PRIMARY'}),
+    (store_repository.SELECT_STORE_HOURS, (1,), {'store_hours': 'ix_store_hours_store'}),
+    (store_repository.SELECT_FORMATTED_STORE_HOURS, (1,), {'store_hours': 'ix_store_hours_store'}),
+    (store_repository.INSERT_STORE_HOURS, (1, 'Monday', '10:00', '18:00'), None),
+    (store_repository.SELECT_ALL_STORE_HOURS, (), None),
+    (store_repository.DELETE_STORE_HOURS, (1,), {'store_hours': 'ix_store_hours_store'}),
+    (product_repository.SELECT_ALL_PRODUCTS, (), None),
+    (product_repository.SELECT_PRODUCTS_PAGE.format(where='productID > %s', order='productID ASC'), (1, 51), {'product': 'PRIMARY'}),
+    (product_repository.SELECT_PRODUCTS_PAGE.format(
+        where='storeID = %s AND (set_price > %s OR (set_price = %s AND productID > %s))',
+        order='set_price ASC, productID ASC'), (1, 900, 900, 1, 51), {'product': 'ix_product_store_price'}),
+    (product_repository.COUNT_PRODUCTS.format(where="chain_type IN (%s) AND set_price <= %s"), ('Rope', 900), None),
+    (product_repository.SELECT_PRODUCT_FACET.format(column='chain_color', where="chain_type IN (%s)"), ('Rope',), None),
+    (product_repository.SELECT_PRODUCT, (1,), {'product': 'PRIMARY'}),
+    (product_repository.SELECT_PRODUCTS_BY_IDS.format(placeholders='%s, %s'), (1, 2), {'product': 'PRIMARY'}),
+    (product_repository.SELECT_PRODUCT_VALUE_COUNTS, (), None),
+    (product_repository.SELECT_PRODUCTS_BY_STORE, (1,), {'product': STORE_PRODUCTS}),
+    (product_repository.INSERT_PRODUCT, (1, 'Rope', '14K', 3, 20, 'Yellow', 10, 900, None), None),
+    (product_repository.SELECT_PRODUCT_IDS_BY_BATCH, ('0123456789abcdef0123456789abcdef:%',), {'product': 'ix_product_batch_key'}),
+    (product_repository.UPDATE_PRODUCT, ('Rope', '14K', 3, 20, 'Yellow', 10, 900, 1), {'product': 'PRIMARY'}),
+    (product_repository.DELETE_PRODUCT, (1,), {'product': 'PRIMARY'}),
+    (product_repository.SELECT_RECENT_PURCHASES, (1, 5), {'ph': 'ix_price_history_product_date', 'u': 'PRIMARY'}),
+    # The window sort only ever sees the five rows per product that trimming keeps
+    (product_repository.SELECT_RECENT_PURCHASES_FOR_PRODUCTS.format(placeholders='%s, %s'), (1, 2, 5), None),
+    (product_repository.UPSERT_PRICE_ENTRY, (1, 1, 1, 900, '2025-01-01 10:00:00', '2025-01-01'), None),
+    (product_repository.SELECT_PRICE_HISTORY_PRODUCT_BOUNDS, (), {}),
+    (product_repository.SELECT_EXPIRED_PRICE_IDS, (1, 501, 5), None),
+    (product_repository.DELETE_PRICE_ENTRIES.format(placeholders='%s, %s'), (1, 2), {'price_history': 'PRIMARY'}),
+    (rating_repository.SELECT_RATING_ID, (1, 1, 1), {'user_update': 'ix_user_update_user_store_product'}),
+    (rating_repository.UPDATE_RATING, (5, 1), {'user_update': 'PRIMARY'}),
+    (rating_repository.INSERT_RATING, (1, 1, 1, 5), None),
+    (rating_repository.SELECT_RATING_STATS, (1,), {'store_rating_stats': 'PRIMARY'}),
+    (rating_repository.UPSERT_RATING_STATS, (1, 4, 1, 0, 0, 0, 1, 0), None),
+    (rating_repository.SELECT_RATING_AGGREGATES, (), None),
+    (rating_repository.SELECT_ALL_RATING_STATS, (), None),
+    (rating_repository.DELETE_ALL_RATING_STATS, (), None),
+    (rating_repository.SELECT_USER_RATING, (1, 1), {'user_update': 'ix_user_update_store_user_submitted'}),
+    (user_repository.SELECT_LOGIN_USER, ('a@b.c',), {'users': 'ix_users_email', 'store_owners': 'ix_store_owners_user'}),
+    (user_repository.SELECT_USER_PROFILE, (1,), {'users': 'PRIMARY'}),
+    (user_repository.SELECT_USER_BY_EMAIL, ('a@b.c',), {'users': 'ix_users_email'}),
+    (user_repository.INSERT_USER, ('A', 'B', 'a@b.c', 'pw'), None),
+    (user_repository.UPDATE_USER_FIELD.format(column='email'), ('a@b.c', 1), {'users': 'PRIMARY'}),
+    (subscription_repository.INSERT_STORE_OWNER, (1,), None),
+    (subscription_repository.INSERT_SUBSCRIPTION, (1, '2025-01-01', '2025-02-01', 10), None),
+    (subscription_repository.SELECT_LATEST_SUBSCRIPTION, (1,), {'subscriptions': 'ix_subscriptions_owner_start'}),
+    (subscription_repository.SELECT_TOTAL_REVENUE, (), None),
+    (subscription_repository.SELECT_ALL_SUBSCRIPTIONS, (), None),
+    (deal_repository.SELECT_DEAL_INPUTS.format(where='p.productID IN (%s, %s)'), (1, 2), {'p': 'PRIMARY', 's': 'PRIMARY'}),
+    (deal_repository.SELECT_DEAL_INPUTS.format(where='p.storeID = %s'), (1,), {'p': STORE_PRODUCTS, 's': 'PRIMARY'}),
+    (deal_repository.SELECT_DEAL_INPUTS.format(where='1 = 1'), (), None),
+    (deal_repository.UPSERT_PRODUCT_DEAL, (1, 1, 'Rope', 20, 80.5, 79.2), None),
+    (deal_repository.DELETE_PRODUCT_DEALS.format(placeholders='%s, %s'), (1, 2), {'product_deals': 'PRIMARY'}),
+    (deal_repository.DELETE_ALL_PRODUCT_DEALS, (), None),
+    (deal_repository.SELECT_TOP_DEALS.format(where='1 = 1'), (20,), {'d': 'ix_product_deals_score', 'p': 'PRIMARY', 's': 'PRIMARY'}),
+    (deal_repository.SELECT_TOP_DEALS.format(where='d.chain_type = %s'), ('Rope', 20), {'d': 'ix_product_deals_type_score', 'p': 'PRIMARY', 's': 'PRIMARY'}),
+    (deal_repository.SELECT_TOP_DEALS.format(where='d.chain_type = %s AND d.length_bucket = %s'), ('Rope', 20, 20), {'d': 'ix_product_deals_type_length_score', 'p': 'PRIMARY', 's': 'PRIMARY'}),
+    (leaderboard_repository.SELECT_LEADERBOARD_STORES.format(where='s.storeID IN (%s, %s)'), (1, 2), {'s': 'PRIMARY', 'r': 'PRIMARY'}),
+    (leaderboard_repository.SELECT_LEADERBOARD_STORES.format(where='1 = 1'), (), None),
+    (leaderboard_repository.SELECT_STORE_CHAIN_TYPES.format(where='storeID IN (%s, %s)'), (1, 2), {'product': STORE_PRODUCTS}),
+    (leaderboard_repository.SELECT_STORE_CHAIN_TYPES.format(where='1 = 1'), (), None),
+    (leaderboard_repository.INSERT_LEADERBOARD_ENTRY, ('all', '', 1, 4.2), None),
+    (leaderboard_repository.DELETE_LEADERBOARD_STORES.format(placeholders='%s, %s'), (1, 2), {'store_leaderboard': 'ix_store_leaderboard_store'}),
+    (leaderboard_repository.DELETE_ALL_LEADERBOARD, (), None),
+    (leaderboard_repository.SELECT_TOP_STORES, ('type', 'Rope', 10), {'l': 'ix_store_leaderboard_rank', 's': 'PRIMARY', 'r': 'PRIMARY'}),
+    (market_repository.UPSERT_MARKET_DAY, ('2025-01-01', 'Rope', '14K', 'Yellow', 1, 70.0, 70.0, 70.0), None),
+    (market_repository.UPSERT_MARKET_SKETCH, ('2025-01-01', 213, 'Rope', '14K', 'Yellow', 1), None),
+    (market_repository.RETRACT_MARKET_DAY, (70.0, '2025-01-01', 'Rope', '14K', 'Yellow'), {'market_price_daily': 'PRIMARY'}),
+    (market_repository.RETRACT_MARKET_SKETCH, ('2025-01-01', 213, 'Rope', '14K', 'Yellow'), {'market_price_sketch': 'PRIMARY'}),
+    (market_repository.SELECT_PRICE_OBSERVATION_FOR_UPDATE, (1, 1, '2025-01-01'), {'price_history': 'ux_price_history_user_product_day'}),
+    (market_repository.UPDATE_INDEXED_PPG, (70.0, 1), {'price_history': 'PRIMARY'}),
+    (market_repository.SELECT_MARKET_DAYS.format(where='day >= %s AND day <= %s AND chain_type = %s'),
+     ('2025-01-01', '2025-03-31', 'Rope'), {'market_price_daily': 'PRIMARY'}),
+    (market_repository.SELECT_MARKET_SKETCH.format(where='day >= %s AND day <= %s AND chain_type = %s'),
+     ('2025-01-01', '2025-03-31', 'Rope'), {'market_price_sketch': 'PRIMARY'}),
+    (market_repository.SELECT_PRICE_OBSERVATIONS, (), None),
+    (market_repository.DELETE_ALL_MARKET_DAYS, (), None),
+    (market_repository.DELETE_ALL_MARKET_SKETCHES, (), None),
+    (version_repository.SELECT_TABLE_VERSIONS, (), None),
+    (version_repository.BUMP_TABLE_VERSION, (0, 'store'), {'table_versions': 'PRIMARY'}),
+]
+
+# Statements EXPLAIN cannot describe
+NOT_EXPLAINABLE = set()
+
+
+def repository_statements():
+    for module in REPOSITORIES:
+        for name, value in vars(module).items():
+            if name.isupper() and isinstance(value, str) and value.split()[0].upper() in (
+                    'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'ALTER'):
+                yield f"{module.__name__}.{name}", value
+
+def test_every_repository_query_has_a_plan_case():
+    covered = {sql for sql, _, _ in QUERY_PLANS} | NOT_EXPLAINABLE
+    # Templates with {column}/{placeholders} are covered through their formatted form
+    missing = [name for name, sql in repository_statements()
+               if sql not in covered and '{' not in sql]
+    assert missing == []
+
+
+CHAIN_TYPES = ('Rope', 'Cuban', 'Figaro', 'Franco', 'Box', 'Snake', 'Wheat', 'Herringbone', 'Curb', 'Byzantine')
+USERS, OWNERS, STORES, PRODUCTS, PURCHASES, RATINGS = 2000, 200, 1000, 20000, 20000, 20000
+MARKET_DAYS = 730
+
+def _insert(cursor, table, columns, rows, chunk=1000):
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    for start in range(0, len(rows), chunk):
+        cursor.executemany(sql, rows[start:start + chunk])
+
+def seed(cursor):
+    """Fill the tables the plans read so the optimizer costs real row counts.
+
+    Every row the sample parameters point at exists (storeID 1, productID 1,
+    the 2025-01-01 Rope/14K/Yellow market day and so on); otherwise MySQL
+    answers unique lookups with "no matching row in const table" and plans
+    nothing.
+    """
+    rng = random.Random(0)
+    start = date(2025, 1, 1)
+    _insert(cursor, 'users', ('userID', 'first_name', 'last_name', 'email', 'user_password'),
+            [(i, 'First', 'Last', 'a@b.c' if i == 1 else f'user{i}@example.com', 'pw') for i in range(1, USERS + 1)])
+    _insert(cursor, 'store_owners', ('ownerID', 'userID'), [(i, i) for i in range(1, OWNERS + 1)])
+    _insert(cursor, 'subscriptions', ('subscriptionID', 'ownerID', 'start_date', 'end_date', 'join_fee'),
+            [(i, 1 + i % OWNERS, start - timedelta(days=30 * (i // OWNERS)),
+              start - timedelta(days=30 * (i // OWNERS) - 30), 10) for i in range(1, 2 * OWNERS + 1)])
+    _insert(cursor, 'store', ('storeID', 'ownerID', 'store_name', 'rating', 'address', 'latitude', 'longitude',
+                              'phone', 'email'),
+            [(i, 1 + i % OWNERS, f'Store {i}', round(rng.uniform(1, 5), 2), f'{i} Main St',
+              40.5 + rng.random() * 0.5, -74.3 + rng.random() * 0.6, '555', f'store{i}@example.com')
+             for i in range(1, STORES + 1)])
+    _insert(cursor, 'store_hours', ('storeHourID', 'storeID', 'daysOpen', 'openTime', 'closeTime'),
+            [(7 * (store_id - 1) + n + 1, store_id, day, '10:00', '19:00')
+             for store_id in range(1, STORES + 1) for n, day in enumerate(store_repository.DAYS_OF_WEEK)])
+
+    products = []
+    for i in range(1, PRODUCTS + 1):
+        weight, price = rng.randint(5, 80), rng.randint(200, 5000)
+        products.append((i, 1 + (i - 1) % STORES, CHAIN_TYPES[i // 7 % len(CHAIN_TYPES)],
+                         ('10K', '14K', '18K')[i % 3], rng.choice((2, 3, 4, 5)), rng.choice((16, 18, 20, 22, 24)),
+                         ('Yellow', 'White', 'Rose')[i % 3], weight, price))
+    _insert(cursor, 'product', ('productID', 'storeID', 'chain_type', 'chain_purity', 'chain_thickness',
+                                'chain_length', 'chain_color', 'chain_weight', 'set_price'), products)
+    _insert(cursor, 'product_deals', ('productID', 'storeID', 'chain_type', 'length_bucket',
+                                      'pure_price_per_gram', 'score'),
+            [(p[0], p[1], p[2], p[5], p[8] / p[7], p[8] / p[7] * rng.uniform(0.9, 1.1)) for p in products])
+
+    # Purchase i is user (i mod USERS), product (7i mod PRODUCTS): no two share a (user, product, day)
+    purchases = []
+    for i in range(PURCHASES):
+        product = products[7 * i % PRODUCTS]
+        day = start + timedelta(days=i % 365)
+        price = product[8] * rng.uniform(0.9, 1.1)
+        purchases.append((i + 1, 1 + i % USERS, product[0], product[1], round(price, 2),
+                          datetime.combine(day, datetime.min.time()) + timedelta(hours=10), day, price / product[7]))
+    _insert(cursor, 'price_history', ('historyID', 'userID', 'productID', 'storeID', 'latest_price',
+                                      'purchase_date', 'purchase_day', 'indexed_ppg'), purchases)
+    _insert(cursor, 'user_update', ('updateID', 'userID', 'productID', 'storeID', 'rating'),
+            [(i + 1, 1 + i % USERS, i + 1, 1 + i % STORES, 1 + i % 5) for i in range(RATINGS)])
+    _insert(cursor, 'store_rating_stats', ('storeID', 'rating_sum', 'rating_count', 'count_1', 'count_2',
+                                           'count_3', 'count_4', 'count_5'),
+            [(i, 60, 20, 4, 4, 4, 4, 4) for i in range(1, STORES + 1)])
+
+    store_types = sorted({(p[1], p[2]) for p in products})
+    _insert(cursor, 'store_leaderboard', ('board', 'board_key', 'storeID', 'score'),
+            [('all', '', i, rng.random()) for i in range(1, STORES + 1)]
+            + [('type', chain_type, store_id, rng.random()) for store_id, chain_type in store_types])
+
+    segments = [(t, purity, color) for t in CHAIN_TYPES for purity in ('14K', '18K') for color in ('Yellow', 'White')]
+    days = [start - timedelta(days=MARKET_DAYS // 2) + timedelta(days=n) for n in range(MARKET_DAYS)]
+    _insert(cursor, 'market_price_daily', ('day', 'chain_type', 'chain_purity', 'chain_color', 'observations',
+                                           'total_ppg', 'min_ppg', 'max_ppg'),
+            [(day, *segment, 2, 140.0, 60.0, 80.0) for day in days for segment in segments])
+    _insert(cursor, 'market_price_sketch', ('day', 'bucket', 'chain_type', 'chain_purity', 'chain_color',
+                                            'observations'),
+            [(day, bucket, *segment, 1) for day in days for segment in segments for bucket in (213, 220)])
+
+SEEDED_TABLES = ('users', 'store_owners', 'subscriptions', 'store', 'store_hours', 'product', 'product_deals',
+                 'price_history', 'user_update', 'store_rating_stats', 'store_leaderboard',
+                 'market_price_daily', 'market_price_sketch')
+
+
+@pytest.fixture(scope='module')
+def cursor():
+    from db import _connect, _uses_sqlite
+    if _uses_sqlite():
+        pytest.skip("Query plans are checked against MySQL only")
+    try:
+        connection = _connect()
+    except Exception as e:
+        pytest.skip(f"MySQL not available: {e}")
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    for table in SEEDED_TABLES:
+        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+        if cursor.fetchone():
+            cursor.close()
+            connection.close()
+            pytest.skip(f"Query plans need an empty migrated database; {table} has rows")
+    try:
+        seed(cursor)
+        connection.commit()
+        # Fresh statistics, or the optimizer still costs the tables as empty
+        cursor.execute(f"ANALYZE TABLE {', '.join(SEEDED_TABLES)}")
+        cursor.fetchall()
+        yield cursor
+    finally:
+        connection.rollback()
+        for table in reversed(SEEDED_TABLES):
+            cursor.execute(f"DELETE FROM {table}")
+        connection.commit()
+        cursor.close()
+        connection.close()
+
+@pytest.mark.parametrize('sql,params,keys', QUERY_PLANS)
+def test_query_plan(cursor, sql, params, keys):
+    cursor.execute('EXPLAIN ' + sql, params or None)
+    plan = cursor.fetchall()
+    assert plan, "EXPLAIN returned no rows"
+    if keys is None:
+        return
+    used = {}
+    for row in plan:
+        extra = row.get('Extra') or ''
+        if row.get('table') is None:
+            # Only MIN()/MAX() answered from an index may leave the table out;
+            # anything else ("Impossible WHERE", "no matching row") planned nothing
+            assert 'Select tables optimized away' in extra, f"No table access planned: {row}"
+            continue
+        if str(row['table']).startswith('<'):
+            # Derived and union tables have no access path of their own
+            continue
+        assert row['type'] != 'ALL', f"Full table scan on {row['table']}: {row}"
+        assert 'Using filesort' not in extra, f"Filesort on {row['table']}: {row}"
+        used[row['table']] = row['key']
+    assert used.keys() == keys.keys(), f"Plan reads {sorted(used)}, expected {sorted(keys)}: {plan}"
+    for table, key in used.items():
+        expected = keys[table] if isinstance(keys[table], tuple) else (keys[table],)
+        assert key in expected, f"{table} is read through {key}, expected {' or '.join(expected)}: {plan}"
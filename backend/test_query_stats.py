@@ -0,0 +1,26 @@
+import logging
+from utils.query_stats import InstrumentedCursor, QueryRecorder, normalize_sql
+
+class FakeCursor:
+    rowcount = 1
+
+    def execute(self, sql, args=None):
+        pass
+
+def test_normalize_sql_collapses_literals_and_lists():
+    assert normalize_sql("SELECT *\n  FROM product WHERE productID IN (%s, %s, %s) AND chain_color = 'Rose' LIMIT 5") == \
+        "SELECT * FROM product WHERE productID IN (...) AND chain_color = ? LIMIT ?"
+    assert normalize_sql("INSERT INTO t (a, b) VALUES (1, 2), (3, 4)") == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+
+def test_repeated_statement_is_flagged_as_n_plus_one(caplog):
+    recorder = QueryRecorder(label='GET /api/products', n_plus_one_threshold=3)
+    cursor = InstrumentedCursor(FakeCursor(), recorder)
+
+    with caplog.at_level(logging.WARNING):
+        for product_id in range(4):
+            cursor.execute("SELECT * FROM price_history WHERE productID = %s", (product_id,))
+
+    assert len(recorder.queries) == 4
+    assert recorder.repeated_shapes == ["SELECT * FROM price_history WHERE productID = ?"]
+    assert sum('Possible N+1' in r.message for r in caplog.records) == 1
+    assert recorder.server_timing().startswith('db;dur=')
@@ -1,5 +1,6 @@
 from controllers.store_controller import StoreController
 from db import get_db_connection
+from repositories import rating_repository
 import pymysql
 import logging
 
@@ -12,10 +13,7 @@ def insert_test_rating(storeID: int, userID: int, productID: int, rating: int):
     
     try:
         # Insert test rating
-        cursor.execute("""
-            INSERT INTO user_update (userID, productID, storeID, rating)
-            VALUES (%s, %s, %s, %s)
-        """, (userID, productID, storeID, rating))
+        rating_repository.insert_rating(cursor, userID, productID, storeID, rating)
         
         connection.commit()
         logger.info(f"Inserted test rating: {rating} for store {storeID}")
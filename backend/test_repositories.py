@@ -0,0 +1,61 @@
+from repositories import product_repository, rating_repository, store_repository
+
+class RecordingCursor:
+    def __init__(self, lastrowid=None):
+        self.calls = []
+        self.lastrowid = lastrowid
+
+    def execute(self, sql, params=None):
+        self.calls.append(('execute', sql, params))
+
+    def executemany(self, sql, rows):
+        self.calls.append(('executemany', sql, rows))
+
+def test_store_hours_are_written_in_one_batch():
+    cursor = RecordingCursor()
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    hours = [{'daysOpen': day, 'openTime': '10:00', 'closeTime': '19:00'} for day in days]
+
+    store_repository.replace_store_hours(cursor, 7, hours)
+
+    assert [call[0] for call in cursor.calls] == ['execute', 'executemany']
+    assert len(cursor.calls[1][2]) == 7
+    assert cursor.calls[1][2][0] == (7, 'Monday', '10:00', '19:00')
+
+def test_batch_product_insert_maps_ids_by_batch_key():
+    class BatchCursor(RecordingCursor):
+        def fetchall(self):
+            # ids interleaved with another writer, rows in no particular order
+            keys = [row[-1] for row in self.calls[0][2]]
+            return [{'productID': 55, 'batch_key': keys[2]}, {'productID': 45, 'batch_key': keys[0]},
+                    {'productID': 50, 'batch_key': keys[1]}]
+
+    cursor = BatchCursor()
+    product = {'storeID': 1, 'chain_type': 'Rope', 'chain_purity': '14K', 'chain_thickness': 3,
+               'chain_length': 20, 'chain_color': 'Yellow', 'chain_weight': 12.5, 'set_price': 900}
+
+    ids = product_repository.insert_products(cursor, [product] * 3)
+
+    assert ids == [45, 50, 55]
+    assert [call[0] for call in cursor.calls] == ['executemany', 'execute']
+    assert len(cursor.calls[0][2]) == 3
+    assert len({row[-1] for row in cursor.calls[0][2]}) == 3
+
+def test_batch_store_insert_maps_ids_by_batch_key():
+    class BatchCursor(RecordingCursor):
+        def fetchall(self):
+            keys = [row[-1] for row in self.calls[0][2]]
+            return [{'storeID': 9, 'batch_key': keys[1]}, {'storeID': 3, 'batch_key': keys[0]}]
+
+    cursor = BatchCursor()
+    store = {'ownerID': 1, 'store_name': 'Branch', 'address': '1 Main St', 'latitude': 40.7,
+             'longitude': -74.0, 'phone': '555', 'email': 'b@x.com'}
+
+    assert store_repository.insert_stores(cursor, [store, store]) == [3, 9]
+    assert [call[0] for call in cursor.calls] == ['executemany', 'execute']
+
+def test_rating_delta_moves_a_changed_rating_between_buckets():
+    assert rating_repository.rating_delta(None, 4) == {
+        'rating_sum': 4, 'rating_count': 1, 'count_1': 0, 'count_2': 0, 'count_3': 0, 'count_4': 1, 'count_5': 0}
+    assert rating_repository.rating_delta(2, 5) == {
+        'rating_sum': 3, 'rating_count': 0, 'count_1': 0, 'count_2': -1, 'count_3': 0, 'count_4': 0, 'count_5': 1}
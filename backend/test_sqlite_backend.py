@@ -0,0 +1,27 @@
+from utils import sqlite_backend
+
+def test_translate_mysql_dialect():
+    assert sqlite_backend.translate(
+        "INSERT INTO t (a, b) VALUES (%s, %s) ON DUPLICATE KEY UPDATE b = b + VALUES(b)"
+    ) == "INSERT INTO t (a, b) VALUES (?, ?) ON CONFLICT DO UPDATE SET b = b + excluded.b"
+    assert sqlite_backend.translate("SELECT TIME_FORMAT(t, '%%h:%%i %%p') FROM x WHERE id = %s FOR UPDATE") == \
+        "SELECT TIME_FORMAT(t, '%h:%i %p') FROM x WHERE id = ?"
+    assert sqlite_backend.translate("ALTER TABLE price_history AUTO_INCREMENT = 1") == ''
+
+def test_mysql_functions_and_batch_insert():
+    sqlite_backend.drop_database(':memory:')
+    connection = sqlite_backend.connect(':memory:')
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE t (id INT AUTO_INCREMENT PRIMARY KEY, day ENUM('Monday', 'Sunday'), opens TIME)")
+    cursor.executemany("INSERT INTO t (day, opens) VALUES (%s, %s)", [('Sunday', '09:30:00'), ('Monday', '18:05')])
+    assert cursor.lastrowid == 1
+    assert cursor.rowcount == 2
+
+    cursor.execute("""
+        SELECT TIME_FORMAT(opens, '%%h:%%i %%p') AS opens, DATE('2025-03-01 12:00:00') AS day
+        FROM t ORDER BY FIELD(day, 'Monday', 'Sunday')
+    """)
+    assert cursor.fetchall() == [{'opens': '06:05 PM', 'day': '2025-03-01'},
+                                 {'opens': '09:30 AM', 'day': '2025-03-01'}]
+    connection.close()
+    sqlite_backend.drop_database(':memory:')
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip('numpy')
+from utils.trigram_index import TrigramIndex, trigrams
+
+STORES = [(1, 'Canal Street Gold', '12 Canal St, New York'),
+          (2, 'Golden Chain Co', '480 Fulton St, Brooklyn'),
+          (3, 'Harbor Jewelers', '7 Harbor Way, Canal Point')]
+
+def test_trigrams_fold_case_and_accents():
+    assert trigrams('Café!') == trigrams('cafe')
+    assert trigrams('') == frozenset()
+
+def test_search_tolerates_typos_and_weights_fields():
+    index = TrigramIndex(weights=(1.0, 0.9))
+    index.rebuild(STORES)
+    assert index.search('golden chian', threshold=0.5)[0][1] == 2
+    # A name match outranks the same words in an address
+    assert [key for _, key in index.search('canal', threshold=0.5)] == [1, 3]
+    assert index.search('zzzz') == []
+
+def test_writes_after_rebuild_are_searchable():
+    index = TrigramIndex(weights=(1.0, 0.9))
+    index.rebuild(STORES)
+    index.upsert(2, 'Fulton Bullion', '480 Fulton St, Brooklyn')
+    index.upsert(4, 'Canal Coins', '1 Mott St')
+    index.remove(3)
+    assert [key for _, key in index.search('golden chain', threshold=0.5)] == []
+    assert [key for _, key in index.search('canal', threshold=0.5)] == [1, 4]
+    assert [key for _, key in index.search('canal', threshold=0.5, accept=lambda key: key != 1)] == [4]
+    assert len(index) == 3
@@ -0,0 +1,54 @@
+import argparse
+import logging
+import time
+import pymysql
+from config import Config
+from db import _connect
+from repositories import product_repository
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def trim(connection, keep: int = Config.PRICE_HISTORY_KEEP, batch: int = Config.PRICE_HISTORY_TRIM_BATCH,
+         pause: float = 0.0) -> int:
+    """Delete price_history entries past the newest `keep` of each product. Returns rows deleted.
+
+    Walks productIDs in ranges of `batch`, committing each range on its own
+    so no transaction holds more than a few row locks at a time.
+    """
+    cursor = connection.cursor(pymysql.cursors.DictCursor)
+    deleted = 0
+    try:
+        first_id, last_id = product_repository.get_price_history_product_bounds(cursor)
+        connection.commit()
+        if first_id is None:
+            return 0
+        for start in range(first_id, last_id + 1, batch):
+            try:
+                expired = product_repository.get_expired_price_ids(cursor, start, start + batch, keep)
+                product_repository.delete_price_entries(cursor, expired)
+                connection.commit()
+                deleted += len(expired)
+            except Exception as e:
+                logger.error(f"Trimming price history for productIDs {start}-{start + batch - 1} failed: {e}")
+                connection.rollback()
+                raise
+            if pause:
+                time.sleep(pause)
+        return deleted
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trim price_history to the newest entries per product")
+    parser.add_argument('--keep', type=int, default=Config.PRICE_HISTORY_KEEP)
+    parser.add_argument('--batch', type=int, default=Config.PRICE_HISTORY_TRIM_BATCH,
+                        help="productIDs per transaction")
+    parser.add_argument('--pause', type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    connection = _connect()
+    try:
+        print(f"Deleted {trim(connection, args.keep, args.batch, args.pause)} price history row(s)")
+    finally:
+        connection.close()
@@ -0,0 +1,133 @@
+import logging
+import math
+import threading
+import time
+from flask import g, jsonify, request
+from config import Config
+from utils.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class Lane:
+    """Caps concurrent requests, with a short bounded queue in front.
+
+    A request beyond limit waits up to timeout seconds for a slot, unless
+    queue requests are already waiting, in which case it is refused at once.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._rejected = 0
+
+    def acquire(self) -> bool:
+        with self._cond:
+            if self._in_flight < self.limit and not self._waiting:
+                self._in_flight += 1
+                return True
+            if self._waiting >= self.queue:
+                self._rejected += 1
+                return False
+            self._waiting += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                while self._in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if self._in_flight >= self.limit:
+                            self._rejected += 1
+                            return False
+                self._in_flight += 1
+                return True
+            finally:
+                self._waiting -= 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {'limit': self.limit, 'in_flight': self._in_flight, 'waiting': self._waiting,
+                    'queue': self.queue, 'rejected': self._rejected}
+
+
+# Reads and writes queue separately, so a burst of GETs cannot hold every
+# database connection while purchase and rating submissions wait
+_lanes = {}
+_lanes_lock = threading.Lock()
+_limiter = RateLimiter(max_keys=Config.RATE_LIMIT_MAX_CLIENTS)
+
+def get_lane(name: str) -> Lane:
+    with _lanes_lock:
+        lane = _lanes.get(name)
+        if lane is None:
+            limit = Config.ADMISSION_WRITE_CONCURRENCY if name == 'write' else Config.ADMISSION_READ_CONCURRENCY
+            lane = _lanes[name] = Lane(name, limit, Config.ADMISSION_QUEUE_SIZE, Config.ADMISSION_QUEUE_TIMEOUT)
+        return lane
+
+def reset() -> None:
+    """Forget lanes and rate-limit state, e.g. after changing the limits in Config."""
+    with _lanes_lock:
+        _lanes.clear()
+    _limiter.clear()
+
+def stats() -> dict:
+    with _lanes_lock:
+        lanes = list(_lanes.values())
+    return {lane.name: lane.stats() for lane in lanes}
+
+def client_key() -> str:
+    """The client's address as seen by the outermost of RATE_LIMIT_TRUSTED_PROXIES proxies."""
+    hops = Config.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+    if hops > 0 and forwarded:
+        # With fewer entries than proxies, the leftmost was still appended by one of them
+        return forwarded[-min(hops, len(forwarded))]
+    return request.remote_addr or 'unknown'
+
+def _shed(status: int, message: str, retry_after: float):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def _admit():
+    if not Config.ADMISSION_ENABLED or request.method == 'OPTIONS' or request.endpoint in Config.ADMISSION_EXEMPT:
+        return None
+
+    # Rate limits: one bucket per client, and one per client and route for
+    # the routes that have their own limit (such as login)
+    client = client_key()
+    wait = _limiter.check(client, *Config.RATE_LIMIT_DEFAULT)
+    route_limit = Config.RATE_LIMIT_ROUTES.get(request.endpoint)
+    if not wait and route_limit is not None:
+        wait = _limiter.check((client, request.endpoint), *route_limit)
+    if wait:
+        return _shed(429, 'Too many requests', wait)
+
+    if request.endpoint is None:
+        return None
+    lane = get_lane('read' if request.method in ('GET', 'HEAD') else 'write')
+    if not lane.acquire():
+        logger.warning(f"Shedding {request.method} {request.path}: {lane.name} lane is full")
+        return _shed(503, 'Server is busy, try again shortly', Config.ADMISSION_RETRY_AFTER)
+    g.admission_lane = lane
+    return None
+
+def _release(exc=None):
+    lane = g.pop('admission_lane', None)
+    if lane is not None:
+        lane.release()
+
+def init_app(app):
+    """Rate-limit and admit each request before it does any work; register before other hooks."""
+    app.before_request(_admit)
+    app.teardown_request(_release)
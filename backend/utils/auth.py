@@ -0,0 +1,64 @@
+from functools import wraps
+from typing import Optional
+from flask import g, jsonify, request
+from config import Config
+from indexes import user_roles
+from utils import tokens
+
+def _load_identity():
+    """Read the Bearer token, if any; the signature and cache checks need no query."""
+    g.identity, g.auth_error = None, None
+    header = request.headers.get('Authorization')
+    if not header:
+        return
+    scheme, _, token = header.partition(' ')
+    claims = tokens.verify(token.strip()) if scheme.lower() == 'bearer' else None
+    if claims is None or not isinstance(claims.get('userID'), int):
+        g.auth_error = 'Invalid or expired token'
+        return
+    # A role change seen by this process outranks the claims the token was issued with
+    g.identity = user_roles.get(claims['userID']) or user_roles.identity(claims['userID'], claims.get('ownerID'))
+
+def init_app(app):
+    app.before_request(_load_identity)
+
+def current_identity() -> Optional[dict]:
+    """{'userID', 'role', 'ownerID'} of the caller, or None for an anonymous request."""
+    return getattr(g, 'identity', None)
+
+def issue_token(identity: dict) -> dict:
+    """Login response fields for a new access token."""
+    claims = {key: identity[key] for key in ('userID', 'role', 'ownerID')}
+    return {'token': tokens.issue(claims), 'expires_in': Config.AUTH_TOKEN_TTL_SECONDS}
+
+def acting_as(user_id) -> bool:
+    """Whether the caller may act for user_id: anonymous callers (when allowed) or that user."""
+    identity = current_identity()
+    return identity is None or str(identity['userID']) == str(user_id)
+
+def owns(owner_id) -> bool:
+    """Whether the caller may manage owner_id's stores: anonymous callers (when allowed) or that owner."""
+    identity = current_identity()
+    return identity is None or (identity['ownerID'] is not None and str(identity['ownerID']) == str(owner_id))
+
+def require_auth(*roles: str, self_arg: Optional[str] = None):
+    """Reject bad tokens, and callers without one of roles or who are not the user in URL argument self_arg.
+
+    Anonymous callers are let through unless AUTH_REQUIRED is on, so
+    clients can move to tokens before it is enforced.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            error = getattr(g, 'auth_error', None)
+            identity = current_identity()
+            if error or (identity is None and Config.AUTH_REQUIRED):
+                return jsonify({'error': error or 'Authentication required'}), 401, {'WWW-Authenticate': 'Bearer'}
+            if identity is not None:
+                if roles and identity['role'] not in roles:
+                    return jsonify({'error': 'Not allowed for this account'}), 403
+                if self_arg is not None and kwargs.get(self_arg) != identity['userID']:
+                    return jsonify({'error': 'Not allowed for this account'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
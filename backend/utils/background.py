@@ -0,0 +1,53 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Follow-up work that should not hold up the response, such as refreshing
+# tables derived from a committed write. It runs on a small pool. Once
+# BACKGROUND_QUEUE tasks are waiting, new ones are dropped and logged, and the
+# batch rebuild scripts repair whatever they would have done. With
+# BACKGROUND_WORKERS = 0 tasks run inline in the caller.
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+def _call(fn, args):
+    try:
+        fn(*args)
+    except Exception as e:
+        logger.error(f"Background task {getattr(fn, '__name__', fn)} failed: {e}")
+
+def _run(fn, args):
+    try:
+        _call(fn, args)
+    finally:
+        _slots.release()
+
+def submit(fn, *args) -> bool:
+    """Run fn(*args) on a background worker. Returns False if the queue was full and it was dropped."""
+    global _executor, _slots
+    if Config.BACKGROUND_WORKERS <= 0:
+        _call(fn, args)
+        return True
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _slots = threading.BoundedSemaphore(Config.BACKGROUND_WORKERS + Config.BACKGROUND_QUEUE)
+                _executor = ThreadPoolExecutor(max_workers=Config.BACKGROUND_WORKERS,
+                                               thread_name_prefix='background')
+    if not _slots.acquire(blocking=False):
+        logger.warning(f"Background queue full, dropped {getattr(fn, '__name__', fn)}")
+        return False
+    _executor.submit(_run, fn, args)
+    return True
+
+def shutdown(wait: bool = True) -> None:
+    """Finish (or with wait=False, abandon) queued tasks; the pool is rebuilt from Config on next use."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,371 @@
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+FACET_COLUMNS = ('chain_type', 'chain_purity', 'chain_thickness', 'chain_length', 'chain_color')
+NUMERIC_FACETS = ('chain_thickness', 'chain_length')
+NUMERIC_COLUMNS = ('chain_weight', 'set_price')
+SORT_COLUMNS = ('productID', 'set_price')
+
+# Range filter name -> (column, operator), as accepted by the SQL search
+RANGE_FILTERS = {
+    'min_price': ('set_price', '>='),
+    'max_price': ('set_price', '<='),
+    'min_weight': ('chain_weight', '>='),
+    'max_weight': ('chain_weight', '<='),
+}
+
+SCAN_CHUNK = 4096
+
+
+def facet_key(value) -> str:
+    """Dictionary key for a facet value: strings as-is, numbers without trailing zeros."""
+    return value if isinstance(value, str) else format(float(value), 'g')
+
+def _popcount(packed: np.ndarray) -> int:
+    return int(np.bitwise_count(packed).sum())
+
+
+class ColumnarCatalog:
+    """Product attributes held as NumPy column arrays for vectorised filtering.
+
+    Every facet attribute is dictionary-encoded to small integer codes.
+    Filters work on packed bitmaps (one bit per row): a bitmap per facet
+    value is derived lazily and cached until the next write, so a facet
+    filter is a handful of ANDs/ORs over size/8 bytes and a facet count is a
+    popcount. Sort orders are cached too and patched row by row on write.
+    Rows are appended or updated in place; deletes clear the row's live flag
+    until the next rebuild compacts.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._reset(capacity)
+
+    def _reset(self, capacity: int):
+        self._size = 0
+        self._positions: Dict[int, int] = {}
+        self._store_positions: Dict[int, set] = {}
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._store_ids = np.zeros(capacity, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._codes = {column: np.zeros(capacity, dtype=np.uint8) for column in FACET_COLUMNS}
+        self._values = {column: np.zeros(capacity, dtype=np.float64) for column in NUMERIC_COLUMNS}
+        self._dictionaries: Dict[str, List[str]] = {column: [] for column in FACET_COLUMNS}
+        self._lookups: Dict[str, Dict[str, int]] = {column: {} for column in FACET_COLUMNS}
+        self._derived = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    # Writes
+
+    def _encode(self, column: str, value) -> int:
+        key = facet_key(value)
+        code = self._lookups[column].get(key)
+        if code is None:
+            code = self._lookups[column][key] = len(self._dictionaries[column])
+            self._dictionaries[column].append(key)
+            # Widen the code array only when the dictionary outgrows it
+            if code > np.iinfo(self._codes[column].dtype).max:
+                wider = np.uint16 if code <= np.iinfo(np.uint16).max else np.int32
+                self._codes[column] = self._codes[column].astype(wider)
+        return code
+
+    def _ensure_capacity(self, needed: int):
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        self._ids = np.resize(self._ids, capacity)
+        self._store_ids = np.resize(self._store_ids, capacity)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+        for columns in (self._codes, self._values):
+            for column in columns:
+                columns[column] = np.resize(columns[column], capacity)
+
+    def upsert(self, row: dict) -> None:
+        with self._lock:
+            product_id = row['productID']
+            position = self._positions.get(product_id)
+            if position is None:
+                self._ensure_capacity(self._size + 1)
+                position = self._positions[product_id] = self._size
+                self._size += 1
+                previous = None
+            else:
+                self._store_positions.get(int(self._store_ids[position]), set()).discard(position)
+                previous = self._order_indexes(position)
+            self._ids[position] = product_id
+            self._store_ids[position] = row['storeID']
+            self._store_positions.setdefault(int(row['storeID']), set()).add(position)
+            self._alive[position] = True
+            for column in FACET_COLUMNS:
+                code = self._encode(column, row[column])
+                self._codes[column][position] = code
+            for column in NUMERIC_COLUMNS:
+                self._values[column][position] = float(row[column])
+            self._drop_bitmaps()
+            if previous is None:
+                self._sort_in(position)
+            else:
+                self._resort(position, previous)
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            position = self._positions.pop(product_id, None)
+            if position is not None:
+                self._unsort(self._order_indexes(position))
+                self._alive[position] = False
+                self._store_positions.get(int(self._store_ids[position]), set()).discard(position)
+                self._drop_bitmaps()
+
+    def rebuild(self, rows: Sequence[dict]) -> None:
+        """Replace the contents with rows, building each column in one pass."""
+        count = len(rows)
+        with self._lock:
+            self._reset(max(count, 1024))
+            if not count:
+                return
+            self._ids[:count] = np.fromiter((row['productID'] for row in rows), np.int64, count)
+            self._store_ids[:count] = np.fromiter((row['storeID'] for row in rows), np.int64, count)
+            for column in FACET_COLUMNS:
+                codes = [self._encode(column, row[column]) for row in rows]
+                self._codes[column][:count] = np.asarray(codes, dtype=self._codes[column].dtype)
+            for column in NUMERIC_COLUMNS:
+                self._values[column][:count] = np.fromiter((float(row[column]) for row in rows), np.float64, count)
+            self._alive[:count] = True
+            self._size = count
+            self._positions = {int(product_id): position for position, product_id in enumerate(self._ids[:count])}
+            if len(self._positions) != count:
+                # Duplicate IDs: fall back to upserts so the last row wins
+                self.rebuild([])
+                for row in rows:
+                    self.upsert(row)
+                return
+            for position, store_id in enumerate(self._store_ids[:count].tolist()):
+                self._store_positions.setdefault(store_id, set()).add(position)
+
+    # Derived structures, built on first use. Bitmaps are cheap to rebuild
+    # and are dropped on every write; sort orders are patched in place.
+
+    def _cached(self, key, build):
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived[key] = build()
+        return value
+
+    def _drop_bitmaps(self):
+        self._derived = {key: value for key, value in self._derived.items() if key[0] == 'order'}
+
+    def _bitmap(self, column: str, code: int) -> np.ndarray:
+        return self._cached(('bitmap', column, code), lambda: np.packbits(self._codes[column][:self._size] == code))
+
+    def _alive_bitmap(self) -> np.ndarray:
+        return self._cached(('alive',), lambda: np.packbits(self._alive[:self._size]))
+
+    def _sort_key(self, column: str) -> np.ndarray:
+        return self._ids[:self._size] if column == 'productID' else self._values[column][:self._size]
+
+    def _order(self, column: str):
+        """(positions, keys, ids) of live rows sorted by (column, productID)."""
+        def build():
+            live = np.flatnonzero(self._alive[:self._size])
+            ids, keys = self._ids[live], self._sort_key(column)[live]
+            order = live[np.lexsort((ids, keys))]
+            return order, self._sort_key(column)[order], self._ids[order]
+        return self._cached(('order', column), build)
+
+    @staticmethod
+    def _locate(keys: np.ndarray, ids: np.ndarray, value, product_id) -> int:
+        """Index of (value, product_id) in a cached order, or where it would go."""
+        low = int(np.searchsorted(keys, value, side='left'))
+        high = int(np.searchsorted(keys, value, side='right'))
+        return low + int(np.searchsorted(ids[low:high], product_id))
+
+    def _order_indexes(self, position: int) -> Dict[tuple, int]:
+        """Where a live row currently sits in each cached sort order."""
+        product_id = self._ids[position]
+        return {key: self._locate(value[1], value[2], self._sort_key(key[1])[position], product_id)
+                for key, value in self._derived.items() if key[0] == 'order'}
+
+    def _unsort(self, indexes: Dict[tuple, int]):
+        for key, index in indexes.items():
+            self._derived[key] = tuple(np.delete(array, index) for array in self._derived[key])
+
+    def _sort_in(self, position: int):
+        product_id = self._ids[position]
+        for key in [key for key in self._derived if key[0] == 'order']:
+            order, keys, ids = self._derived[key]
+            value = self._sort_key(key[1])[position]
+            index = self._locate(keys, ids, value, product_id)
+            self._derived[key] = (np.insert(order, index, position), np.insert(keys, index, value),
+                                  np.insert(ids, index, product_id))
+
+    def _resort(self, position: int, previous: Dict[tuple, int]):
+        """Move an updated row to its new place, shifting only the rows in between."""
+        product_id = self._ids[position]
+        for key, old in previous.items():
+            order, keys, ids = self._derived[key]
+            value = self._sort_key(key[1])[position]
+            # Search the order as if the row were not in it: both sides of its slot are still sorted
+            new = self._locate(keys[:old], ids[:old], value, product_id)
+            if new == old:
+                new += self._locate(keys[old + 1:], ids[old + 1:], value, product_id)
+            if new > old:
+                for array in (order, keys, ids):
+                    array[old:new] = array[old + 1:new + 1].copy()
+            elif new < old:
+                for array in (order, keys, ids):
+                    array[new + 1:old + 1] = array[new:old].copy()
+            order[new], keys[new], ids[new] = position, value, product_id
+
+    # Filtering
+
+    def _code(self, column: str, value) -> Optional[int]:
+        code = self._lookups[column].get(facet_key(value))
+        if code is None and column in NUMERIC_FACETS:
+            # Numeric facets may be asked for as strings such as '3.0'
+            try:
+                code = self._lookups[column].get(facet_key(float(value)))
+            except ValueError:
+                pass
+        return code
+
+    def _facet_bitmap(self, column: str, values) -> np.ndarray:
+        result = np.zeros((self._size + 7) // 8, dtype=np.uint8)
+        for value in values:
+            code = self._code(column, value)
+            if code is not None:
+                result |= self._bitmap(column, code)
+        return result
+
+    def _filter_bitmaps(self, filters: dict):
+        """Packed bitmap of the non-facet conditions, and one per filtered facet."""
+        base = self._alive_bitmap().copy()
+        for name, (column, operator) in RANGE_FILTERS.items():
+            bound = filters.get(name)
+            if bound is not None:
+                values = self._values[column][:self._size]
+                base &= np.packbits(values >= float(bound) if operator == '>=' else values <= float(bound))
+        store_ids = filters.get('store_ids')
+        if store_ids is not None:
+            rows = np.zeros(self._size, dtype=bool)
+            positions = [p for store_id in store_ids for p in self._store_positions.get(int(store_id), ())]
+            rows[np.asarray(positions, dtype=np.int64)] = True
+            base &= np.packbits(rows)
+        facets = {column: self._facet_bitmap(column, filters[column])
+                  for column in FACET_COLUMNS if filters.get(column)}
+        return base, facets
+
+    def _match_bitmap(self, filters: dict) -> np.ndarray:
+        base, facets = self._filter_bitmaps(filters)
+        for bitmap in facets.values():
+            base &= bitmap
+        return base
+
+    def mask(self, filters: dict) -> np.ndarray:
+        """Boolean array over rows matching filters."""
+        with self._lock:
+            return np.unpackbits(self._match_bitmap(filters), count=self._size).view(bool)
+
+    def count(self, filters: dict) -> int:
+        with self._lock:
+            return _popcount(self._match_bitmap(filters))
+
+    def facets(self, filters: dict) -> dict:
+        """Counts per value of each facet column; each facet ignores its own filter."""
+        with self._lock:
+            base, bitmaps = self._filter_bitmaps(filters)
+            result = {}
+            for column in FACET_COLUMNS:
+                scope = base.copy()
+                for other, bitmap in bitmaps.items():
+                    if other != column:
+                        scope &= bitmap
+                counts = {}
+                for code, value in enumerate(self._dictionaries[column]):
+                    n = _popcount(scope & self._bitmap(column, code))
+                    if n:
+                        counts[value] = n
+                result[column] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+            return result
+
+    def search(self, filters: dict, limit: int, sort_column: str = 'productID',
+               descending: bool = False, after: Optional[tuple] = None) -> List[int]:
+        """IDs of up to limit + 1 matching products in (sort_column, productID) order after `after`.
+
+        Walks the cached sort order from the cursor position and stops as
+        soon as enough matches are found.
+        """
+        with self._lock:
+            matches = np.unpackbits(self._match_bitmap(filters), count=self._size).view(bool)
+            order, keys, ids = self._order(sort_column)
+            if descending:
+                order, keys, ids = order[::-1], keys[::-1], ids[::-1]
+            start = 0
+            if after is not None:
+                start = self._start_after(keys, ids, sort_column, descending, after)
+
+            wanted, found = limit + 1, []
+            for offset in range(start, len(order), SCAN_CHUNK):
+                chunk = order[offset:offset + SCAN_CHUNK]
+                found.extend(chunk[matches[chunk]][:wanted - len(found)].tolist())
+                if len(found) >= wanted:
+                    break
+            return [int(self._ids[position]) for position in found]
+
+    @staticmethod
+    def _start_after(keys: np.ndarray, ids: np.ndarray, sort_column: str, descending: bool, after: tuple) -> int:
+        """Index in the sort order of the first row after the cursor."""
+        target = (after[-1], after[-1]) if sort_column == 'productID' else (float(after[0]), after[-1])
+        if descending:
+            # Negated, a descending order is ascending and searchsorted applies
+            keys, ids, target = -keys, -ids, (-target[0], -target[1])
+        low = int(np.searchsorted(keys, target[0], side='left'))
+        high = int(np.searchsorted(keys, target[0], side='right'))
+        return low + int(np.searchsorted(ids[low:high], target[1], side='right'))
+
+    # Price statistics
+
+    def price_stats(self, filters: dict, group_by: str,
+                    percentiles: Sequence[float] = (25, 50, 75, 90)) -> Dict[str, dict]:
+        """count/min/max/mean and price percentiles for each value of group_by.
+
+        One sort of the matching rows by (group, price) serves every group:
+        each percentile is read straight from the group's sorted slice.
+        """
+        with self._lock:
+            mask = np.unpackbits(self._match_bitmap(filters), count=self._size).view(bool)
+            prices = self._values['set_price'][:self._size][mask]
+            groups = self._codes[group_by][:self._size][mask]
+            labels = list(self._dictionaries[group_by])
+        if len(prices) == 0:
+            return {}
+
+        order = np.lexsort((prices, groups))
+        prices, groups = prices[order], groups[order]
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        counts = np.diff(np.r_[starts, len(prices)])
+        stats = {
+            'count': counts,
+            'min': prices[starts],
+            'max': prices[starts + counts - 1],
+            'mean': np.add.reduceat(prices, starts) / counts,
+        }
+        for q in percentiles:
+            # Linear interpolation between closest ranks, as numpy.percentile does
+            rank = (counts - 1) * (q / 100.0)
+            low = np.floor(rank).astype(np.int64)
+            high = np.minimum(low + 1, counts - 1)
+            fraction = rank - low
+            stats[f"p{q:g}"] = prices[starts + low] * (1 - fraction) + prices[starts + high] * fraction
+
+        return {
+            labels[groups[start]]: {name: int(values[i]) if name == 'count' else round(float(values[i]), 2)
+                                    for name, values in stats.items()}
+            for i, start in enumerate(starts)
+        }
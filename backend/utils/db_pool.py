@@ -0,0 +1,224 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class PooledConnection:
+    """Connection handed out by the pool; close() returns it instead of closing it."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe bounded pool of DB-API connections.
+
+    min_size connections are opened up front and reopened when failed ones
+    are discarded; more are created lazily up to max_size. Connections are
+    checked for liveness when they have been idle for more than
+    ping_interval seconds and replaced once they are older than max_lifetime
+    seconds.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=10, timeout=5.0,
+                 max_lifetime=3600.0, ping_interval=1.0, reset=None):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size")
+        self._factory = factory
+        self._reset = reset or (lambda raw: raw.rollback())
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()     # (raw, created_at, released_at)
+        self._created_at = {}    # id(raw) -> created_at for checked-out connections
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._opened = 0
+        self._recycled = 0
+        self._discarded = 0
+
+        self._replenish()
+
+    def _open(self):
+        """Open a connection for a slot the caller has already reserved."""
+        try:
+            raw = self._factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opened += 1
+        return raw
+
+    def _replenish(self):
+        """Open idle connections until the pool holds min_size again."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                raw = self._open()
+            except Exception as e:
+                logger.warning(f"Could not open connection for the pool minimum: {e}")
+                return
+            with self._cond:
+                self._idle.append((raw, time.monotonic(), time.monotonic()))
+                self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _discard(self, raw):
+        self._close_quietly(raw)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._replenish()
+
+    def _is_alive(self, raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def get(self):
+        """Check out a connection, waiting up to `timeout` seconds for one."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        entry = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO keeps the hottest connections busy and lets the rest age out
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve a slot; the connection is opened outside the lock
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s "
+                        f"({self._in_use} in use, max {self.max_size})"
+                    )
+                if not waited:
+                    waited = True
+                    self._waits += 1
+                self._cond.wait(remaining)
+            if waited:
+                self._wait_time += time.monotonic() - started
+
+        if entry is None:
+            raw = self._open()
+            created_at = time.monotonic()
+        else:
+            raw, created_at, released_at = entry
+            now = time.monotonic()
+            if self.max_lifetime and now - created_at > self.max_lifetime:
+                self._close_quietly(raw)
+                with self._cond:
+                    self._recycled += 1
+                raw = self._open()
+                created_at = time.monotonic()
+            elif now - released_at > self.ping_interval and not self._is_alive(raw):
+                self._close_quietly(raw)
+                with self._cond:
+                    self._discarded += 1
+                raw = self._open()
+                created_at = time.monotonic()
+
+        with self._cond:
+            self._in_use += 1
+            self._created_at[id(raw)] = created_at
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        """Return a checked-out connection, rolling back any open transaction."""
+        with self._cond:
+            self._in_use -= 1
+            created_at = self._created_at.pop(id(raw), time.monotonic())
+        try:
+            self._reset(raw)
+        except Exception as e:
+            logger.warning(f"Discarding connection that failed to reset: {e}")
+            with self._cond:
+                self._discarded += 1
+            self._discard(raw)
+            return
+        if self._closed:
+            self._discard(raw)
+            return
+        with self._cond:
+            self._idle.append((raw, created_at, time.monotonic()))
+            self._cond.notify()
+        # Slots lost to a failed reopen in get() are refilled here
+        self._replenish()
+
+    def close(self):
+        """Close every idle connection; checked-out ones are closed on release."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'waits': self._waits,
+                'wait_time_ms': round(self._wait_time * 1000, 3),
+                'timeouts': self._timeouts,
+                'opened': self._opened,
+                'recycled': self._recycled,
+                'discarded': self._discarded,
+            }
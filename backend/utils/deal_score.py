@@ -0,0 +1,49 @@
+import math
+import re
+from typing import Iterable, Optional, Tuple
+
+_KARAT = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*K(?:T|ARAT)?\s*$', re.I)
+_FINENESS = re.compile(r'^\s*(\d{3})\s*$')
+
+
+def purity_fraction(purity) -> Optional[float]:
+    """Gold content of a purity label: '14K' -> 14/24, '585' fineness -> 0.585."""
+    text = str(purity or '')
+    match = _KARAT.match(text)
+    if match:
+        fraction = float(match.group(1)) / 24
+    else:
+        match = _FINENESS.match(text)
+        if not match:
+            return None
+        fraction = int(match.group(1)) / 1000
+    return fraction if 0 < fraction <= 1 else None
+
+def length_bucket(length) -> int:
+    """Chain lengths ranked together: even-inch steps, so 20 and 21.5 share bucket 20."""
+    return 2 * math.floor(float(length) / 2)
+
+def deal_score(set_price, weight, purity, reported_prices: Iterable = (), rating=None,
+               report_weight: float = 0.5, rating_weight: float = 0.05) -> Optional[Tuple[float, float]]:
+    """(price per gram of pure gold, ranking score) for a product; lower is a better deal.
+
+    The price is set_price blended with the mean of recently reported prices
+    by report_weight. A rated store moves the score by up to rating_weight
+    either way (5 stars lowers it, 1 star raises it); unrated stores are neutral.
+    Returns None when the product has no usable weight, purity or price.
+    """
+    fraction = purity_fraction(purity)
+    grams = float(weight or 0) * (fraction or 0)
+    price = float(set_price or 0)
+    if grams <= 0 or price <= 0:
+        return None
+
+    reported = [float(p) for p in reported_prices if p is not None and float(p) > 0]
+    if reported:
+        price = (1 - report_weight) * price + report_weight * sum(reported) / len(reported)
+    pure_price_per_gram = price / grams
+
+    score = pure_price_per_gram
+    if rating is not None and float(rating) > 0:
+        score *= 1 - rating_weight * (float(rating) - 3) / 2
+    return round(pure_price_per_gram, 4), round(score, 4)
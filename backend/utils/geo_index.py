@@ -0,0 +1,165 @@
+import heapq
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """Uniform lat/lng grid answering radius and k-nearest queries.
+
+    Points are bucketed into square cells of cell_degrees; a query only
+    measures points in the cells its search ring overlaps. Once a ring would
+    have more cells than the grid has occupied ones, the remaining occupied
+    cells are measured directly instead.
+    """
+
+    def __init__(self, cell_degrees: float = 0.01):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Dict[int, Tuple[float, float]]] = {}
+        self._points: Dict[int, Tuple[float, float]] = {}
+        self._bounds = None  # (min_row, max_row, min_col, max_col) of occupied cells; only grows
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def distance_km(self, key: int, lat: float, lng: float) -> Optional[float]:
+        """Distance from (lat, lng) to a point, or None if the key is not indexed."""
+        point = self._points.get(key)
+        return None if point is None else haversine_km(float(lat), float(lng), *point)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def upsert(self, key: int, lat: float, lng: float) -> None:
+        lat, lng = float(lat), float(lng)
+        with self._lock:
+            self.remove(key)
+            cell = self._cell(lat, lng)
+            self._points[key] = (lat, lng)
+            self._cells.setdefault(cell, {})[key] = (lat, lng)
+            self._bounds = self._grow(self._bounds, cell)
+
+    @staticmethod
+    def _grow(bounds, cell):
+        if bounds is None:
+            return (cell[0], cell[0], cell[1], cell[1])
+        return (min(bounds[0], cell[0]), max(bounds[1], cell[0]),
+                min(bounds[2], cell[1]), max(bounds[3], cell[1]))
+
+    def remove(self, key: int) -> None:
+        with self._lock:
+            point = self._points.pop(key, None)
+            if point is None:
+                return
+            cell = self._cell(*point)
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self._cells[cell]
+
+    def rebuild(self, points: Iterable[Tuple[int, float, float]]) -> None:
+        cells, by_key, bounds = {}, {}, None
+        for key, lat, lng in points:
+            if lat is None or lng is None:
+                continue
+            lat, lng = float(lat), float(lng)
+            cell = self._cell(lat, lng)
+            by_key[key] = (lat, lng)
+            cells.setdefault(cell, {})[key] = (lat, lng)
+            bounds = self._grow(bounds, cell)
+        with self._lock:
+            self._cells, self._points, self._bounds = cells, by_key, bounds
+
+    @staticmethod
+    def _ring(center: Tuple[int, int], radius: int):
+        """Cells exactly `radius` cells away from center (Chebyshev distance)."""
+        row, col = center
+        if radius == 0:
+            yield center
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield (row - radius, c)
+            yield (row + radius, c)
+        for r in range(row - radius + 1, row + radius):
+            yield (r, col - radius)
+            yield (r, col + radius)
+
+    def _cell_size_km(self, lat: float) -> Tuple[float, float]:
+        km_lat = self.cell_degrees * KM_PER_DEGREE_LAT
+        km_lng = km_lat * max(math.cos(math.radians(min(abs(lat), 89.0))), 1e-6)
+        return km_lat, km_lng
+
+    def nearby(self, lat: float, lng: float, radius_km: Optional[float] = None,
+               k: Optional[int] = None, accept: Optional[Callable[[int], bool]] = None) -> List[Tuple[float, int]]:
+        """Return (distance_km, key) pairs sorted by distance.
+
+        With only radius_km every point inside it is returned; with k the k
+        nearest (optionally also inside radius_km). Keys rejected by accept
+        are skipped, so k counts only accepted points.
+        """
+        if radius_km is None and k is None:
+            raise ValueError("radius_km or k is required")
+        lat, lng = float(lat), float(lng)
+        km_lat, km_lng = self._cell_size_km(lat)
+        center = self._cell(lat, lng)
+        heap = []  # max-heap of the k best as (-distance, key)
+        results = []
+
+        with self._lock:
+            if not self._points:
+                return []
+            # Never search past the occupied part of the grid
+            min_row, max_row, min_col, max_col = self._bounds
+            max_ring = max(abs(center[0] - min_row), abs(center[0] - max_row),
+                           abs(center[1] - min_col), abs(center[1] - max_col))
+            ring = 0
+            while ring <= max_ring:
+                # Everything outside this ring is at least this far away
+                ring_min_km = max(0.0, (ring - 1)) * min(km_lat, km_lng)
+                if radius_km is not None and ring_min_km > radius_km:
+                    break
+                if k is not None and len(heap) >= k and ring_min_km > -heap[0][0]:
+                    break
+                if 8 * ring > len(self._cells):
+                    # Out here rings are mostly empty space (a k-only query far
+                    # from every store, or a filter rejecting most of them):
+                    # measure the occupied cells that are left and stop
+                    cells = [cell for cell in self._cells
+                             if max(abs(cell[0] - center[0]), abs(cell[1] - center[1])) >= ring]
+                    ring = max_ring
+                else:
+                    cells = self._ring(center, ring)
+                for cell in cells:
+                    for key, (plat, plng) in self._cells.get(cell, {}).items():
+                        if accept is not None and not accept(key):
+                            continue
+                        distance = haversine_km(lat, lng, plat, plng)
+                        if radius_km is not None and distance > radius_km:
+                            continue
+                        if k is None:
+                            results.append((distance, key))
+                        elif len(heap) < k:
+                            heapq.heappush(heap, (-distance, key))
+                        elif distance < -heap[0][0]:
+                            heapq.heapreplace(heap, (-distance, key))
+                ring += 1
+
+        if k is not None:
+            results = [(-d, key) for d, key in heap]
+        return sorted(results)
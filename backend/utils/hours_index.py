@@ -0,0 +1,133 @@
+import threading
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DAYS_OF_WEEK = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def to_minutes(value) -> Optional[int]:
+    """Minutes after midnight for a TIME value as returned by PyMySQL or SQLite."""
+    if value is None or value in ('', 'CLOSED'):
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    parts = str(value).split(':')
+    return int(parts[0]) * 60 + int(parts[1])
+
+def minute_of_week(moment: datetime) -> int:
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+def weekly_intervals(hours: Iterable[dict]) -> List[Tuple[int, int]]:
+    """Turn store_hours rows into [start, end) minute-of-week intervals.
+
+    A closing time at or before the opening time runs past midnight into the
+    next day (Sunday wraps to Monday); a day with a missing time is closed.
+    """
+    intervals = []
+    for hour in hours:
+        if hour['daysOpen'] not in DAYS_OF_WEEK:
+            continue
+        opens, closes = to_minutes(hour['openTime']), to_minutes(hour['closeTime'])
+        if opens is None or closes is None:
+            continue
+        if closes <= opens:
+            closes += MINUTES_PER_DAY
+        start = DAYS_OF_WEEK.index(hour['daysOpen']) * MINUTES_PER_DAY + opens
+        end = start + (closes - opens)
+        if end <= MINUTES_PER_WEEK:
+            intervals.append((start, end))
+        else:
+            intervals.append((start, MINUTES_PER_WEEK))
+            intervals.append((0, end - MINUTES_PER_WEEK))
+    return intervals
+
+
+class WeeklyHoursIndex:
+    """Which stores are open at a given minute of the week.
+
+    The week is split into 168 hourly slots. Each slot keeps a bitmap of the
+    stores open for the whole hour, and the exact intervals of the few stores
+    that open or close during it, so a lookup is one bitmap plus a handful
+    of comparisons rather than parsing every store's hours.
+    """
+
+    SLOTS = 7 * 24
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._positions: Dict[int, int] = {}  # storeID -> bit position
+        self._ids: List[Optional[int]] = []   # bit position -> storeID
+        self._full = [0] * self.SLOTS
+        self._partial: List[Dict[int, List[Tuple[int, int]]]] = [{} for _ in range(self.SLOTS)]
+        self._slots: Dict[int, Set[int]] = {}  # storeID -> slots it appears in
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _unset(self, store_id: int, position: int) -> None:
+        mask = ~(1 << position)
+        for slot in self._slots.pop(store_id, ()):
+            self._full[slot] &= mask
+            self._partial[slot].pop(store_id, None)
+
+    def set_hours(self, store_id: int, hours: Iterable[dict]) -> None:
+        intervals = weekly_intervals(hours)
+        with self._lock:
+            position = self._positions.get(store_id)
+            if position is None:
+                position = self._positions[store_id] = len(self._ids)
+                self._ids.append(store_id)
+            else:
+                self._unset(store_id, position)
+            touched = set()
+            for start, end in intervals:
+                for slot in range(start // 60, (end - 1) // 60 + 1):
+                    slot_start, slot_end = slot * 60, slot * 60 + 60
+                    if start <= slot_start and end >= slot_end:
+                        self._full[slot] |= 1 << position
+                    else:
+                        self._partial[slot].setdefault(store_id, []).append(
+                            (max(start, slot_start), min(end, slot_end)))
+                    touched.add(slot)
+            self._slots[store_id] = touched
+
+    def remove(self, store_id: int) -> None:
+        with self._lock:
+            position = self._positions.pop(store_id, None)
+            if position is not None:
+                self._unset(store_id, position)
+                self._ids[position] = None
+
+    def rebuild(self, hours_by_store: Dict[int, Iterable[dict]]) -> None:
+        with self._lock:
+            self._clear()
+            for store_id, hours in hours_by_store.items():
+                self.set_hours(store_id, hours)
+
+    def open_at(self, moment: datetime) -> Set[int]:
+        """IDs of the stores open at `moment`, read as store-local wall time."""
+        minute = minute_of_week(moment)
+        slot = minute // 60
+        with self._lock:
+            # Reversed binary digits put bit i at index i
+            bits = bin(self._full[slot])[:1:-1]
+            ids = self._ids
+            open_ids = set()
+            position = bits.find('1')
+            while position != -1:
+                open_ids.add(ids[position])
+                position = bits.find('1', position + 1)
+            for store_id, intervals in self._partial[slot].items():
+                if any(start <= minute < end for start, end in intervals):
+                    open_ids.add(store_id)
+        return open_ids
+
+    def is_open(self, store_id: int, moment: datetime) -> bool:
+        return store_id in self.open_at(moment)
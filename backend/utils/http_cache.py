@@ -0,0 +1,50 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from functools import wraps
+from flask import make_response, request
+from indexes import table_versions
+
+logger = logging.getLogger(__name__)
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+
+def conditional_get(*tables: str, vary=None):
+    """Serve a GET view with a strong ETag and Last-Modified built from table versions.
+
+    A request whose If-None-Match (or If-Modified-Since) still matches gets a
+    304 before the view runs, so repeat visits cost no queries while the
+    cached versions are fresh. vary, if given, returns extra ETag input for
+    responses that also depend on something other than the tables.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                versions = table_versions.get_versions()
+            except Exception as e:
+                logger.error(f"Table versions unavailable, serving without validators: {e}")
+                return view(*args, **kwargs)
+
+            # Versions are read before the view queries, so the ETag can only
+            # lag the body, never claim data it does not contain
+            current = [versions.get(table, {}).get('version') for table in tables]
+            etag = make_etag(request.full_path, current, vary() if vary else None)
+            modified_at = max((versions.get(table, {}).get('modified_at', 0) for table in tables), default=0)
+            last_modified = datetime.fromtimestamp(modified_at, timezone.utc) if modified_at else None
+
+            not_modified = (request.if_none_match.contains(etag) if request.if_none_match
+                            else vary is None and last_modified is not None
+                            and request.if_modified_since is not None
+                            and last_modified <= request.if_modified_since)
+            response = make_response('', 304) if not_modified else make_response(view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                # Let browsers keep the body but revalidate it on every use
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
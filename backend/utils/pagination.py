@@ -0,0 +1,84 @@
+import base64
+import json
+from decimal import Decimal
+from typing import Callable, List, Optional, Tuple
+
+
+def _plain(value):
+    # Decimals travel as strings so prices and ratings round-trip exactly
+    return str(value) if isinstance(value, Decimal) else value
+
+def encode_cursor(sort: str, values: tuple) -> str:
+    payload = json.dumps({'s': sort, 'k': [_plain(v) for v in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token: Optional[str], sort: str, size: int) -> Optional[tuple]:
+    """Key values of the last row on the previous page, or None for the first page.
+
+    size is the number of key values the sort order uses. Raises ValueError
+    for a malformed cursor or one issued for another sort order.
+    """
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        values = tuple(payload['k'])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+    if payload.get('s') != sort:
+        raise ValueError("Cursor does not match the requested sort")
+    if len(values) != size or not all(isinstance(v, (str, int, float)) and not isinstance(v, bool)
+                                      for v in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+def keyset_condition(column: str, id_column: str, descending: bool, after: Optional[tuple]) -> Tuple[str, tuple]:
+    """SQL condition selecting rows strictly after `after` in (column, id_column) order.
+
+    Spelled out with OR rather than a row constructor so MySQL can range-scan
+    the (column, id) index.
+    """
+    if after is None:
+        return '1 = 1', ()
+    op = '<' if descending else '>'
+    if column == id_column:
+        return f"{id_column} {op} %s", (after[-1],)
+    value, last_id = after
+    return f"({column} {op} %s OR ({column} = %s AND {id_column} {op} %s))", (value, value, last_id)
+
+def keyset_order(column: str, id_column: str, descending: bool) -> str:
+    direction = 'DESC' if descending else 'ASC'
+    if column == id_column:
+        return f"{id_column} {direction}"
+    return f"{column} {direction}, {id_column} {direction}"
+
+def paginate(rows: List[dict], limit: int, sort: str, key: Callable[[dict], tuple]) -> Tuple[List[dict], Optional[str]]:
+    """Trim a limit + 1 fetch to one page and build the cursor for the next."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort, key(rows[-1]))
+
+def page_args(args, sorts, default_limit: int, max_limit: int,
+              id_column: str) -> Optional[Tuple[int, str, Optional[tuple]]]:
+    """Read limit/cursor/sort from request args as (limit, sort, after).
+
+    sorts maps each sort name to a tuple starting with its column; sorting by
+    id_column keys a cursor on the id alone, any other column on (value, id).
+
+    Returns None when neither limit nor cursor is given, so callers can keep
+    serving the unpaginated list. Raises ValueError on bad input.
+    """
+    if 'limit' not in args and 'cursor' not in args:
+        return None
+    try:
+        limit = int(args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit <= 0:
+        raise ValueError("limit must be positive")
+    sort = args.get('sort', 'id')
+    if sort not in sorts:
+        raise ValueError(f"sort must be one of: {', '.join(sorts)}")
+    size = 1 if sorts[sort][0] == id_column else 2
+    return min(limit, max_limit), sort, decode_cursor(args.get('cursor'), sort, size)
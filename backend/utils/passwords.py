@@ -0,0 +1,95 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+from config import Config
+
+# Stored as 'scrypt$n$r$p$salt$hash' (or 'pbkdf2_sha256$iterations$salt$hash'
+# where OpenSSL lacks scrypt). Anything else is a legacy plaintext password,
+# accepted once and replaced with a hash at the next login.
+PBKDF2_ITERATIONS = 600_000
+ALGORITHMS = ('scrypt', 'pbkdf2_sha256')
+
+
+class HashingBusy(Exception):
+    """Every hashing worker is busy and the queue is full; the caller should retry later."""
+
+
+def _encode(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=32, maxmem=256 * n * r + 1024 * 1024)
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+def _hash(password: str) -> str:
+    salt = os.urandom(16)
+    if hasattr(hashlib, 'scrypt'):
+        n, r, p = Config.PASSWORD_SCRYPT_N, 8, 1
+        return f"scrypt${n}${r}${p}${_encode(salt)}${_encode(_scrypt(password, salt, n, r, p))}"
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_encode(salt)}${_encode(_pbkdf2(password, salt, PBKDF2_ITERATIONS))}"
+
+def _verify(password: str, stored: str) -> Tuple[bool, bool]:
+    stored = stored or ''
+    algorithm, tagged, _ = stored.partition('$')
+    if not tagged or algorithm not in ALGORITHMS:
+        # Legacy plaintext password
+        ok = hmac.compare_digest(stored.encode(), password.encode())
+        return ok, ok
+
+    # A tagged hash that does not parse is corrupt, never a plaintext password
+    parts = stored.split('$')
+    try:
+        if algorithm == 'scrypt' and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            expected = base64.b64decode(parts[5], validate=True)
+            ok = hmac.compare_digest(_scrypt(password, base64.b64decode(parts[4], validate=True), n, r, p), expected)
+            return ok, ok and n != Config.PASSWORD_SCRYPT_N
+        if algorithm == 'pbkdf2_sha256' and len(parts) == 4:
+            expected = base64.b64decode(parts[3], validate=True)
+            ok = hmac.compare_digest(_pbkdf2(password, base64.b64decode(parts[2], validate=True), int(parts[1])),
+                                     expected)
+            return ok, ok and hasattr(hashlib, 'scrypt')
+    except (ValueError, OverflowError, MemoryError):
+        pass
+    return False, False
+
+
+# Hashing is deliberately slow and scrypt needs 16 MB per call, so it runs on
+# a small pool. hashlib releases the GIL while hashing, so request threads
+# keep serving other requests. Calls beyond the workers plus the queue are
+# refused rather than piling up.
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+def _run(fn, *args):
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE)
+                _executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS,
+                                               thread_name_prefix='password-hash')
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+def hash_password(password: str) -> str:
+    """A salted slow hash of password, computed on the hashing pool."""
+    return _run(_hash, password)
+
+def verify_password(password: str, stored: str) -> Tuple[bool, bool]:
+    """(matches, should be rehashed) for a stored hash or legacy plaintext password."""
+    return _run(_verify, password, stored)
@@ -0,0 +1,148 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from utils.text import normalize
+
+# Sorts after every character a normalized term can contain
+_END = '\uffff'
+
+
+class PrefixIndex:
+    """Weighted prefix lookup over short labels, for typeahead.
+
+    Every item (kind, key) has a label and a popularity weight. Its label is
+    indexed from each word onwards ('canal st gold' also as 'st gold' and
+    'gold'), in one sorted list of (term, kind, key), so the items matching
+    a prefix are one contiguous range found by binary search. Short prefixes
+    match large ranges, so their best results are cached, and writes patch
+    the cached lists in place rather than dropping them.
+    """
+
+    def __init__(self, cache_depth: int = 20, scan_limit: int = 256):
+        self.cache_depth = cache_depth
+        self.scan_limit = scan_limit
+        self._lock = threading.RLock()
+        self._entries: List[Tuple[str, str, Hashable]] = []
+        self._items: Dict[Tuple[str, Hashable], list] = {}  # (kind, key) -> [label, weight, terms]
+        self._cache: Dict[tuple, list] = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    @staticmethod
+    def _terms(label: str) -> List[str]:
+        words = normalize(label)
+        return list(dict.fromkeys(' '.join(words[i:]) for i in range(len(words))))
+
+    def rebuild(self, items: Iterable[Tuple[str, Hashable, str, float]]) -> None:
+        """Replace the contents with (kind, key, label, weight) tuples."""
+        entries, by_item = [], {}
+        for kind, key, label, weight in items:
+            terms = self._terms(label)
+            by_item[(kind, key)] = [label, weight, terms]
+            entries.extend((term, kind, key) for term in terms)
+        entries.sort()
+        with self._lock:
+            self._entries, self._items, self._cache = entries, by_item, {}
+
+    def _drop_terms(self, kind: str, key: Hashable, terms: List[str]) -> None:
+        for term in terms:
+            position = bisect_left(self._entries, (term, kind, key))
+            if position < len(self._entries) and self._entries[position] == (term, kind, key):
+                del self._entries[position]
+
+    def upsert(self, kind: str, key: Hashable, label: str, weight: Optional[float] = None) -> None:
+        """Add or relabel an item; weight None keeps the current weight (0 for new items)."""
+        with self._lock:
+            current = self._items.get((kind, key))
+            if weight is None:
+                weight = current[1] if current else 0
+            terms = self._terms(label)
+            if current is not None and current[2] != terms:
+                self._drop_terms(kind, key, current[2])
+            if current is None or current[2] != terms:
+                for term in terms:
+                    insort(self._entries, (term, kind, key))
+            self._items[(kind, key)] = [label, weight, terms]
+            self._patch_cache(kind, key)
+
+    def set_weight(self, kind: str, key: Hashable, weight: float) -> None:
+        with self._lock:
+            current = self._items.get((kind, key))
+            if current is not None and current[1] != weight:
+                current[1] = weight
+                self._patch_cache(kind, key)
+
+    def add_weight(self, kind: str, key: Hashable, delta: float, label: Optional[str] = None) -> None:
+        """Adjust a weight by delta, adding the item (labelled key) if needed and removing it at zero."""
+        with self._lock:
+            current = self._items.get((kind, key))
+            weight = (current[1] if current else 0) + delta
+            if weight <= 0:
+                self.remove(kind, key)
+            elif current is None:
+                self.upsert(kind, key, label if label is not None else str(key), weight)
+            else:
+                self.set_weight(kind, key, weight)
+
+    def remove(self, kind: str, key: Hashable) -> None:
+        with self._lock:
+            current = self._items.pop((kind, key), None)
+            if current is not None:
+                self._drop_terms(kind, key, current[2])
+                self._patch_cache(kind, key)
+
+    @staticmethod
+    def _rank(result: tuple) -> tuple:
+        kind, key, label, weight = result
+        return -weight, label, kind, key
+
+    def _best(self, lo: int, hi: int, limit: int, kinds: Optional[frozenset]) -> List[tuple]:
+        matched = {(kind, key) for _, kind, key in self._entries[lo:hi] if kinds is None or kind in kinds}
+        return heapq.nsmallest(limit, ((kind, key, *self._items[(kind, key)][:2]) for kind, key in matched),
+                               key=self._rank)
+
+    def _patch_cache(self, kind: str, key: Hashable) -> None:
+        """Move one changed item within every cached result list it belongs to.
+
+        Lists hold twice the depth served, so an item dropping out can be
+        absorbed; a list that gets too short is dropped and recomputed.
+        """
+        item = self._items.get((kind, key))
+        for cache_key, (best, complete) in list(self._cache.items()):
+            term, kinds = cache_key
+            best = [result for result in best if result[:2] != (kind, key)]
+            if (item is not None and (kinds is None or kind in kinds)
+                    and any(candidate.startswith(term) for candidate in item[2])):
+                best.append((kind, key, item[0], item[1]))
+                best.sort(key=self._rank)
+                if len(best) > 2 * self.cache_depth:
+                    best, complete = best[:2 * self.cache_depth], False
+            if complete or len(best) >= self.cache_depth:
+                self._cache[cache_key] = (best, complete)
+            else:
+                del self._cache[cache_key]
+
+    def suggest(self, prefix: str, limit: int = 10, kinds: Optional[frozenset] = None) -> List[tuple]:
+        """(kind, key, label, weight) of the heaviest items with a word starting with prefix.
+
+        Ties go to the alphabetically first label.
+        """
+        term = ' '.join(normalize(prefix))
+        if not term or limit <= 0:
+            return []
+        with self._lock:
+            lo = bisect_left(self._entries, (term,))
+            hi = bisect_left(self._entries, (term + _END,), lo)
+            if hi - lo <= self.scan_limit or limit > self.cache_depth:
+                return self._best(lo, hi, limit, kinds)
+            cached = self._cache.get((term, kinds))
+            if cached is None:
+                best = self._best(lo, hi, 2 * self.cache_depth, kinds)
+                cached = self._cache[(term, kinds)] = (best, len(best) < 2 * self.cache_depth)
+            return cached[0][:limit]
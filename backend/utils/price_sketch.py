@@ -0,0 +1,34 @@
+import math
+from typing import Dict, Optional
+
+# Quantiles read from a sketch are within this relative error of the true value
+RELATIVE_ACCURACY = 0.01
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def bucket_of(value: float) -> int:
+    """Logarithmic bucket holding a positive value.
+
+    Bucket i covers (gamma^(i-1), gamma^i], so sketches built anywhere merge
+    by adding the counts of equal buckets.
+    """
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+def bucket_value(bucket: int) -> float:
+    """The value representing a bucket, within RELATIVE_ACCURACY of all it covers."""
+    return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+def quantile(sketch: Dict[int, int], q: float) -> Optional[float]:
+    """Approximate q-quantile (0 <= q <= 1) of the values counted in sketch."""
+    total = sum(sketch.values())
+    if total == 0:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for bucket in sorted(sketch):
+        seen += sketch[bucket]
+        if seen > rank:
+            return bucket_value(bucket)
+    return bucket_value(max(sketch))
@@ -0,0 +1,96 @@
+import logging
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Reduce a statement to its shape: literals and placeholders become ?, lists collapse."""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    shape = _VALUES_LIST.sub(r'\1, ...', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryRecorder:
+    """Collects the statements run while serving one request."""
+
+    def __init__(self, label: str = '', slow_query_ms: float = 200, n_plus_one_threshold: int = 5):
+        self.label = label
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.queries = []
+        self.shapes = Counter()
+        self._flagged = set()
+
+    def record(self, sql: str, duration: float, rows: int):
+        shape = normalize_sql(sql)
+        duration_ms = duration * 1000
+        self.queries.append({'sql': shape, 'duration_ms': duration_ms, 'rows': rows})
+        self.shapes[shape] += 1
+
+        if self.slow_query_ms and duration_ms >= self.slow_query_ms:
+            logger.warning(f"Slow query ({duration_ms:.1f} ms, {rows} rows) in {self.label}: {shape}")
+
+        count = self.shapes[shape]
+        if self.n_plus_one_threshold and count >= self.n_plus_one_threshold and shape not in self._flagged:
+            self._flagged.add(shape)
+            logger.warning(f"Possible N+1 in {self.label}: statement ran {count}+ times: {shape}")
+
+    @property
+    def total_ms(self) -> float:
+        return sum(q['duration_ms'] for q in self.queries)
+
+    @property
+    def repeated_shapes(self) -> list:
+        return sorted(self._flagged)
+
+    def server_timing(self) -> str:
+        """Totals formatted for a Server-Timing response header."""
+        slowest = max((q['duration_ms'] for q in self.queries), default=0)
+        return (f'db;dur={self.total_ms:.2f};desc="{len(self.queries)} queries", '
+                f'db-slowest;dur={slowest:.2f}')
+
+
+class InstrumentedCursor:
+    """Cursor wrapper that reports every statement to a QueryRecorder."""
+
+    def __init__(self, cursor, recorder: QueryRecorder):
+        self._cursor = cursor
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, method, sql, args):
+        started = time.perf_counter()
+        try:
+            result = method(sql, args)
+        except Exception as e:
+            logger.error(f"Query failed in {self._recorder.label}: {normalize_sql(sql)}: {e}")
+            raise
+        finally:
+            self._recorder.record(sql, time.perf_counter() - started, max(self._cursor.rowcount or 0, 0))
+        return result
+
+    def execute(self, sql, args=None):
+        return self._timed(self._cursor.execute, sql, args)
+
+    def executemany(self, sql, args):
+        return self._timed(self._cursor.executemany, sql, args)
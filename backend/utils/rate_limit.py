@@ -0,0 +1,50 @@
+import threading
+import time
+from typing import Callable, Hashable
+from utils.lru import LRUCache
+
+
+class TokenBucket:
+    """Allows rate requests per second on average and bursts of up to burst."""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def take(self) -> float:
+        """0 if a request may proceed, else the seconds until one could."""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per key (client, or client and route), keeping the most recently used max_keys.
+
+    A forgotten key starts over with a full bucket, which only errs on the
+    side of admitting a client.
+    """
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self._buckets = LRUCache(max_keys)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def check(self, key: Hashable, rate: float, burst: float) -> float:
+        """0 if key may make a request now, else the seconds it should wait."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or (bucket.rate, bucket.burst) != (rate, burst):
+                bucket = TokenBucket(rate, burst, self._clock)
+                self._buckets.put(key, bucket)
+            return bucket.take()
+
+    def clear(self) -> None:
+        self._buckets.clear()
@@ -0,0 +1,115 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from utils.db_pool import PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    """A read replica: its connection pool plus the health we last observed."""
+
+    def __init__(self, name: str, pool):
+        self.name = name
+        self.pool = pool
+        self.down_until = 0.0
+        self.lag = None
+        self.lag_checked_at = 0.0
+        self.failures = 0
+
+    def stats(self) -> dict:
+        return {
+            'name': self.name,
+            'available': self.down_until <= time.monotonic(),
+            'lag': self.lag,
+            'failures': self.failures,
+            'pool': self.pool.stats(),
+        }
+
+
+class ReplicaRouter:
+    """Choose a healthy, sufficiently fresh replica for read-only work.
+
+    Replicas that cannot open a connection are skipped for retry_after
+    seconds, and replicas lagging more than max_lag seconds are skipped until
+    their lag is checked again. A replica whose pool is merely exhausted is
+    only skipped for the current call. get() returns None when no replica is
+    usable so the caller can fall back to the primary.
+    """
+
+    def __init__(self, replicas: List[Replica], lag_of: Callable, strategy: str = 'round_robin',
+                 max_lag: float = 5.0, lag_check_interval: float = 5.0, retry_after: float = 30.0):
+        if strategy not in ('round_robin', 'least_loaded'):
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.retry_after = retry_after
+        self._lag_of = lag_of
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _candidates(self) -> List[Replica]:
+        now = time.monotonic()
+        healthy = [r for r in self.replicas if r.down_until <= now]
+        if not healthy:
+            return []
+        if self.strategy == 'least_loaded':
+            return sorted(healthy, key=lambda r: r.pool.stats()['in_use'])
+        start = next(self._counter) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def _mark_down(self, replica: Replica, seconds: float):
+        with self._lock:
+            replica.down_until = time.monotonic() + seconds
+            replica.failures += 1
+
+    def _is_fresh(self, replica: Replica, connection) -> bool:
+        now = time.monotonic()
+        if now - replica.lag_checked_at >= self.lag_check_interval:
+            replica.lag = self._lag_of(connection)
+            replica.lag_checked_at = now
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def get(self):
+        for replica in self._candidates():
+            try:
+                connection = replica.pool.get()
+            except PoolTimeout as e:
+                # Busy, not broken: leave it in rotation for the next request
+                logger.info(f"Replica {replica.name} pool exhausted: {e}")
+                continue
+            except Exception as e:
+                logger.warning(f"Replica {replica.name} unavailable: {e}")
+                self._mark_down(replica, self.retry_after)
+                continue
+            try:
+                fresh = self._is_fresh(replica, connection)
+            except Exception as e:
+                logger.warning(f"Could not check lag on replica {replica.name}: {e}")
+                fresh = False
+            if fresh:
+                return connection
+            logger.warning(f"Replica {replica.name} lag {replica.lag}s exceeds {self.max_lag}s")
+            connection.close()
+            self._mark_down(replica, self.lag_check_interval)
+        return None
+
+    def stats(self) -> List[dict]:
+        return [r.stats() for r in self.replicas]
+
+
+def parse_replicas(value: Optional[str], default_port: int) -> List[tuple]:
+    """Parse "host1:3307,host2" into [("host1", 3307), ("host2", default_port)]."""
+    replicas = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        replicas.append((host, int(port) if port else default_port))
+    return replicas
@@ -0,0 +1,259 @@
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+# SQLite caps bound variables per statement; batch inserts are chunked below it
+MAX_VARIABLES = 30000
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(time, lambda value: value.isoformat())
+sqlite3.register_adapter(timedelta, lambda value: _format_timedelta(value))
+
+_DML_REWRITES = [
+    (re.compile(r'%%'), '\0'),                                  # protect escaped percents
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\0'), '%'),
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.I), 'INSERT OR IGNORE'),
+    (re.compile(r'\s+FOR\s+UPDATE\b', re.I), ''),
+    # LEFT is a keyword in SQLite, so LEFT(str, n) needs a different name
+    (re.compile(r'\bLEFT\s*\(', re.I), 'MYSQL_LEFT('),
+]
+
+_DDL_REWRITES = [
+    (re.compile(r'\bINT(?:EGER)?\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bBIGINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bENUM\s*\([^)]*\)', re.I), 'TEXT'),
+    (re.compile(r'\bON\s+UPDATE\s+CURRENT_TIMESTAMP\b', re.I), ''),
+    (re.compile(r'\bUNIQUE\s+KEY\s+\w+\s*\(', re.I), 'UNIQUE ('),
+    (re.compile(r'\)\s*ENGINE\s*=\s*\w+[^;]*$', re.I), ')'),
+    (re.compile(r'^\s*DROP\s+INDEX\s+(\w+)\s+ON\s+\w+', re.I), r'DROP INDEX IF EXISTS \1'),
+]
+
+_ON_DUPLICATE = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.I)
+_VALUES_FUNCTION = re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.I)
+_ALTER_AUTO_INCREMENT = re.compile(r'^\s*ALTER\s+TABLE\s+\w+\s+AUTO_INCREMENT\s*=', re.I)
+_INSERT_VALUES = re.compile(r'^(\s*INSERT\s.*?\bVALUES\s*)(\([^)]*\))(.*)$', re.I | re.S)
+
+
+def _format_timedelta(value: timedelta) -> str:
+    seconds = int(value.total_seconds())
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+@lru_cache(maxsize=1024)
+def translate(sql: str) -> str:
+    """Rewrite the MySQL dialect used by the repositories into SQLite."""
+    if _ALTER_AUTO_INCREMENT.match(sql):
+        return ''
+    for pattern, replacement in _DDL_REWRITES + _DML_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    match = _ON_DUPLICATE.search(sql)
+    if match:
+        head, tail = sql[:match.start()], sql[match.end():]
+        sql = head + 'ON CONFLICT DO UPDATE SET' + _VALUES_FUNCTION.sub(r'excluded.\1', tail)
+    return sql
+
+
+# MySQL functions the queries use that SQLite lacks, registered per connection
+_TIME_FORMAT_CODES = {'h': '%I', 'I': '%I', 'H': '%H', 'i': '%M', 's': '%S', 'S': '%S', 'p': '%p', 'k': '%H'}
+
+def _to_time(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return None
+    text = str(value)
+    if ' ' in text:
+        text = text.split(' ', 1)[1]
+    parts = [int(float(p)) for p in text.split(':')]
+    while len(parts) < 3:
+        parts.append(0)
+    return time(parts[0] % 24, parts[1], parts[2])
+
+def _time_format(value, fmt):
+    parsed = _to_time(value)
+    if parsed is None or fmt is None:
+        return None
+    python_fmt = re.sub(r'%(\w)', lambda m: _TIME_FORMAT_CODES.get(m.group(1), m.group(0)), fmt)
+    return parsed.strftime(python_fmt)
+
+def _field(value, *options):
+    try:
+        return options.index(value) + 1
+    except ValueError:
+        return 0
+
+def _concat(*parts):
+    if any(part is None for part in parts):
+        return None
+    return ''.join(str(part) for part in parts)
+
+def _left(value, length):
+    return None if value is None else str(value)[:int(length)]
+
+def _greatest(*values):
+    return None if any(v is None for v in values) else max(values)
+
+def _least(*values):
+    return None if any(v is None for v in values) else min(values)
+
+FUNCTIONS = [
+    ('TIME_FORMAT', 2, _time_format),
+    ('FIELD', -1, _field),
+    ('CONCAT', -1, _concat),
+    ('MYSQL_LEFT', 2, _left),
+    ('GREATEST', -1, _greatest),
+    ('LEAST', -1, _least),
+    ('NOW', 0, lambda: datetime.now().isoformat(' ', 'seconds')),
+]
+
+
+class SQLiteCursor:
+    """DB-API cursor returning dict rows and speaking the MySQL parameter style."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self.lastrowid = None
+        self.rowcount = -1
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def _columns(self):
+        return [column[0] for column in self._cursor.description or ()]
+
+    def execute(self, sql, args=None):
+        statement = translate(sql)
+        if not statement:
+            self.rowcount = 0
+            return 0
+        self._cursor.execute(statement, tuple(args) if args is not None else ())
+        self.lastrowid = self._cursor.lastrowid
+        self.rowcount = self._cursor.rowcount
+        return self.rowcount
+
+    def executemany(self, sql, rows):
+        rows = [tuple(row) for row in rows]
+        if not rows:
+            return 0
+        statement = translate(sql)
+        match = _INSERT_VALUES.match(statement)
+        if not match:
+            total = 0
+            for row in rows:
+                total += max(self.execute(sql, row), 0)
+            self.rowcount = total
+            return total
+
+        # Like PyMySQL, send one multi-row INSERT and report the first new id
+        head, values, tail = match.groups()
+        per_chunk = max(1, MAX_VARIABLES // max(1, len(rows[0])))
+        first_id = None
+        total = 0
+        for start in range(0, len(rows), per_chunk):
+            chunk = rows[start:start + per_chunk]
+            self._cursor.execute(head + ', '.join([values] * len(chunk)) + tail,
+                                 [value for row in chunk for value in row])
+            total += self._cursor.rowcount
+            if first_id is None:
+                first_id = self._cursor.lastrowid - len(chunk) + 1
+        self.lastrowid = first_id
+        self.rowcount = total
+        return total
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else dict(zip(self._columns(), row))
+
+    def fetchall(self):
+        columns = self._columns()
+        return [dict(zip(columns, row)) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=None):
+        columns = self._columns()
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Connection exposing the subset of the PyMySQL API the app relies on."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self, cursorclass=None):
+        return SQLiteCursor(self)
+
+    def begin(self):
+        if not self.raw.in_transaction:
+            self.raw.execute('BEGIN')
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.raw.in_transaction
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def ping(self, reconnect=False):
+        self.raw.execute('SELECT 1')
+
+    def close(self):
+        self.raw.close()
+
+
+_anchors = {}
+_anchors_lock = threading.Lock()
+
+def _database_uri(path: str) -> str:
+    if path in (None, '', ':memory:'):
+        with _anchors_lock:
+            # One private shared-cache database per process
+            path = _anchors.setdefault('__memory_name__', f"file:espada-{uuid.uuid4().hex}?mode=memory&cache=shared")
+        return path
+    return f"file:{path}"
+
+def _open(uri: str) -> sqlite3.Connection:
+    raw = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30)
+    for name, arity, function in FUNCTIONS:
+        raw.create_function(name, arity, function, deterministic=name != 'NOW')
+    raw.execute('PRAGMA foreign_keys = OFF')
+    if 'mode=memory' not in uri:
+        raw.execute('PRAGMA journal_mode = WAL')
+    return raw
+
+def connect(path: str = ':memory:') -> SQLiteConnection:
+    """Open a connection; in-memory databases stay alive for the life of the process."""
+    uri = _database_uri(path)
+    with _anchors_lock:
+        if uri not in _anchors:
+            # Shared-cache memory databases vanish when their last connection closes
+            _anchors[uri] = _open(uri)
+    return SQLiteConnection(_open(uri))
+
+def drop_database(path: str = ':memory:') -> None:
+    """Forget an in-memory database so the next connect() starts empty."""
+    uri = _database_uri(path)
+    with _anchors_lock:
+        anchor = _anchors.pop(uri, None)
+        if path in (None, '', ':memory:'):
+            _anchors.pop('__memory_name__', None)
+    if anchor is not None:
+        anchor.close()
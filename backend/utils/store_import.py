@@ -0,0 +1,88 @@
+import csv
+import json
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+from utils.hours_index import DAYS_OF_WEEK, to_minutes
+
+# Column limits from the store table
+STORE_FIELD_LENGTHS = {'store_name': 50, 'phone': 20, 'email': 100}
+REQUIRED_STORE_FIELDS = ('ownerID', 'store_name', 'address', 'latitude', 'longitude')
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, store dict or error message) for each non-blank line."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+def parse_csv(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    """Yield (row number, store dict) from CSV with one row per store.
+
+    Hours come from optional <day>_open / <day>_close columns (e.g.
+    monday_open); a day with a blank time is closed.
+    """
+    reader = csv.DictReader(lines)
+    has_hours = any(f"{day.lower()}_open" in (reader.fieldnames or ()) for day in DAYS_OF_WEEK)
+    for number, row in enumerate(reader, start=2):
+        record = {key: (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+        if has_hours:
+            record['hours'] = [{
+                'daysOpen': day,
+                'openTime': record.pop(f"{day.lower()}_open", None) or None,
+                'closeTime': record.pop(f"{day.lower()}_close", None) or None,
+            } for day in DAYS_OF_WEEK]
+        yield number, record
+
+def _format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def validate_store(record: dict) -> dict:
+    """Normalise one imported store. Raises ValueError describing the first problem."""
+    missing = [field for field in REQUIRED_STORE_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing required field: {missing[0]}")
+    try:
+        store = {
+            'ownerID': int(record['ownerID']),
+            'latitude': float(record['latitude']),
+            'longitude': float(record['longitude']),
+        }
+    except (TypeError, ValueError):
+        raise ValueError("ownerID, latitude and longitude must be numbers")
+    if not (-90 <= store['latitude'] <= 90 and -180 <= store['longitude'] <= 180):
+        raise ValueError("latitude/longitude out of range")
+    for field in ('store_name', 'address', 'phone', 'email'):
+        value = record.get(field)
+        store[field] = str(value) if value not in (None, '') else None
+        limit = STORE_FIELD_LENGTHS.get(field)
+        if limit and store[field] and len(store[field]) > limit:
+            raise ValueError(f"{field} is longer than {limit} characters")
+
+    hours = []
+    for hour in record.get('hours') or []:
+        if not isinstance(hour, dict) or hour.get('daysOpen') not in DAYS_OF_WEEK:
+            raise ValueError("Each hours entry needs a daysOpen weekday")
+        try:
+            opens, closes = to_minutes(hour.get('openTime')), to_minutes(hour.get('closeTime'))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid time for {hour['daysOpen']}")
+        closed = opens is None or closes is None
+        hours.append({'daysOpen': hour['daysOpen'],
+                      'openTime': None if closed else _format_minutes(opens),
+                      'closeTime': None if closed else _format_minutes(closes)})
+    store['hours'] = hours
+    return store
+
+def chunks(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
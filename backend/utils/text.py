@@ -0,0 +1,10 @@
+import re
+import unicodedata
+from typing import List
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+def normalize(text: str) -> List[str]:
+    """Lower-cased ASCII words of text, accents folded ('Café' -> ['cafe'])."""
+    folded = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    return [word for word in _NON_WORD.split(folded) if word]
@@ -0,0 +1,55 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from typing import Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Access tokens are 'payload.signature': base64url JSON claims and their
+# HMAC-SHA256, so verifying one needs no database or shared state
+_process_secret = None
+
+def _secret() -> bytes:
+    global _process_secret
+    secret = Config.AUTH_TOKEN_SECRET or Config.SECRET_KEY
+    if secret:
+        return secret.encode()
+    if _process_secret is None:
+        logger.warning("AUTH_TOKEN_SECRET is not set; tokens are only valid in this process")
+        _process_secret = os.urandom(32)
+    return _process_secret
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_secret(), payload.encode(), hashlib.sha256).digest())
+
+def issue(claims: dict, ttl_seconds: Optional[int] = None) -> str:
+    """A signed token carrying claims, expiring after ttl_seconds."""
+    ttl = Config.AUTH_TOKEN_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    payload = _b64encode(json.dumps({**claims, 'exp': int(time.time()) + ttl},
+                                    separators=(',', ':')).encode())
+    return f"{payload}.{_sign(payload)}"
+
+def verify(token: str) -> Optional[dict]:
+    """The claims of a well-signed, unexpired token, else None."""
+    payload, _, signature = (token or '').partition('.')
+    # Compare bytes: compare_digest rejects non-ASCII str with a TypeError
+    if not payload or not hmac.compare_digest(signature.encode('utf-8'), _sign(payload).encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or claims.get('exp', 0) < time.time():
+        return None
+    return claims
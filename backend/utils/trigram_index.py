@@ -0,0 +1,155 @@
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.text import normalize
+
+
+@lru_cache(maxsize=65536)
+def word_trigrams(word: str) -> Tuple[str, ...]:
+    """Trigrams of a word padded like pg_trgm: 'gold' -> '  g', ' go', 'gol', 'old', 'ld '."""
+    padded = f"  {word} "
+    return tuple(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def trigrams(text: str) -> FrozenSet[str]:
+    return frozenset().union(*map(word_trigrams, normalize(text)))
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to keys, for typo-tolerant text search.
+
+    Each key holds one or more weighted fields (e.g. a store's name and
+    address). A key's similarity to a query is the best weighted share of
+    the query's trigrams found in one of its fields, so a short query scores
+    fully against a long address it is part of.
+
+    Postings are NumPy arrays of row slots built by rebuild(), so scoring a
+    query is one bincount over the postings of its trigrams. Later upserts
+    go to small per-trigram sets and mark the row's rebuilt postings stale;
+    the next rebuild folds them in.
+    """
+
+    def __init__(self, weights: Sequence[float] = (1.0,)):
+        self.weights = tuple(weights)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._slots: Dict[int, int] = {}
+        self._keys: List[Optional[int]] = []
+        self._base = [{} for _ in self.weights]    # per field: trigram -> int32 slots from rebuild()
+        self._delta = [{} for _ in self.weights]   # per field: trigram -> set of slots upserted since
+        self._fields: Dict[int, Tuple[FrozenSet[str], ...]] = {}  # slot -> trigrams, for upserted rows
+        self._stale = np.zeros(0, dtype=bool)      # rows whose rebuilt postings no longer apply
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def _retire(self, slot: int):
+        """Drop a row's postings: rebuilt ones are masked, upserted ones removed."""
+        if slot < len(self._stale):
+            self._stale[slot] = True
+        for delta, grams in zip(self._delta, self._fields.pop(slot, ())):
+            for gram in grams:
+                delta[gram].discard(slot)
+
+    def upsert(self, key: int, *texts: str) -> None:
+        fields = tuple(trigrams(text) for text in texts)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = len(self._keys)
+                self._keys.append(key)
+            else:
+                self._retire(slot)
+            self._fields[slot] = fields
+            for delta, grams in zip(self._delta, fields):
+                for gram in grams:
+                    delta.setdefault(gram, set()).add(slot)
+
+    def remove(self, key: int) -> None:
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is not None:
+                self._retire(slot)
+                self._keys[slot] = None
+
+    def rebuild(self, items: Iterable[Tuple]) -> None:
+        """Replace the contents with (key, text, ...) tuples."""
+        keys, pairs = [], [([], []) for _ in self.weights]
+        vocabulary: Dict[str, int] = {}
+        word_ids: Dict[str, Tuple[int, ...]] = {}  # names and addresses repeat most of their words
+        for slot, (key, *texts) in enumerate(items):
+            keys.append(key)
+            for (gram_ids, slots), text in zip(pairs, texts):
+                ids = set()
+                for word in normalize(text):
+                    cached = word_ids.get(word)
+                    if cached is None:
+                        cached = word_ids[word] = tuple(vocabulary.setdefault(gram, len(vocabulary))
+                                                        for gram in word_trigrams(word))
+                    ids.update(cached)
+                gram_ids.extend(ids)
+                slots.extend([slot] * len(ids))
+
+        names = np.array(list(vocabulary), dtype=object)
+        base = []
+        for gram_ids, slots in pairs:
+            gram_ids, slots = np.asarray(gram_ids, dtype=np.int64), np.asarray(slots, dtype=np.int32)
+            order = np.argsort(gram_ids, kind='stable')
+            gram_ids, slots = gram_ids[order], slots[order]
+            starts = np.flatnonzero(np.r_[True, gram_ids[1:] != gram_ids[:-1]]) if len(gram_ids) else []
+            ends = list(starts[1:]) + [len(gram_ids)]
+            base.append({names[gram_ids[start]]: slots[start:end] for start, end in zip(starts, ends)})
+
+        with self._lock:
+            self._reset()
+            self._keys = keys
+            self._slots = {key: slot for slot, key in enumerate(keys)}
+            self._base = base
+            self._stale = np.zeros(len(keys), dtype=bool)
+
+    def _counts(self, field: int, query: FrozenSet[str], size: int) -> np.ndarray:
+        """How many of the query's trigrams each row's field contains."""
+        base = [self._base[field][gram] for gram in query if gram in self._base[field]]
+        counts = np.bincount(np.concatenate(base), minlength=size)[:size] if base else np.zeros(size, dtype=np.int64)
+        if len(self._stale):
+            counts[:len(self._stale)][self._stale] = 0
+        delta = [slot for gram in query for slot in self._delta[field].get(gram, ())]
+        if delta:
+            counts += np.bincount(np.asarray(delta, dtype=np.int64), minlength=size)
+        return counts
+
+    def search(self, text: str, threshold: float = 0.4, limit: Optional[int] = None,
+               accept: Optional[Callable[[int], bool]] = None) -> List[Tuple[float, int]]:
+        """(similarity, key) pairs at or above threshold, most similar first.
+
+        Ties keep insertion order, which after rebuild() is the order given.
+        """
+        query = trigrams(text)
+        if not query:
+            return []
+        with self._lock:
+            size = len(self._keys)
+            if not size:
+                return []
+            scores = np.zeros(size)
+            for field, weight in enumerate(self.weights):
+                np.maximum(scores, weight * self._counts(field, query, size) / len(query), out=scores)
+            candidates = np.flatnonzero(scores >= threshold - 1e-9)
+            candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+            keys = self._keys
+
+            results = []
+            for slot in candidates.tolist():
+                key = keys[slot]
+                if key is not None and (accept is None or accept(key)):
+                    results.append((round(float(scores[slot]), 4), key))
+                    if limit is not None and len(results) >= limit:
+                        break
+            return results